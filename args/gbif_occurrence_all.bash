@@ -1,7 +1,7 @@
 #!/bin/bash
 
 ./ranges/parse_gbif.py \
-  --tsv-file=data/occurrence/*occurrence.txt \
+  --tsv-in=data/occurrence/*occurrence.txt \
   --json-dir=data/occurrence_json \
   --output-dir=data/occurrence_2024-07-19c \
   --csv-all \
@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+import argparse
+import logging
+import multiprocessing
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+from collections.abc import Callable, Iterable
+from glob import glob
+from pathlib import Path
+
+from spacy.tokens import Doc
+
+from ranges.pylib import log, occurrence, pipeline, skipping, term_index
+from ranges.rules.length_shorthand import LengthShorthand
+from ranges.writers import json_writer
+
+COLD_RUNS = 3
+
+
+def main(args: argparse.Namespace) -> None:
+    log.started(args=args)
+    BENCHMARKS[args.benchmark](args)
+    log.finished()
+
+
+def startup(args: argparse.Namespace) -> None:
+    """Compare building the pipeline once per file with once per worker."""
+    start = time.perf_counter()
+    pipeline.build()
+    elapsed = time.perf_counter() - start
+    logging.info(f"Pipeline build time {elapsed:0.2f}s")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        csv_in = replicate_inputs(args.csv_in, temp_dir, args.copies)
+
+        per_file = time_pool(args, csv_in, temp_dir, per_file_task)
+        per_worker = time_pool(
+            args,
+            csv_in,
+            temp_dir,
+            json_writer.process_occurrences,
+            initializer=json_writer.init_worker,
+        )
+
+    overhead = (per_file - per_worker) / len(csv_in)
+    logging.info(f"Files processed {len(csv_in)} using {args.cpus} CPUs")
+    logging.info(f"Build per file   {per_file:0.2f}s")
+    logging.info(f"Build per worker {per_worker:0.2f}s")
+    logging.info(f"Saved per file   {overhead:0.2f}s")
+
+
+def prefilter(args: argparse.Namespace) -> None:
+    """
+    Check that the prefilter gate never skips a text that has traits.
+
+    Texts that pass the gate are parsed the same way on both paths, so only the
+    skipped texts need to be parsed to find disagreements.
+    """
+    nlp = json_writer.shared_pipeline()
+    gate = json_writer.shared_gate()
+
+    texts = read_texts(args)
+
+    start = time.perf_counter()
+    skipped = [t for t in texts if not gate.search(t)]
+    gate_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    disagree = 0
+    for text, doc in zip(skipped, nlp.pipe(skipped), strict=True):
+        if traits := [e._.trait._trait for e in doc.ents if e._.trait]:
+            disagree += 1
+            logging.warning(f"Skipped text has {', '.join(traits)}: {text!r}")
+    parse_time = time.perf_counter() - start
+
+    logging.info(f"Unique texts     {len(texts)}")
+    logging.info(f"Skipped texts    {len(skipped)}")
+    logging.info(f"Disagreements    {disagree}")
+    logging.info(f"Gate time        {gate_time:0.2f}s")
+    logging.info(f"Parse time saved {parse_time:0.2f}s")
+
+
+def skip_components(args: argparse.Namespace) -> None:
+    """Compare parsing with and without skipping pattern pipes that cannot match."""
+    texts = sorted(read_texts(args))
+
+    nlp = pipeline.build()
+    start = time.perf_counter()
+    expect = [traits(d) for d in nlp.pipe(texts, batch_size=args.batch_size)]
+    every_pipe = time.perf_counter() - start
+
+    nlp = pipeline.build()
+    skipped = skipping.skip_unmatchable(nlp)
+    start = time.perf_counter()
+    actual = [traits(d) for d in nlp.pipe(texts, batch_size=args.batch_size)]
+    skipping_pipes = time.perf_counter() - start
+
+    for text, old, new in zip(texts, expect, actual, strict=True):
+        if old != new:
+            logging.warning(f"Different parse for: {text!r}")
+
+    runs = sum(s.runs for s in skipped.values())
+    skips = sum(s.skips for s in skipped.values())
+    differ = sum(old != new for old, new in zip(expect, actual, strict=True))
+
+    logging.info(f"Unique texts     {len(texts)}")
+    logging.info(f"Skippable pipes  {len(skipped)} of {len(nlp.pipe_names)}")
+    logging.info(f"Pipe runs        {runs}")
+    logging.info(f"Pipe skips       {skips}")
+    logging.info(f"Different parses {differ}")
+    logging.info(f"Every pipe       {every_pipe:0.2f}s")
+    logging.info(f"Skipping pipes   {skipping_pipes:0.2f}s")
+
+
+def index_terms(args: argparse.Namespace) -> None:
+    """Compare parsing with every term pipe and with the merged term index."""
+    texts = sorted(read_texts(args))
+
+    nlp = pipeline.build()
+    start = time.perf_counter()
+    expect = [traits(d) for d in nlp.pipe(texts, batch_size=args.batch_size)]
+    every_pipe = time.perf_counter() - start
+
+    nlp = pipeline.build()
+    start = time.perf_counter()
+    wrapped = term_index.index_terms(nlp)
+    index_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = [traits(d) for d in nlp.pipe(texts, batch_size=args.batch_size)]
+    indexed = time.perf_counter() - start
+
+    for text, old, new in zip(texts, expect, actual, strict=True):
+        if old != new:
+            logging.warning(f"Different parse for: {text!r}")
+
+    runs = sum(w.runs for w in wrapped.values())
+    skips = sum(w.skips for w in wrapped.values())
+    differ = sum(old != new for old, new in zip(expect, actual, strict=True))
+
+    logging.info(f"Unique texts     {len(texts)}")
+    logging.info(f"Term pipes       {len(wrapped)}")
+    logging.info(f"Term pipe runs   {runs}")
+    logging.info(f"Term pipe skips  {skips}")
+    logging.info(f"Different parses {differ}")
+    logging.info(f"Index build time {index_time:0.2f}s")
+    logging.info(f"Every term pipe  {every_pipe:0.2f}s")
+    logging.info(f"Term index       {indexed:0.2f}s")
+
+
+def shorthand(args: argparse.Namespace) -> None:
+    """Check that the shorthand fast path parses like spaCy on a corpus."""
+    texts = sorted(read_texts(args))
+
+    start = time.perf_counter()
+    fast = {t: p for t in texts if (p := LengthShorthand.fast_parse(t)) is not None}
+    fast_time = time.perf_counter() - start
+
+    nlp = pipeline.build()
+    start = time.perf_counter()
+    docs = nlp.pipe(fast, batch_size=args.batch_size)
+    expect = [spans(e._.trait for e in d.ents if e._.trait) for d in docs]
+    spacy_time = time.perf_counter() - start
+
+    differ = 0
+    for (text, parsed), old in zip(fast.items(), expect, strict=True):
+        if spans(parsed) != old:
+            differ += 1
+            logging.warning(f"Different parse for: {text!r}")
+
+    logging.info(f"Unique texts     {len(texts)}")
+    logging.info(f"Fast path texts  {len(fast)}")
+    logging.info(f"Different parses {differ}")
+    logging.info(f"Fast path time   {fast_time:0.2f}s")
+    logging.info(f"spaCy time       {spacy_time:0.2f}s")
+
+
+def spans(parsed: Iterable) -> list[tuple]:
+    return [(t.as_dict(), t.start, t.end) for t in parsed]
+
+
+def traits(doc: Doc) -> list[dict]:
+    return [e._.trait.as_dict() for e in doc.ents if e._.trait]
+
+
+def read_texts(args: argparse.Namespace) -> set[str]:
+    """Get the unique texts in the parse fields."""
+    texts = set()
+    for csv_file in args.csv_in:
+        for occur in occurrence.read_occurrences(
+            csv_file,
+            id_field=args.id_field,
+            info_fields=[],
+            parse_fields=args.parse_field,
+            overwrite_fields=[],
+        ):
+            texts |= {t for t in occur.parse_fields.values() if t}
+    return texts
+
+
+def artifact(args: argparse.Namespace) -> None:
+    """Compare building the pipeline with loading a saved one."""
+    start = time.perf_counter()
+    built = pipeline.build()
+    build_time = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pipeline_dir = Path(temp_dir)
+
+        start = time.perf_counter()
+        pipeline.save(built, pipeline_dir)
+        save_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        loaded = pipeline.load(pipeline_dir=pipeline_dir)
+        load_time = time.perf_counter() - start
+
+    texts = sorted(read_texts(args))
+    expect = [traits(d) for d in built.pipe(texts, batch_size=args.batch_size)]
+    actual = [traits(d) for d in loaded.pipe(texts, batch_size=args.batch_size)]
+    differ = sum(old != new for old, new in zip(expect, actual, strict=True))
+
+    same = pipeline.fingerprint(built) == pipeline.fingerprint(loaded)
+
+    logging.info(f"Same fingerprint {same}")
+    logging.info(f"Unique texts     {len(texts)}")
+    logging.info(f"Different parses {differ}")
+    logging.info(f"Build time       {build_time:0.2f}s")
+    logging.info(f"Save time        {save_time:0.2f}s")
+    logging.info(f"Load time        {load_time:0.2f}s")
+
+
+def cold_start(args: argparse.Namespace) -> None:  # noqa: ARG001
+    """
+    Time how long a new process takes to get a pipeline, built or loaded.
+
+    Each way runs in fresh Python processes like spawned workers, and the best of a
+    few runs is kept. The import time is what a saved pipeline cannot save.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pipeline.save(pipeline.build(), Path(temp_dir))
+        setup = "from pathlib import Path\nfrom ranges.pylib import pipeline\n"
+        import_time = cold_time(setup)
+        build_time = cold_time(setup + "pipeline.build()")
+        load_time = cold_time(setup + f"pipeline.load(pipeline_dir=Path({temp_dir!r}))")
+
+    pipeline.traiter_signature.cache_clear()
+    start = time.perf_counter()
+    pipeline.source_fingerprint()
+    fingerprint_time = time.perf_counter() - start
+
+    logging.info(f"Import time      {import_time:0.2f}s")
+    logging.info(f"Cold build time  {build_time:0.2f}s")
+    logging.info(f"Cold load time   {load_time:0.2f}s")
+    logging.info(f"Fingerprint time {fingerprint_time:0.3f}s")
+
+
+def cold_time(code: str) -> float:
+    """Get the best time of running the code in a new Python process."""
+    times = []
+    for _ in range(COLD_RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)  # noqa: S603
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def base(args: argparse.Namespace) -> None:
+    """Compare parsing with the md base model and another base model."""
+    texts = sorted(read_texts(args))
+    times = {}
+    parses = {}
+
+    for name in ("md", args.base):
+        nlp = pipeline.build(base=name)
+        start = time.perf_counter()
+        parses[name] = [traits(d) for d in nlp.pipe(texts, batch_size=args.batch_size)]
+        times[name] = time.perf_counter() - start
+
+    for text, old, new in zip(texts, parses["md"], parses[args.base], strict=True):
+        if old != new:
+            logging.warning(f"Different parse for: {text!r}")
+
+    pairs = zip(parses["md"], parses[args.base], strict=True)
+    differ = sum(old != new for old, new in pairs)
+
+    logging.info(f"Unique texts     {len(texts)}")
+    logging.info(f"Different parses {differ}")
+    logging.info(f"md time          {times['md']:0.2f}s")
+    logging.info(f"{args.base} time {times[args.base]:0.2f}s")
+
+
+def numbers(args: argparse.Namespace) -> None:
+    """Compare finding the numbers before every rule with the number cache."""
+    texts = sorted(read_texts(args))
+    times = {}
+    parses = {}
+
+    for cache_numbers in (False, True):
+        nlp = pipeline.build(cache_numbers=cache_numbers)
+        start = time.perf_counter()
+        parses[cache_numbers] = [
+            traits(d) for d in nlp.pipe(texts, batch_size=args.batch_size)
+        ]
+        times[cache_numbers] = time.perf_counter() - start
+
+    for text, old, new in zip(texts, parses[False], parses[True], strict=True):
+        if old != new:
+            logging.warning(f"Different parse for: {text!r}")
+
+    pairs = zip(parses[False], parses[True], strict=True)
+    differ = sum(old != new for old, new in pairs)
+
+    logging.info(f"Unique texts     {len(texts)}")
+    logging.info(f"Different parses {differ}")
+    logging.info(f"Number pipes     {times[False]:0.2f}s")
+    logging.info(f"Number cache     {times[True]:0.2f}s")
+
+
+def shared_lengths(args: argparse.Namespace) -> None:
+    """Compare a term pipe for each length rule with one shared term pipe."""
+    texts = sorted(read_texts(args))
+    builds = {}
+    times = {}
+    parses = {}
+
+    for shared in (False, True):
+        start = time.perf_counter()
+        nlp = pipeline.build(shared_lengths=shared)
+        builds[shared] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parses[shared] = [
+            traits(d) for d in nlp.pipe(texts, batch_size=args.batch_size)
+        ]
+        times[shared] = time.perf_counter() - start
+
+    for text, old, new in zip(texts, parses[False], parses[True], strict=True):
+        if old != new:
+            logging.warning(f"Different parse for: {text!r}")
+
+    pairs = zip(parses[False], parses[True], strict=True)
+    differ = sum(old != new for old, new in pairs)
+
+    logging.info(f"Unique texts     {len(texts)}")
+    logging.info(f"Different parses {differ}")
+    logging.info(f"Own term pipes   {builds[False]:0.2f}s build {times[False]:0.2f}s")
+    logging.info(f"Shared term pipe {builds[True]:0.2f}s build {times[True]:0.2f}s")
+
+
+def per_file_task(*args: object) -> str:
+    """Mimic the old behavior of building a fresh pipeline for every file."""
+    json_writer.shared_pipeline.cache_clear()
+    return json_writer.process_occurrences(*args)
+
+
+def time_pool(
+    args: argparse.Namespace,
+    csv_in: list[Path],
+    json_dir: Path,
+    task: Callable,
+    initializer: Callable | None = None,
+) -> float:
+    start = time.perf_counter()
+    with multiprocessing.Pool(processes=args.cpus, initializer=initializer) as pool:
+        results = [
+            pool.apply_async(
+                task,
+                args=(
+                    csv_file,
+                    json_dir,
+                    args.id_field,
+                    args.info_field,
+                    args.parse_field,
+                    args.overwrite_field,
+                ),
+            )
+            for csv_file in csv_in
+        ]
+        fails = [f for r in results if (f := r.get())]
+    elapsed = time.perf_counter() - start
+
+    # A file that fails to parse stops early and would make the timing look good
+    if fails:
+        msg = f"The following extractions did not work: {', '.join(fails)}"
+        raise SystemExit(msg)
+
+    return elapsed
+
+
+def replicate_inputs(csv_in: list[Path], temp_dir: Path, copies: int) -> list[Path]:
+    """Simulate many institution files by linking to the inputs several times."""
+    if copies <= 1:
+        return csv_in
+
+    replicated = []
+    for i in range(copies):
+        for csv_file in csv_in:
+            link = temp_dir / f"{csv_file.stem}_{i:04d}{csv_file.suffix}"
+            link.symlink_to(csv_file.absolute())
+            replicated.append(link)
+    return replicated
+
+
+BENCHMARKS = {
+    "startup": startup,
+    "prefilter": prefilter,
+    "skip": skip_components,
+    "terms": index_terms,
+    "shorthand": shorthand,
+    "artifact": artifact,
+    "cold": cold_start,
+    "base": base,
+    "numbers": numbers,
+    "lengths": shared_lengths,
+}
+
+
+def parse_args() -> argparse.Namespace:
+    arg_parser = argparse.ArgumentParser(
+        description=textwrap.dedent(
+            """Time parts of the GBIF parsing pipeline.""",
+        ),
+    )
+
+    arg_parser.add_argument(
+        "--benchmark",
+        choices=list(BENCHMARKS),
+        default="startup",
+        help="""Which benchmark to run. (default: %(default)s)""",
+    )
+
+    arg_parser.add_argument(
+        "--csv-in",
+        type=Path,
+        action="append",
+        required=True,
+        metavar="PATH",
+        help="""Input this CSV. Wild cards must be quoted""",
+    )
+
+    arg_parser.add_argument(
+        "--copies",
+        type=int,
+        default=1,
+        metavar="INT",
+        help="""Process each input file this many times to mimic running hundreds
+            of institution files. (default: %(default)s)""",
+    )
+
+    arg_parser.add_argument(
+        "--id-field",
+        metavar="COLUMN",
+        help="""Use this field as the record ID.""",
+    )
+
+    arg_parser.add_argument(
+        "--parse-field",
+        metavar="COLUMN",
+        action="append",
+        help="""Parse this field.""",
+    )
+
+    arg_parser.add_argument(
+        "--info-field",
+        metavar="COLUMN",
+        action="append",
+        help="""Include, but don't parse_fields, this field in the output.""",
+    )
+
+    arg_parser.add_argument(
+        "--overwrite-field",
+        metavar="COLUMN",
+        action="append",
+        help="""Use this field as is if it has data otherwise use a parsed field.""",
+    )
+
+    arg_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        metavar="INT",
+        help="""How many texts to give nlp.pipe() at a time. (default: %(default)s)""",
+    )
+
+    arg_parser.add_argument(
+        "--base",
+        choices=pipeline.BASES,
+        default="blank",
+        help="""Compare this base model with "md". (default: %(default)s)""",
+    )
+
+    arg_parser.add_argument(
+        "--cpus",
+        type=int,
+        default=4,
+        help="""Number of CPU processors to use. (default: %(default)s)""",
+    )
+
+    args = arg_parser.parse_args()
+
+    csv_in = []
+    for csv_file in args.csv_in:
+        csv_in += glob(str(csv_file))  # noqa: PTH207
+    args.csv_in = [Path(f) for f in sorted(csv_in)]
+
+    return args
+
+
+if __name__ == "__main__":
+    ARGS = parse_args()
+    main(ARGS)
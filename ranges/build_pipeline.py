@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+import argparse
+import logging
+import textwrap
+from pathlib import Path
+
+from ranges.pylib import log, pipeline
+
+
+def main(args: argparse.Namespace) -> None:
+    log.started(args=args)
+
+    args.pipeline_dir.mkdir(parents=True, exist_ok=True)
+
+    nlp = pipeline.build(args.traits, args.base)
+    pipeline.save(nlp, args.pipeline_dir, args.traits, args.base)
+
+    msg = f"Saved {len(nlp.pipe_names)} pipes to {args.pipeline_dir}"
+    logging.info(msg)
+
+    log.finished()
+
+
+def parse_args() -> argparse.Namespace:
+    arg_parser = argparse.ArgumentParser(
+        description=textwrap.dedent(
+            f"""
+            Build the pipeline once and save it so that parsers, scripts, and tests
+            can load it instead of building it. Point the {pipeline.PIPELINE_ENV}
+            environment variable or parse_gbif.py --pipeline-dir at the saved
+            pipeline. It is rebuilt from the sources when they change.
+            """
+        ),
+    )
+
+    arg_parser.add_argument(
+        "--pipeline-dir",
+        required=True,
+        type=Path,
+        metavar="PATH",
+        help="""Save the pipeline to this directory.""",
+    )
+
+    arg_parser.add_argument(
+        "--traits",
+        choices=list(pipeline.RULES),
+        action="append",
+        metavar="TRAIT",
+        help="""Only build these traits and the traits they depend on. Use it once
+            for each trait. The default is to build every trait. Choices are:
+            %(choices)s""",
+    )
+
+    arg_parser.add_argument(
+        "--base",
+        choices=pipeline.BASES,
+        help="""Start the pipeline from this base model. (default: md)""",
+    )
+
+    return arg_parser.parse_args()
+
+
+if __name__ == "__main__":
+    ARGS = parse_args()
+    main(ARGS)
@@ -5,10 +5,12 @@ import logging
 import re
 import textwrap
 from collections import defaultdict
+from functools import cache
 from glob import glob
 from pathlib import Path
 
 import pandas as pd
+from spacy.language import Language
 from spacy.tokens import Doc
 
 from ranges.pylib import log, pipeline
@@ -61,11 +63,13 @@ UNITS = {
     "pounds": 453.5924,
 }
 
-PIPELINE = pipeline.build()
-FEMALE_REPRO = pipeline.female_repro()
-MALE_REPRO = pipeline.male_repro()
-LEN_SHORTHAND = pipeline.shorthand()
-BODY_MASS = pipeline.body_wt()
+# Smaller pipelines for columns that only hold a few traits
+PARTIAL_PIPELINES = {
+    "female_repro": pipeline.female_repro,
+    "male_repro": pipeline.male_repro,
+    "shorthand": pipeline.shorthand,
+    "body_wt": pipeline.body_wt,
+}
 
 
 def main(args: argparse.Namespace) -> None:
@@ -148,7 +152,7 @@ def myotis_mod(args: argparse.Namespace) -> None:
                 "year": in_row["Year"],
                 "review_needed": in_row["REVIEW NEEDED"],
             }
-            out_row |= parse_all(in_row["reproductive data"], out_row)
+            out_row |= parse_all(in_row["reproductive data"], out_row, args.traits)
 
             out_data.append(out_row)
 
@@ -207,7 +211,7 @@ def myosorex_varius_mod(args: argparse.Namespace) -> None:
                     "remarks (data discrepancy, need to revisit specimen, etc.)"
                 ],
             }
-            out_row |= parse_all(in_row["repro comments"], out_row)
+            out_row |= parse_all(in_row["repro comments"], out_row, args.traits)
 
             out_data.append(out_row)
 
@@ -269,8 +273,10 @@ def mustela_mod(args: argparse.Namespace) -> None:
                 "year": in_row["year"],
                 "review_needed": in_row["review_needed"],
             }
-            out_row |= parse_all(in_row["reproductive_data"], out_row)
-            out_row |= parse_all(in_row["unformatted_measurements"], out_row)
+            out_row |= parse_all(in_row["reproductive_data"], out_row, args.traits)
+            out_row |= parse_all(
+                in_row["unformatted_measurements"], out_row, args.traits
+            )
 
             out_data.append(out_row)
 
@@ -339,7 +345,7 @@ def msb_y1_y2_traits_mod(args: argparse.Namespace) -> None:
                     case "life stage":
                         out_row["lifeStage"] = in_row[meas]
                     case "reproductive data":
-                        doc = PIPELINE(in_row[meas])
+                        doc = full_pipeline(args.traits)(in_row[meas])
                         out_row |= get_traits(doc)
                     case "sex":
                         out_row["sex"] = in_row[meas]
@@ -354,7 +360,7 @@ def msb_y1_y2_traits_mod(args: argparse.Namespace) -> None:
                     case "tragus length":
                         out_row["tragus_length"] = to_mm(in_row[meas], in_row[units])
                     case "unformatted measurements":
-                        doc = PIPELINE(in_row[meas])
+                        doc = full_pipeline(args.traits)(in_row[meas])
                         out_row |= get_traits(doc)
                     case "weight":
                         out_row["body_mass"] = to_grams(in_row[meas], in_row[units])
@@ -703,7 +709,7 @@ def dmns_ranges_traits_dmns(args: argparse.Namespace, name: str) -> None:
                             in_row[meas], in_row[units]
                         )
                     case "reproductive data":
-                        doc = PIPELINE(in_row[meas])
+                        doc = full_pipeline(args.traits)(in_row[meas])
                         out_row |= get_traits(doc)
                     case "sex":
                         out_row["sex"] = in_row[meas]
@@ -809,7 +815,7 @@ def cas_y1_y2_trait_data_only(args: argparse.Namespace) -> None:
             out_row |= parse_body_mass(in_row["weight"])
             out_row |= parse_shorthand(in_row["trait data (SL-Tail-Hind Foot-Ear)"])
             out_row |= parse_repro_cond(in_row["sex"], in_row["reproductive condition"])
-            out_row |= parse_all(in_row["other trait remarks"], out_row)
+            out_row |= parse_all(in_row["other trait remarks"], out_row, args.traits)
             out_row["lengths"] = in_row["trait data (SL-Tail-Hind Foot-Ear)"]
             out_row["weight"] = in_row["weight"]
             out_row["other_traits"] = in_row["other trait remarks"]
@@ -934,18 +940,30 @@ def get_traits(doc: Doc, curr: dict | None = None) -> dict:
     return all_
 
 
-def parse_all(text: str, curr: dict) -> dict:
-    doc = PIPELINE(text)
+@cache
+def full_pipeline(traits: tuple[str, ...] = ()) -> Language:
+    """Build the pipeline the first time it is used, after the arguments are parsed."""
+    return pipeline.load(traits)
+
+
+@cache
+def partial_pipeline(name: str) -> Language:
+    return PARTIAL_PIPELINES[name]()
+
+
+def parse_all(text: str, curr: dict, traits: tuple[str, ...] = ()) -> dict:
+    doc = full_pipeline(traits)(text)
     return get_traits(doc, curr)
 
 
 def parse_repro_cond(sex: str, text: str) -> dict:
-    doc = FEMALE_REPRO(text) if sex.lower().startswith("f") else MALE_REPRO(text)
+    name = "female_repro" if sex.lower().startswith("f") else "male_repro"
+    doc = partial_pipeline(name)(text)
     return get_traits(doc)
 
 
 def parse_shorthand(text: str) -> dict:
-    doc = LEN_SHORTHAND(text)
+    doc = partial_pipeline("shorthand")(text)
     traits = [e._.trait for e in doc.ents]
     shorts = {}
     shorts = traits[0].for_csv() if traits and hasattr(traits[0], "for_csv") else {}
@@ -953,7 +971,7 @@ def parse_shorthand(text: str) -> dict:
 
 
 def parse_body_mass(text: str) -> dict:
-    doc = BODY_MASS(text)
+    doc = partial_pipeline("body_wt")(text)
     return get_traits(doc)
 
 
@@ -1065,8 +1083,19 @@ def parse_args() -> argparse.Namespace:
         help="""Output files to this directory.""",
     )
 
+    arg_parser.add_argument(
+        "--traits",
+        choices=list(pipeline.RULES),
+        action="append",
+        metavar="TRAIT",
+        help="""Only parse these traits and the traits they depend on with the full
+            pipeline. Use it once for each trait. Choices are: %(choices)s""",
+    )
+
     args = arg_parser.parse_args()
 
+    args.traits = tuple(args.traits or ())
+
     all_paths = []
     for path in args.glob:
         paths = glob(path)  # noqa: PTH207
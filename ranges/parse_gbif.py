@@ -1,26 +1,56 @@
 #!/usr/bin/env python3
 import argparse
-import json
 import logging
 import multiprocessing
 import os
+import shutil
 import tempfile
 import textwrap
-from collections.abc import Generator
+from collections import Counter, defaultdict, deque
+from collections.abc import Callable, Generator, Iterable, Iterator
 from contextlib import contextmanager
 from glob import glob
 from pathlib import Path
+from typing import Any
 
 from pylib import log
-from pylib.occurrence import sample_occurrences
 from tqdm import tqdm
 
-from ranges.writers import csv_writer, html_writer, json_writer
+from ranges.pylib import (
+    delta,
+    jsonl,
+    long_text,
+    memory,
+    parse_cache,
+    pipeline,
+    profiler,
+    sampler,
+    shard,
+)
+from ranges.writers import (
+    checkpoint,
+    csv_writer,
+    html_writer,
+    json_writer,
+    queue_writer,
+)
+
+IN_FLIGHT_PER_CPU = 2
 
 
 def main(args: argparse.Namespace) -> None:  # noqa: C901 PLR0912
     log.started()
 
+    # Pool workers inherit the environment so they load the same pipeline
+    if args.pipeline_dir:
+        os.environ[pipeline.PIPELINE_ENV] = str(args.pipeline_dir)
+    if args.base:
+        os.environ[pipeline.BASE_ENV] = args.base
+    if args.cache_numbers:
+        os.environ[pipeline.NUMBER_CACHE_ENV] = "1"
+    if args.shared_lengths:
+        os.environ[pipeline.SHARED_LENGTHS_ENV] = "1"
+
     if args.json_dir:
         args.json_dir.mkdir(parents=True, exist_ok=True)
 
@@ -28,44 +58,73 @@ def main(args: argparse.Namespace) -> None:  # noqa: C901 PLR0912
         args.output_dir.mkdir(parents=True, exist_ok=True)
 
     with get_json_dir(args.json_dir) as json_dir:
-        if not args.skip_parse:
-            if args.debug:
-                single_process(args, json_dir)
-            else:
-                multiple_processes(args, json_dir)
-
-        logging.info("Reading JSONL data.")
-        by_institution = {}
-        for path in sorted(args.json_dir.glob("*.jsonl")):
-            msg = "Reading JSONL for " + path.stem
-            logging.info(msg)
-            with path.open() as jin:
-                data = [json.loads(ln) for ln in jin]
-            by_institution[path.stem] = data
-
-    all_occurrences = []
-    if args.csv_all or args.csv_sampled or args.html_all:
-        for data in by_institution.values():
-            all_occurrences += data
-
-    if args.csv_institution and args.output_dir:
-        logging.info("Writing institution CSV files.")
-        for name, occurrence in by_institution.items():
-            msg = "Institution CSV for " + name
-            logging.info(msg)
-            csv_writer.write_csv(
-                args.output_dir / f"{name}.csv",
-                occurrence,
-                args.id_field,
-                args.info_field,
-                args.parse_field,
-            )
+        if (args.incremental or args.resume) and not (
+            args.skip_parse or args.retry_failed
+        ):
+            args.csv_in = stale_inputs(args, json_dir)
+
+        indexed = {}
+        if args.previous_dir and not (args.skip_parse or args.retry_failed):
+            indexed = index_previous(args, json_dir)
+
+        if args.profile and not args.skip_parse:
+            start_profile(json_dir)
+
+        if args.prune_cache and not args.skip_parse:
+            prune_cache(args, json_dir)
+
+        if args.skip_parse:
+            check_stamps(args, json_dir)
+        elif args.retry_failed:
+            retry_failed(args, json_dir)
+        elif args.debug:
+            single_process(args, json_dir)
+        else:
+            multiple_processes(args, json_dir)
+
+        if args.profile and not args.skip_parse:
+            profiler.write_report(json_dir / "profile", json_dir / "profile_report")
+
+        if indexed:
+            report_previous(json_dir, indexed)
+
+        json_files = jsonl.jsonl_files(json_dir)
+
+    if not args.output_dir:
+        log.finished()
+        return
+
+    # Only one institution's occurrences are in memory at a time
+    if args.csv_institution or args.html_institution:
+        logging.info("Writing institution files.")
+        for path in json_files:
+            occurrences = list(jsonl.read_jsonl(path))
+
+            if args.csv_institution:
+                msg = "Institution CSV for " + path.stem
+                logging.info(msg)
+                csv_writer.write_csv(
+                    args.output_dir / f"{path.stem}.csv",
+                    occurrences,
+                    args.id_field,
+                    args.info_field,
+                    args.parse_field,
+                )
+
+            if args.html_institution:
+                msg = "Institution HTML for " + path.stem
+                logging.info(msg)
+                sampled = sample(args, lambda o=occurrences: o)
+                html_writer.write_html(
+                    args.output_dir / f"sampled_{len(sampled)}_{path.stem}.html",
+                    sampled,
+                    args.id_field,
+                    args.summary_field,
+                )
 
-    if args.csv_sampled and args.output_dir:
+    if args.csv_sampled:
         logging.info("Writing sampled CSV file.")
-        sampled = sample_occurrences(
-            all_occurrences, args.csv_sample, args.sample_method
-        )
+        sampled = sample(args, lambda: all_occurrences(json_files))
         csv_writer.write_csv(
             args.output_dir / f"all_occurrences_sampled_{len(sampled)}.csv",
             sampled,
@@ -74,36 +133,19 @@ def main(args: argparse.Namespace) -> None:  # noqa: C901 PLR0912
             args.parse_field,
         )
 
-    if args.csv_all and args.output_dir:
+    if args.csv_all:
         logging.info("Writing big CSV file.")
-        csv_writer.write_csv(
+        csv_writer.write_csv_files(
             args.output_dir / "all_occurrences.csv",
-            all_occurrences,
+            json_files,
             args.id_field,
             args.info_field,
             args.parse_field,
         )
 
-    if args.html_institution and args.output_dir:
-        logging.info("Writing institution HTML files.")
-        for name, occurrences in by_institution.items():
-            msg = "Institution HTML for " + name
-            logging.info(msg)
-            sampled = sample_occurrences(
-                occurrences, args.csv_sample, args.sample_method
-            )
-            html_writer.write_html(
-                args.output_dir / f"sampled_{len(sampled)}_{name}.html",
-                sampled,
-                args.id_field,
-                args.summary_field,
-            )
-
-    if args.html_all and args.output_dir:
+    if args.html_all:
         logging.info("Writing HTML file.")
-        sampled = sample_occurrences(
-            all_occurrences, args.csv_sample, args.sample_method
-        )
+        sampled = sample(args, lambda: all_occurrences(json_files))
         html_writer.write_html(
             args.output_dir / f"all_occurrences_sampled_{len(sampled)}.html",
             sampled,
@@ -114,6 +156,30 @@ def main(args: argparse.Namespace) -> None:  # noqa: C901 PLR0912
     log.finished()
 
 
+def sample(
+    args: argparse.Namespace, occurrences: Callable[[], Iterable[dict[str, Any]]]
+) -> list[dict[str, Any]]:
+    """Sample the occurrences, stratified sampling needs more than one pass."""
+    if args.sample_strata:
+        return sampler.stratified_sample(
+            occurrences,
+            args.csv_sample,
+            args.sample_method,
+            args.sample_strata,
+            args.summary_field,
+            args.sample_seed,
+        )
+    return sampler.reservoir_sample(
+        occurrences(), args.csv_sample, args.sample_method, args.sample_seed
+    )
+
+
+def all_occurrences(json_files: list[Path]) -> Iterator[dict[str, Any]]:
+    """Stream the occurrences of every JSONL file."""
+    for path in json_files:
+        yield from jsonl.read_jsonl(path)
+
+
 def single_process(args: argparse.Namespace, json_dir: Path) -> None:
     for csv_file in tqdm(args.csv_in):
         json_writer.process_occurrences(
@@ -123,39 +189,302 @@ def single_process(args: argparse.Namespace, json_dir: Path) -> None:
             args.info_field,
             args.parse_field,
             args.overwrite_field,
+            fmt=args.formats[csv_file],
+            block_size=args.block_size,
+            batch_size=args.batch_size,
+            cache_size=args.cache_size,
+            cache_db=cache_db(args, json_dir),
+            profile_dir=profile_dir(args, json_dir),
+            use_prefilter=args.prefilter,
+            skip_components=args.skip_components,
+            index_terms=args.index_terms,
+            fast_shorthand=args.fast_shorthand,
+            max_chars=args.max_text_chars,
+            previous_index=previous_index(args, json_dir),
+            traits=args.traits,
         )
 
 
 def multiple_processes(args: argparse.Namespace, json_dir: Path) -> None:
+    """Parse chunks of rows in parallel and merge them back into one file per input."""
+    # Build the pipeline before forking so the workers inherit it
+    if args.share_pipeline:
+        fingerprint = json_writer.share_pipeline(
+            args.traits,
+            use_prefilter=args.prefilter,
+            skip_components=args.skip_components,
+            index_terms=args.index_terms,
+            max_chars=args.max_text_chars,
+        )
+        context = multiprocessing.get_context("fork")
+    else:
+        fingerprint = json_writer.shared_fingerprint(args.traits, args.max_text_chars)
+        context = multiprocessing.get_context()
+    initializer, initargs = json_writer.init_worker, (args.traits,)
+
+    monitor = memory.MemoryMonitor() if args.memory_report else None
+    options = parse_options(args, json_dir)
+
+    chunks = shard.chunk_files(args.csv_in, args.chunk_rows, args.formats)
+
+    if args.writer_process:
+        fails = queue_writer.parse_and_write(
+            context,
+            chunks,
+            json_dir,
+            fingerprint,
+            cpus=args.cpus,
+            initializer=initializer,
+            initargs=initargs,
+            fields={
+                "block_size": args.block_size,
+                "id_field": args.id_field,
+                "info_fields": args.info_field or [],
+                "parse_fields": args.parse_field or [],
+                "overwrite_fields": args.overwrite_field or [],
+            },
+            options=options,
+            monitor=monitor,
+            resume=args.resume,
+        )
+        report(fails, monitor)
+        return
+
+    part_dir = json_dir / "parts"
+    part_dir.mkdir(parents=True, exist_ok=True)
+
+    # A part file is a checkpoint once its chunk is in the manifest
+    manifest = checkpoint.Manifest(
+        checkpoint.manifest_path(json_dir, "parts"), fingerprint, resume=args.resume
+    )
+    done = checkpoint.resume_parts(manifest, chunks, part_dir, json_dir)
+    if done:
+        msg = f"Resuming after {len(done)} of {len(chunks)} chunks that are done."
+        logging.info(msg)
+
+    by_file = defaultdict(list)
+    for chunk in chunks:
+        by_file[chunk.path].append(chunk)
+    remaining = {
+        path: sum(c.name not in done for c in file_chunks)
+        for path, file_chunks in by_file.items()
+    }
+
+    fails = []
+    failed_paths = set()
+    in_flight = deque()
+
+    def finish() -> None:
+        chunk, result = in_flight.popleft()
+        bar.update(1)
+        if monitor:
+            monitor.sample(p.pid for p in multiprocessing.active_children())
+        if fail := result.get():
+            fails.append(fail)
+            failed_paths.add(chunk.path)
+        else:
+            manifest.commit(chunk)
+        remaining[chunk.path] -= 1
+        if remaining[chunk.path] > 0:
+            return
+        if chunk.path in failed_paths:
+            json_writer.discard_chunks(by_file[chunk.path], part_dir, json_dir)
+        else:
+            json_writer.merge_chunks(
+                by_file[chunk.path], part_dir, json_dir, fingerprint
+            )
+
     with (
-        tqdm(total=len(args.csv_in)) as bar,
-        multiprocessing.Pool(processes=args.cpus) as pool,
+        tqdm(total=len(chunks), initial=len(done)) as bar,
+        context.Pool(
+            processes=args.cpus,
+            initializer=initializer,
+            initargs=initargs,
+        ) as pool,
     ):
-        results = [
-            pool.apply_async(
-                json_writer.process_occurrences,
+        for chunk in chunks:
+            if chunk.name in done:
+                continue
+
+            # Bound the work waiting in the queue
+            while len(in_flight) >= args.cpus * IN_FLIGHT_PER_CPU:
+                finish()
+
+            result = pool.apply_async(
+                json_writer.process_chunk,
                 args=(
-                    csv_file,
-                    json_dir,
+                    chunk,
+                    part_dir,
                     args.id_field,
                     args.info_field,
                     args.parse_field,
                     args.overwrite_field,
                 ),
-                callback=lambda _: bar.update(1),
+                kwds={"block_size": args.block_size, **options},
             )
-            for csv_file in args.csv_in
-        ]
-        fails = ", ".join([val for r in results if (val := r.get())])
+            in_flight.append((chunk, result))
+
+        while in_flight:
+            finish()
+
+    manifest.close()
+    report(fails, monitor)
+
+
+def parse_options(args: argparse.Namespace, json_dir: Path) -> dict[str, Any]:
+    """Get the options for parsing blocks of occurrences."""
+    return {
+        "batch_size": args.batch_size,
+        "cache_size": args.cache_size,
+        "cache_db": cache_db(args, json_dir),
+        "profile_dir": profile_dir(args, json_dir),
+        "use_prefilter": args.prefilter,
+        "skip_components": args.skip_components,
+        "index_terms": args.index_terms,
+        "fast_shorthand": args.fast_shorthand,
+        "max_chars": args.max_text_chars,
+        "previous_index": previous_index(args, json_dir),
+        "traits": args.traits,
+    }
+
+
+def report(fails: list[str], monitor: memory.MemoryMonitor | None = None) -> None:
+    if monitor:
+        monitor.report()
 
     if fails:
-        msg = f"The following extractions did not work: {fails}"
+        msg = f"The following extractions did not work: {', '.join(fails)}"
     else:
         msg = "All files parsed successfully."
 
     logging.info(msg)
 
 
+def retry_failed(args: argparse.Namespace, json_dir: Path) -> None:
+    """Parse the records in the error logs again, one file at a time."""
+    options = parse_options(args, json_dir)
+    for csv_file in tqdm(args.csv_in):
+        retried, errors = json_writer.retry_failed(
+            csv_file,
+            json_dir,
+            args.id_field,
+            args.info_field,
+            args.parse_field,
+            args.overwrite_field,
+            fmt=args.formats[csv_file],
+            block_size=args.block_size,
+            **options,
+        )
+        if retried:
+            msg = f"Parsed {retried} records of {csv_file.stem} again, {errors} errors"
+            logging.info(msg)
+
+
+def index_previous(args: argparse.Namespace, json_dir: Path) -> dict[Path, int]:
+    """
+    Index the earlier parses in the --previous-dir once for all workers.
+
+    Only files parsed by the current pipeline are indexed. Return how many records
+    are in each index.
+    """
+    index_dir = json_dir / "previous"
+    if index_dir.exists():
+        shutil.rmtree(index_dir)
+    index_dir.mkdir(parents=True)
+
+    fingerprint = json_writer.shared_fingerprint(args.traits, args.max_text_chars)
+    indexed = {}
+    for csv_file in tqdm(args.csv_in):
+        json_file = args.previous_dir / f"{csv_file.stem}.jsonl"
+        if json_writer.is_current(json_file, fingerprint):
+            indexed[json_file] = delta.write_index(json_file, args.id_field, index_dir)
+    return indexed
+
+
+def report_previous(json_dir: Path, indexed: dict[Path, int]) -> None:
+    """Log the records that changed since the earlier parses and drop the indexes."""
+    index_dir = json_dir / "previous"
+    totals = Counter()
+    for json_file, count in indexed.items():
+        counts = delta.merge_counts(index_dir, json_file, count)
+        totals += counts
+        msg = f"Changes in {json_file.stem}: {as_text(counts)}"
+        logging.info(msg)
+    msg = f"Changes in all files: {as_text(totals)}"
+    logging.info(msg)
+    shutil.rmtree(index_dir)
+
+
+def previous_index(args: argparse.Namespace, json_dir: Path) -> Path | None:
+    if not args.previous_dir or args.retry_failed:
+        return None
+    return json_dir / "previous"
+
+
+def as_text(counts: Counter) -> str:
+    keys = ["new", "changed", "deleted", "reused"]
+    return ", ".join(f"{counts[k]:,} {k}" for k in keys)
+
+
+def stale_inputs(args: argparse.Namespace, json_dir: Path) -> list[Path]:
+    """Only parse inputs that are not already parsed by the current pipeline."""
+    fingerprint = json_writer.shared_fingerprint(args.traits, args.max_text_chars)
+    stale = []
+    for csv_file in args.csv_in:
+        json_file = json_dir / f"{csv_file.stem}.jsonl"
+        if not json_writer.is_current(json_file, fingerprint, csv_file):
+            stale.append(csv_file)
+    msg = f"Parsing {len(stale)} of {len(args.csv_in)} files, others are current."
+    logging.info(msg)
+    return stale
+
+
+def check_stamps(args: argparse.Namespace, json_dir: Path) -> None:
+    """
+    Warn about JSONL files not made by the current pipeline and unfinished ones.
+
+    The fingerprint comes from the pipeline sources, so the pipeline is not built.
+    """
+    fingerprint = json_writer.shared_fingerprint(args.traits, args.max_text_chars)
+    for path in sorted(json_dir.glob("*.jsonl")):
+        if not json_writer.is_current(path, fingerprint):
+            msg = f"{path.name} was not parsed with the current pipeline"
+            logging.warning(msg)
+
+    # Unfinished output is never in a JSONL file, so it is not in the reports
+    partial = list(json_dir.glob("*.jsonl.partial"))
+    parts = list((json_dir / "parts").glob("*.jsonl"))
+    if partial or parts:
+        msg = (
+            f"Only finished files are reported. {len(partial)} partial files and "
+            f"{len(parts)} chunks are waiting for --resume."
+        )
+        logging.warning(msg)
+
+
+def profile_dir(args: argparse.Namespace, json_dir: Path) -> Path | None:
+    return json_dir / "profile" if args.profile else None
+
+
+def start_profile(json_dir: Path) -> None:
+    """Clear out the per-process dumps from earlier runs."""
+    dir_ = json_dir / "profile"
+    dir_.mkdir(parents=True, exist_ok=True)
+    for path in dir_.glob("*.json"):
+        path.unlink()
+
+
+def cache_db(args: argparse.Namespace, json_dir: Path) -> Path | None:
+    return json_dir / "parse_cache.sqlite" if args.disk_cache else None
+
+
+def prune_cache(args: argparse.Namespace, json_dir: Path) -> None:
+    fingerprint = json_writer.shared_fingerprint(args.traits, args.max_text_chars)
+    pruned = parse_cache.prune(json_dir / "parse_cache.sqlite", fingerprint)
+    msg = f"Pruned {pruned:,} parses made by other pipelines from the disk cache"
+    logging.info(msg)
+
+
 @contextmanager
 def get_json_dir(json_dir: Path | None = None) -> Generator[Path]:
     dir_ = json_dir or Path(tempfile.mkdtemp())
@@ -176,11 +505,28 @@ def parse_args() -> argparse.Namespace:
         "--csv-in",
         type=Path,
         action="append",
-        required=True,
         metavar="PATH",
         help="""Input this CSV. Wild cards must be quoted""",
     )
 
+    arg_parser.add_argument(
+        "--tsv-in",
+        type=Path,
+        action="append",
+        metavar="PATH",
+        help="""Input this tab-separated GBIF occurrence.txt file.
+            Wild cards must be quoted""",
+    )
+
+    arg_parser.add_argument(
+        "--dwca-in",
+        type=Path,
+        action="append",
+        metavar="PATH",
+        help="""Input this Darwin Core Archive zip file. It is read without
+            extracting it. Wild cards must be quoted""",
+    )
+
     arg_parser.add_argument(
         "--json-dir",
         metavar="PATH",
@@ -287,6 +633,24 @@ def parse_args() -> argparse.Namespace:
             false positives. (default: %(default)s)""",
     )
 
+    arg_parser.add_argument(
+        "--sample-strata",
+        choices=sampler.STRATA,
+        help="""Give every stratum an equal share of the samples so that rare ones
+            still get reviewed. "institution"=Stratify by the source file.
+            "summary"=Stratify by the --summary-field value. "trait"=Stratify by the
+            parsed traits. The default is a uniform sample of all records.""",
+    )
+
+    arg_parser.add_argument(
+        "--sample-seed",
+        type=int,
+        default=sampler.SEED,
+        metavar="INT",
+        help="""Seed for the random samples, the same seed gives the same samples.
+            (default: %(default)s)""",
+    )
+
     keep = 4
     count = os.cpu_count() or 0
     cpus = min(10, count - keep if count > keep else 1)
@@ -299,6 +663,185 @@ def parse_args() -> argparse.Namespace:
             """,
     )
 
+    arg_parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        default=50_000,
+        metavar="INT",
+        help="""Split input files into chunks of this many rows so that one big file
+            is parsed by all of the CPUs. (default: %(default)s)""",
+    )
+
+    arg_parser.add_argument(
+        "--block-size",
+        type=int,
+        default=10_000,
+        metavar="INT",
+        help="""Read, parse, and write this many records at a time. This sets the
+            memory used for parsing a file. (default: %(default)s)""",
+    )
+
+    arg_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        metavar="INT",
+        help="""How many texts to send through the spaCy pipeline at once.
+            (default: %(default)s)""",
+    )
+
+    arg_parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="""Only parse input files that do not already have a JSONL file made by
+            the current pipeline from the current version of the input.""",
+    )
+
+    arg_parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=100_000,
+        metavar="INT",
+        help="""How many parsed texts to keep in each process's in-memory cache.
+            Use 0 to turn off the in-memory cache. (default: %(default)s)""",
+    )
+
+    arg_parser.add_argument(
+        "--disk-cache",
+        action="store_true",
+        help="""Also keep parsed texts in an SQLite cache in the --json-dir so that
+            they can be reused by later runs.""",
+    )
+
+    arg_parser.add_argument(
+        "--prune-cache",
+        action="store_true",
+        help="""Remove parses made by other pipelines from the --disk-cache before
+            parsing. They are kept by default so that switching between pipelines,
+            like with --traits, does not throw away the other pipeline's parses.""",
+    )
+
+    arg_parser.add_argument(
+        "--prefilter",
+        action="store_true",
+        help="""Skip the parser for texts without any numbers or trait terms. These
+            texts get no traits. Check it with benchmark.py --benchmark prefilter.""",
+    )
+
+    arg_parser.add_argument(
+        "--traits",
+        choices=list(pipeline.RULES),
+        action="append",
+        metavar="TRAIT",
+        help="""Only parse these traits and the traits they depend on. Use it once
+            for each trait. The default is to parse every trait. Choices are:
+            %(choices)s""",
+    )
+
+    arg_parser.add_argument(
+        "--pipeline-dir",
+        type=Path,
+        metavar="PATH",
+        help="""Load the pipeline saved here by build_pipeline.py instead of
+            building it in every process. It is built as usual when the saved
+            pipeline is stale.""",
+    )
+
+    arg_parser.add_argument(
+        "--base",
+        choices=pipeline.BASES,
+        help="""Start the pipeline from this base model. "md"=en_core_web_md.
+            "tagger"=en_core_web_md with only its tagger. "blank"=Only the tokenizer,
+            it uses the least memory and is the fastest. Check that a base parses
+            like "md" with benchmark.py --benchmark base. (default: md)""",
+    )
+
+    arg_parser.add_argument(
+        "--cache-numbers",
+        action="store_true",
+        help="""Find the numbers in a text once and put them back before each rule
+            instead of finding them again. Check that it parses the same with
+            benchmark.py --benchmark numbers.""",
+    )
+
+    arg_parser.add_argument(
+        "--shared-lengths",
+        action="store_true",
+        help="""Find the terms of the ear, forearm, thumb, calcar, tragus, and hind
+            foot length rules with one term pipe instead of one each. Check that
+            it parses the same with benchmark.py --benchmark lengths.""",
+    )
+
+    arg_parser.add_argument(
+        "--skip-components",
+        action="store_true",
+        help="""Skip pattern pipes for docs that do not have the entities that the
+            patterns need. The parses are the same, only faster.""",
+    )
+
+    arg_parser.add_argument(
+        "--index-terms",
+        action="store_true",
+        help="""Match the terms of every rule once per doc and skip the term pipes of
+            rules without any terms in it. The parses are the same, only faster.
+            Check it with benchmark.py --benchmark terms.""",
+    )
+
+    arg_parser.add_argument(
+        "--max-text-chars",
+        type=int,
+        default=0,
+        metavar="INT",
+        help=f"""Parse fields longer than this in overlapping chunks so that one huge
+            field does not stall a worker, {long_text.MAX_CHARS} works well. A trait
+            cut by a chunk boundary may parse differently, so the limit is part of
+            the fingerprint of the parse cache and the JSONL stamps. Changing it
+            re-parses stale files with --incremental. Use 0 to parse every field
+            whole.
+            (default: %(default)s)""",
+    )
+
+    arg_parser.add_argument(
+        "--fast-shorthand",
+        action="store_true",
+        help="""Parse fields that only hold a length shorthand, like
+            "11-22-33-44:99g", with a regular expression instead of spaCy. Check it
+            with benchmark.py --benchmark shorthand.""",
+    )
+
+    arg_parser.add_argument(
+        "--share-pipeline",
+        action="store_true",
+        help="""Build the pipeline once, freeze it, and fork the workers from it so
+            they share the model's memory instead of each holding a copy. This
+            allows more --cpus on the same memory. Linux and macOS only.""",
+    )
+
+    arg_parser.add_argument(
+        "--writer-process",
+        action="store_true",
+        help="""Send the parsed records from the workers to one writer process that
+            writes each file in its original order, instead of having every worker
+            write its own part files. This avoids many small writes on network file
+            systems.""",
+    )
+
+    arg_parser.add_argument(
+        "--memory-report",
+        action="store_true",
+        help="""Log the peak memory of each worker. USS is the memory only the worker
+            uses and PSS adds its share of the memory it shares with other
+            processes. Linux only.""",
+    )
+
+    arg_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="""Time every pipeline component and write a ranked report to
+            profile_report.csv and profile_report.json in the --json-dir. This slows
+            down the parse a bit.""",
+    )
+
     arg_parser.add_argument(
         "--debug",
         action="store_true",
@@ -307,6 +850,33 @@ def parse_args() -> argparse.Namespace:
             stdout.""",
     )
 
+    arg_parser.add_argument(
+        "--previous-dir",
+        type=Path,
+        metavar="PATH",
+        help="""The --json-dir of an earlier parse of an older download. Records
+            with the same --id-field and the same parse and overwrite fields get
+            their traits from it instead of being parsed again. It is only used
+            for files parsed with the current pipeline. The counts of new, changed,
+            deleted, and reused records are logged after the parse.""",
+    )
+
+    arg_parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="""Continue a parse that was killed. Files that are done are skipped,
+            and so are the chunks of rows that were checkpointed in the --json-dir.
+            Use the same arguments as the killed parse.""",
+    )
+
+    arg_parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="""Only parse the records in the error logs of the --json-dir again and
+            put them into their JSONL files. A record is logged when its text breaks
+            the parser, it is written without traits for that field.""",
+    )
+
     arg_parser.add_argument(
         "--skip-parse",
         action="store_true",
@@ -316,13 +886,30 @@ def parse_args() -> argparse.Namespace:
 
     args = arg_parser.parse_args()
 
+    args.traits = tuple(args.traits or ())
+
+    if not (args.csv_in or args.tsv_in or args.dwca_in):
+        arg_parser.error("One of --csv-in, --tsv-in, or --dwca-in is required")
+
+    if args.prune_cache and not args.disk_cache:
+        arg_parser.error("--prune-cache needs --disk-cache")
+
+    if args.sample_strata == "summary" and not args.summary_field:
+        arg_parser.error("--sample-strata=summary needs a --summary-field")
+
     if args.summary_field and args.summary_field not in args.info_field:
         args.info_field.append(args.summary_field)
 
-    csv_in = []
-    for csv_file in args.csv_in:
-        csv_in += glob(str(csv_file))  # noqa: PTH207
-    args.csv_in = [Path(f) for f in sorted(csv_in)]
+    # Every input is parsed as the format of the option it was given with
+    args.formats = {}
+    for fmt, patterns in [
+        ("csv", args.csv_in),
+        ("tsv", args.tsv_in),
+        ("dwca", args.dwca_in),
+    ]:
+        for pattern in patterns or []:
+            args.formats |= {Path(f): fmt for f in glob(str(pattern))}  # noqa: PTH207
+    args.csv_in = sorted(args.formats)
 
     return args
 
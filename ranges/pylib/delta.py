@@ -0,0 +1,152 @@
+"""
+Reuse the traits of records that did not change since an earlier parse.
+
+GBIF is downloaded again and again, and most records keep the texts that get
+parsed. The parent reads the earlier parse's JSONL file once and writes an SQLite
+index of it by record ID, with a hash of each record's parse and overwrite fields
+and where its line is. A record with the same ID and hash gets its traits copied
+from the earlier parse instead of being parsed again, the rest of the record comes
+from the new input. Records in the earlier error log are always parsed again.
+
+The workers look records up in the index so none of them reads the whole earlier
+parse. Lines are read with os.pread() so forked processes do not move each other's
+file offsets. Each process counts the records it looks up, and the parent adds up
+the counts after the parse like the profiler does.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+from collections import Counter
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from ranges.pylib import parse_errors
+
+# The hash of records that must be parsed again
+FAILED = b""
+
+
+def record_hash(
+    parse_fields: dict[str, str], overwrite_fields: dict[str, str]
+) -> bytes:
+    """Hash the fields that the traits come from."""
+    data = json.dumps([parse_fields, overwrite_fields]).encode()
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def index_path(index_dir: Path, json_file: Path) -> Path:
+    return index_dir / json_file.stem / "index.sqlite"
+
+
+def write_index(json_file: Path, id_field: str, index_dir: Path) -> int:
+    """Index an earlier parse by record ID. Return how many records it has."""
+    path = index_path(index_dir, json_file)
+    if path.parent.exists():
+        shutil.rmtree(path.parent)
+    path.parent.mkdir(parents=True)
+
+    db = sqlite3.connect(path)
+    try:
+        db.execute("create table meta (key text primary key, value text)")
+        db.execute(
+            "create table entries "
+            "(id text primary key, hash blob, offset integer, length integer)"
+        )
+        db.execute(
+            "insert into meta (key, value) values ('json_file', ?)",
+            (str(json_file.resolve()),),
+        )
+        db.executemany(
+            "insert or replace into entries (id, hash, offset, length) "
+            "values (?, ?, ?, ?)",
+            index_lines(json_file, id_field),
+        )
+
+        errors = parse_errors.read_errors(parse_errors.error_path(json_file))
+        db.executemany(
+            "update entries set hash = ? where id = ?",
+            [(FAILED, e["id"]) for e in errors],
+        )
+        db.commit()
+        (count,) = db.execute("select count(*) from entries").fetchone()
+    finally:
+        db.close()
+
+    return count
+
+
+def index_lines(
+    json_file: Path, id_field: str
+) -> Iterator[tuple[str, bytes, int, int]]:
+    offset = 0
+    with json_file.open("rb") as jin:
+        for line in jin:
+            record = json.loads(line)
+            if id_field in record:
+                hash_ = record_hash(record["parse_fields"], record["overwrite_fields"])
+                yield record[id_field], hash_, offset, len(line)
+            offset += len(line)
+
+
+class PreviousParse:
+    """Find the traits of unchanged records in an earlier parse."""
+
+    def __init__(self, index_file: Path) -> None:
+        self.index_file = index_file
+        self.db = sqlite3.connect(index_file)
+        (json_file,) = self.db.execute(
+            "select value from meta where key = 'json_file'"
+        ).fetchone()
+        self.json_file = Path(json_file)
+        self.counts = Counter(new=0, changed=0, reused=0)
+        self.fd = None
+
+    def find(self, occur: Any) -> tuple[bytes, int, int] | None:
+        """Get the index entry of a record and count it as new, changed, or reused."""
+        entry = self.db.execute(
+            "select hash, offset, length from entries where id = ?",
+            (occur.id_field[1],),
+        ).fetchone()
+        if not entry:
+            self.counts["new"] += 1
+            return None
+        if entry[0] != record_hash(occur.parse_fields, occur.overwrite_fields):
+            self.counts["changed"] += 1
+            return None
+        self.counts["reused"] += 1
+        return entry
+
+    def traits(self, occur: Any) -> list[dict[str, Any]] | None:
+        """Get the earlier traits of a record, None if the record is new or changed."""
+        if entry := self.find(occur):
+            _, offset, length = entry
+            if self.fd is None:
+                self.fd = os.open(self.json_file, os.O_RDONLY)
+            return json.loads(os.pread(self.fd, length, offset))["traits"]
+        return None
+
+    def close(self) -> None:
+        self.db.close()
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def dump(self) -> None:
+        """Write this process's counts, later dumps replace earlier ones."""
+        path = self.index_file.parent / f"{os.getpid()}.json"
+        with path.open("w") as out:
+            json.dump(self.counts, out)
+
+
+def merge_counts(index_dir: Path, json_file: Path, indexed: int) -> Counter:
+    """Add up the counts from every process, the unseen records were deleted."""
+    counts = Counter(new=0, changed=0, deleted=0, reused=0)
+    for path in sorted(index_path(index_dir, json_file).parent.glob("*.json")):
+        with path.open() as jin:
+            counts.update(json.load(jin))
+    counts["deleted"] = max(indexed - counts["changed"] - counts["reused"], 0)
+    return counts
@@ -0,0 +1,15 @@
+import json
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+
+def read_jsonl(path: Path) -> Iterator[dict[str, Any]]:
+    """Stream parsed occurrences from a JSONL file."""
+    with path.open() as jin:
+        for ln in jin:
+            yield json.loads(ln)
+
+
+def jsonl_files(json_dir: Path) -> list[Path]:
+    return sorted(json_dir.glob("*.jsonl"))
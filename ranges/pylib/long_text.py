@@ -0,0 +1,95 @@
+"""
+Split very long texts into overlapping chunks that are parsed on their own.
+
+spaCy's time and memory grow with the length of a doc, and a single huge field,
+like a transcription in fieldNotes, can stall a worker. Texts longer than the
+limit are cut at the safest boundary near the limit: a newline, then a semicolon,
+then the end of a sentence, then any space. Neighbouring chunks overlap so a trait
+cut by one boundary is whole in the other chunk.
+
+When the chunks are joined, the trait offsets are moved back onto the original
+text. Each chunk keeps the traits that start in its half of the overlaps, and a
+trait that overlaps one already kept is a duplicate and is dropped.
+"""
+
+import itertools
+import re
+from typing import Any
+
+MAX_CHARS = 20_000
+OVERLAP = 500
+
+# Safe places to cut a text, best first
+BOUNDARIES = [
+    re.compile(r"\n"),
+    re.compile(r";"),
+    re.compile(r"[.!?]\s"),
+    re.compile(r"\s"),
+]
+
+
+def split_text(
+    text: str, max_chars: int = MAX_CHARS, overlap: int = OVERLAP
+) -> list[tuple[int, str]]:
+    """Get the chunks of a text and where each one starts, short texts are whole."""
+    if max_chars <= 0 or len(text) <= max_chars:
+        return [(0, text)]
+
+    overlap = min(overlap, max_chars // 4)
+
+    chunks = []
+    start = 0
+    while len(text) - start > max_chars:
+        end = safe_end(text, start + max_chars // 2, start + max_chars)
+        chunks.append((start, text[start:end]))
+        start = safe_start(text, max(end - overlap, start + 1), end)
+    chunks.append((start, text[start:]))
+
+    return chunks
+
+
+def safe_end(text: str, low: int, high: int) -> int:
+    """Find the best boundary after low and at or before high to end a chunk."""
+    for boundary in BOUNDARIES:
+        ends = [m.end() for m in boundary.finditer(text, low, high)]
+        if ends:
+            return ends[-1]
+    return high
+
+
+def safe_start(text: str, low: int, high: int) -> int:
+    """Start the next chunk after a space so it does not begin inside a word."""
+    if match := BOUNDARIES[-1].search(text, low, high):
+        return match.end()
+    return low
+
+
+def join_traits(chunks: list[tuple[int, int, list[Any]]]) -> list[Any]:
+    """
+    Move the traits of each chunk onto the original text and drop duplicates.
+
+    The chunks are (start, length, traits) in text order.
+    """
+    if len(chunks) == 1:
+        return chunks[0][2]
+
+    # A trait belongs to the chunk that holds its start before the overlap midpoint
+    cuts = [0]
+    for (start, length, _), (next_start, _, _) in itertools.pairwise(chunks):
+        cuts.append((next_start + start + length) // 2)
+    cuts.append(chunks[-1][0] + chunks[-1][1])
+
+    joined = []
+    last_end = 0
+    for i, (start, _, traits) in enumerate(chunks):
+        for trait in sorted(traits, key=lambda t: t.start):
+            trait.start += start
+            trait.end += start
+            if not cuts[i] <= trait.start < cuts[i + 1]:
+                continue
+            if trait.start < last_end:
+                continue
+            joined.append(trait)
+            last_end = max(last_end, trait.end)
+
+    return joined
@@ -0,0 +1,96 @@
+"""
+Share the pipeline between forked workers and measure what each worker owns.
+
+A forked worker shares the parent's memory pages until it writes to them. Python
+writes to an object's header whenever the garbage collector looks at it, so the
+pages holding the model, vocab, and matchers slowly get copied into every worker.
+Build the pipeline with the collector off and freeze it before forking so that no
+process touches those objects again, then the pages stay shared.
+
+The memory numbers come from /proc/<pid>/smaps_rollup, so they are only reported
+on Linux. USS is the memory only the process uses, and PSS adds its share of the
+shared pages.
+"""
+
+import gc
+import logging
+from collections.abc import Iterable
+from pathlib import Path
+
+# smaps_rollup rows that we report, in kB
+FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Private_Clean": "uss",
+    "Private_Dirty": "uss",
+}
+
+MB = 1024
+
+
+def start_shared() -> None:
+    """Stop collecting garbage so freed objects do not leave holes in shared pages."""
+    gc.disable()
+
+
+def freeze_shared() -> None:
+    """
+    Move everything built so far out of the garbage collector's reach.
+
+    The collector is turned back on, it only looks at objects made from now on, so
+    the parent and the forked workers still free their own garbage.
+    """
+    gc.freeze()
+    gc.enable()
+
+
+def usage(pid: int | str = "self") -> dict[str, int]:
+    """Get the RSS, PSS, and USS of a process in kB, empty if it is unknown."""
+    path = Path(f"/proc/{pid}/smaps_rollup")
+    try:
+        lines = path.read_text().splitlines()
+    except OSError:
+        return {}
+
+    sizes = dict.fromkeys(FIELDS.values(), 0)
+    for line in lines:
+        key, _, value = line.partition(":")
+        if key in FIELDS:
+            sizes[FIELDS[key]] += int(value.split()[0])
+    return sizes
+
+
+class MemoryMonitor:
+    """Keep the largest memory use seen for each worker."""
+
+    def __init__(self) -> None:
+        self.peaks: dict[int, dict[str, int]] = {}
+
+    def sample(self, pids: Iterable[int]) -> None:
+        for pid in pids:
+            sizes = usage(pid)
+            peak = self.peaks.setdefault(pid, dict.fromkeys(sizes, 0))
+            for key, size in sizes.items():
+                peak[key] = max(peak[key], size)
+
+    def report(self) -> None:
+        """Log each worker's peak memory and the sum over all workers."""
+        peaks = {p: s for p, s in self.peaks.items() if s}
+        if not peaks:
+            logging.info("Worker memory is not available on this system.")
+            return
+
+        totals = dict.fromkeys(FIELDS.values(), 0)
+        for pid, sizes in sorted(peaks.items()):
+            msg = f"Worker {pid} peak memory: {as_text(sizes)}"
+            logging.info(msg)
+            for key, size in sizes.items():
+                totals[key] += size
+        msg = f"Sum of {len(peaks)} workers: {as_text(totals)}"
+        logging.info(msg)
+        msg = f"Parent memory: {as_text(usage())}"
+        logging.info(msg)
+
+
+def as_text(sizes: dict[str, int]) -> str:
+    return ", ".join(f"{k.upper()} {v // MB:,} MB" for k, v in sizes.items())
@@ -1,9 +1,17 @@
-import csv
-import random
+import itertools
+import logging
+import re
+import traceback
+from collections import defaultdict
+from collections.abc import Callable, Iterable, Iterator
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
+from ranges.pylib import long_text, parse_errors, reader, sampler
+from ranges.pylib.parse_cache import ParseCache
+from ranges.pylib.sampler import SEED
+from ranges.pylib.shard import Chunk
 from ranges.rules.base import Base
 from ranges.rules.sex import Sex
 
@@ -46,41 +54,81 @@ class Occurrence:
 
 
 def read_occurrences(
-    csv_file: Path,
+    path: Path,
     *,
     id_field: str,
     info_fields: list[str],
     parse_fields: list[str],
     overwrite_fields: list[str],
-) -> list[Occurrence]:
-    csv.field_size_limit(10_000_000)
-    source = csv_file.name
-    with csv_file.open() as in_csv:
-        reader = csv.DictReader(in_csv)
-        rows = []
-        for row in reader:
-            occur = Occurrence(
-                id_field=(id_field, row[id_field]),
+    chunk: Chunk | None = None,
+    fmt: str = "",
+) -> Iterator[Occurrence]:
+    """
+    Stream occurrences from the file using only the columns that are needed.
+
+    Rows that are too short to hold every needed column are skipped and logged.
+    """
+    source = path.name
+    skipped = 0
+    with reader.open_rows(path, chunk, fmt) as (header, rows):
+        [(_, id_index)] = reader.column_index(header, [id_field])
+        info_index = reader.column_index(header, info_fields)
+        parse_index = reader.column_index(header, parse_fields)
+        overwrite_index = reader.column_index(header, overwrite_fields)
+        indexes = info_index + parse_index + overwrite_index
+        last_column = max([id_index] + [i for _, i in indexes])
+        for row in rows:
+            if len(row) <= last_column:
+                if row:  # A blank line is not a record
+                    skipped += 1
+                continue
+            yield Occurrence(
+                id_field=(id_field, row[id_index]),
                 source=source,
-                info_fields={k: row[k] for k in info_fields},
-                parse_fields={k: row[k] for k in parse_fields},
-                overwrite_fields={k: row[k] for k in overwrite_fields},
+                info_fields={k: row[i] for k, i in info_index},
+                parse_fields={k: row[i] for k, i in parse_index},
+                overwrite_fields={k: row[i] for k, i in overwrite_index},
             )
-            rows.append(occur)
-        # rows = [
-        #     Occurrence(
-        #         id_field=(id_field, row[id_field]),
-        #         source=source,
-        #         info_fields={k: row[k] for k in info_fields},
-        #         parse_fields={k: row[k] for k in parse_fields},
-        #         overwrite_fields={k: row[k] for k in overwrite_fields},
-        #     )
-        #     for row in reader
-        # ]
-    return rows
-
-
-def parse_occurrences(occurrences: list[Occurrence], nlp: Any) -> None:
+
+    if skipped:
+        where = f"{source} chunk {chunk.index}" if chunk else source
+        msg = f"Skipped {skipped:,} rows in {where} that have too few columns"
+        logging.warning(msg)
+
+
+def read_blocks(
+    path: Path, block_size: int = 10_000, **kwargs: Any
+) -> Iterator[list[Occurrence]]:
+    """Stream fixed-size blocks of occurrences so memory is set by the block size."""
+    occurrences = read_occurrences(path, **kwargs)
+    while block := list(itertools.islice(occurrences, block_size)):
+        yield block
+
+
+def parse_occurrences(
+    occurrences: list[Occurrence],
+    nlp: Any,
+    batch_size: int = 1000,
+    cache: ParseCache | None = None,
+    gate: re.Pattern | None = None,
+    fast_path: Callable[[str], list | None] | None = None,
+    max_chars: int = 0,
+    errors: list[str] | None = None,
+) -> None:
+    """
+    Parse all fields of the occurrences in batches with nlp.pipe().
+
+    Texts that the prefilter gate says cannot have traits are not parsed. Texts that
+    the fast path can parse on its own skip spaCy, it returns None for the others.
+    Texts longer than max_chars are parsed in overlapping chunks.
+
+    When there is an errors list, a text that breaks the parser gets no traits and
+    an error line for each field that holds it is added to the list. Otherwise the
+    error is raised.
+    """
+    slots = []
+    texts = {}
+
     for occur in occurrences:
         overwritten = set()
         for overwrite_field, text in occur.overwrite_fields.items():
@@ -98,29 +146,88 @@ def parse_occurrences(occurrences: list[Occurrence], nlp: Any) -> None:
 
         for parse_field, text in occur.parse_fields.items():
             if text:
-                doc = nlp(text)
-                occur.traits[parse_field] = [
-                    e._.trait
-                    for e in doc.ents
-                    if e._.trait and e._.trait._trait not in overwritten
-                ]
+                # Reserve the slot so the field order stays the same
+                occur.traits[parse_field] = []
+                if gate and not gate.search(text):
+                    continue
+                if fast_path and (traits := fast_path(text)) is not None:
+                    occur.traits[parse_field] = remove_overwritten(traits, overwritten)
+                    continue
+                if cache and (traits := cache.get(text)) is not None:
+                    occur.traits[parse_field] = remove_overwritten(traits, overwritten)
+                else:
+                    slots.append((occur, parse_field, overwritten, text))
+                    texts[text] = []
+
+    # Repeated texts only get parsed once
+    pieces = [
+        (text, start, chunk)
+        for text in texts
+        for start, chunk in long_text.split_text(text, max_chars)
+    ]
+    failed = {} if errors is not None else None
+    docs = pipe_texts(nlp, [chunk for _, _, chunk in pieces], batch_size, failed)
+
+    chunks = defaultdict(list)
+    bad_texts = {}
+    for (text, start, chunk), doc in zip(pieces, docs, strict=True):
+        if doc is None:
+            bad_texts[text] = failed[chunk]
+            continue
+        traits = [e._.trait for e in doc.ents if e._.trait]
+        chunks[text].append((start, len(chunk), traits))
+
+    for text, text_chunks in chunks.items():
+        if text in bad_texts:
+            continue
+        texts[text] = long_text.join_traits(text_chunks)
+        if cache:
+            cache.put(text, texts[text])
+
+    for occur, parse_field, overwritten, text in slots:
+        if text in bad_texts:
+            error = parse_errors.record_error(occur, parse_field, text, bad_texts[text])
+            errors.append(error)
+        occur.traits[parse_field] = remove_overwritten(texts[text], overwritten)
+
+    if cache:
+        cache.flush()
+
+
+def pipe_texts(
+    nlp: Any, texts: list[str], batch_size: int, failed: dict[str, str] | None = None
+) -> Iterator[Any]:
+    """
+    Parse the texts with nlp.pipe().
+
+    When there is a failed dict, a batch that breaks the parser is parsed again one
+    text at a time. The texts that still fail get a None doc and their traceback is
+    put into the dict.
+    """
+    if failed is None:
+        yield from nlp.pipe(texts, batch_size=batch_size)
+        return
+
+    for i in range(0, len(texts), batch_size):
+        batch = texts[i : i + batch_size]
+        try:
+            docs = list(nlp.pipe(batch, batch_size=batch_size))
+        except Exception:  # noqa: BLE001
+            docs = []
+            for text in batch:
+                try:
+                    docs.append(nlp(text))
+                except Exception:  # noqa: BLE001
+                    failed[text] = traceback.format_exc()
+                    docs.append(None)
+        yield from docs
+
+
+def remove_overwritten(traits: list, overwritten: set[str]) -> list:
+    return [t for t in traits if t._trait not in overwritten]
 
 
 def sample_occurrences(
-    occurrences: list, sample_size: int, sample_method: str, seed: int = 93113
+    occurrences: Iterable[dict], sample_size: int, sample_method: str, seed: int = SEED
 ) -> list:
-    # Only get occurrences with data
-    if sample_method == "fields":
-        sampled = [o for o in occurrences if any(v for v in o["parse_fields"].values())]
-    else:  # elif sample_method == "traits":
-        sampled = [
-            o
-            for o in occurrences
-            if o["traits"]
-            and any(t["_field"] not in o["overwrite_fields"] for t in o["traits"])
-        ]
-    # Choose a random sample
-    if len(sampled) > sample_size:
-        random.seed(seed)
-        sampled = random.sample(sampled, sample_size)
-    return sampled
+    return sampler.reservoir_sample(occurrences, sample_size, sample_method, seed)
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import logging
+import sqlite3
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from ranges.rules.base import Base
+
+
+@dataclass
+class CachedTrait:
+    """A trait restored from the parse cache instead of from a spaCy parse."""
+
+    _trait: str
+    start: int
+    end: int
+    fields: dict[str, dict[str, Any]]
+
+    def as_dict(self) -> dict[str, dict[str, Any]]:
+        # Callers update the returned dicts so hand out copies
+        return {k: dict(v) for k, v in self.fields.items()}
+
+    @classmethod
+    def from_trait(cls, trait: "Base | CachedTrait") -> "CachedTrait":
+        return cls(
+            _trait=trait._trait,
+            start=trait.start,
+            end=trait.end,
+            fields=trait.as_dict(),
+        )
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "_trait": self._trait,
+            "start": self.start,
+            "end": self.end,
+            "fields": self.fields,
+        }
+
+
+class ParseCache:
+    """
+    Memoize parses of field texts.
+
+    Keys are a hash of the pipeline fingerprint and the text. There is a bounded
+    in-memory LRU tier and an optional SQLite tier that persists between runs.
+    Parses made by other pipelines stay on disk until they are pruned.
+    """
+
+    def __init__(
+        self, fingerprint: str, max_size: int = 100_000, db_path: Path | None = None
+    ) -> None:
+        self.fingerprint = fingerprint
+        self.max_size = max_size
+        self.memory: OrderedDict[str, list[CachedTrait]] = OrderedDict()
+        self.pending: dict[str, str] = {}
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self.db = None
+        if db_path:
+            self.db = sqlite3.connect(db_path, timeout=120)
+            self.db.execute("pragma journal_mode = wal")
+            self.db.execute(
+                "create table if not exists parses "
+                "(key text primary key, fingerprint text, traits text)"
+            )
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.fingerprint}\0{text}".encode()).hexdigest()
+
+    def get(self, text: str) -> list[CachedTrait] | None:
+        key = self.key(text)
+
+        if (traits := self.memory.get(key)) is not None:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return traits
+
+        if self.db and (row := self.fetch(key)):
+            traits = [CachedTrait(**t) for t in json.loads(row)]
+            self.remember(key, traits)
+            self.disk_hits += 1
+            return traits
+
+        self.misses += 1
+        return None
+
+    def put(self, text: str, traits: list[Base | CachedTrait]) -> None:
+        key = self.key(text)
+        cached = [CachedTrait.from_trait(t) for t in traits]
+        self.remember(key, cached)
+        if self.db:
+            self.pending[key] = json.dumps([t.to_json() for t in cached])
+
+    def remember(self, key: str, traits: list[CachedTrait]) -> None:
+        if self.max_size <= 0:
+            return
+        self.memory[key] = traits
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_size:
+            self.memory.popitem(last=False)
+
+    def fetch(self, key: str) -> str | None:
+        if row := self.pending.get(key):
+            return row
+        cursor = self.db.execute("select traits from parses where key = ?", (key,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def flush(self) -> None:
+        """Write new parses to the disk tier in one transaction."""
+        if not self.db or not self.pending:
+            return
+        self.db.executemany(
+            "insert or ignore into parses (key, fingerprint, traits) values (?, ?, ?)",
+            [(k, self.fingerprint, v) for k, v in self.pending.items()],
+        )
+        self.db.commit()
+        self.pending = {}
+
+    def log_stats(self, name: str) -> None:
+        total = self.hits + self.disk_hits + self.misses
+        rate = (self.hits + self.disk_hits) / total if total else 0.0
+        msg = (
+            f"Parse cache for {name}: {self.hits} memory hits, "
+            f"{self.disk_hits} disk hits, {self.misses} misses ({rate:0.1%} hit rate)"
+        )
+        logging.info(msg)
+
+    def reset_stats(self) -> None:
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+
+def prune(db_path: Path, fingerprint: str) -> int:
+    """Remove parses made by other pipelines from the disk cache."""
+    if not db_path.exists():
+        return 0
+    db = sqlite3.connect(db_path, timeout=120)
+    try:
+        cursor = db.execute(
+            "delete from parses where fingerprint is not ?", (fingerprint,)
+        )
+        db.commit()
+        db.execute("vacuum")
+        return cursor.rowcount
+    finally:
+        db.close()
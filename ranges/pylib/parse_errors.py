@@ -0,0 +1,95 @@
+"""
+Keep one bad record from failing the parse of a whole file.
+
+A text that breaks the parser gets no traits, and so does a record whose traits
+cannot be written, the rest of the file is written as usual. Each error goes to a
+side-car JSONL file in the errors directory next to the output with the record ID,
+the field, a hash of the text, and the traceback. It is in its own directory so it
+is not read as occurrences. parse_gbif.py --retry-failed parses only those records
+again.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Self
+
+from ranges.pylib import jsonl
+
+ERROR_DIR = "errors"
+
+
+def error_path(json_file: Path) -> Path:
+    return json_file.parent / ERROR_DIR / json_file.name
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def record_error(occur: Any, field: str | None, text: str, error: str) -> str:
+    """Get the JSON line of an error in a field of an occurrence."""
+    record = {
+        "source": occur.source,
+        "id_field": occur.id_field[0],
+        "id": occur.id_field[1],
+        "field": field,
+        "text_hash": text_hash(text) if text else None,
+        "error": error,
+    }
+    return json.dumps(record) + "\n"
+
+
+def read_errors(path: Path) -> list[dict[str, Any]]:
+    return list(jsonl.read_jsonl(path)) if path.exists() else []
+
+
+class ErrorLog:
+    """
+    Write error lines to a side-car file that only exists if there are errors.
+
+    A resumed log keeps the given number of bytes of the old log.
+    """
+
+    def __init__(self, path: Path, keep: int = 0) -> None:
+        self.path = path
+        if keep and self.path.exists():
+            os.truncate(self.path, keep)
+        else:
+            self.path.unlink(missing_ok=True)
+        self.out = None
+        self.count = 0
+
+    def write(self, lines: str) -> None:
+        if not lines:
+            return
+        if not self.out:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.out = self.path.open("a")
+        self.out.write(lines)
+        self.count += lines.count("\n")
+
+    def sync(self) -> int:
+        """Get the errors on disk. Return the size of the log."""
+        if not self.out:
+            return self.path.stat().st_size if self.path.exists() else 0
+        self.out.flush()
+        os.fsync(self.out.fileno())
+        return os.fstat(self.out.fileno()).st_size
+
+    def close(self) -> None:
+        if self.out:
+            self.out.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
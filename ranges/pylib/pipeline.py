@@ -1,14 +1,27 @@
+import hashlib
+import json
+import logging
+import os
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from functools import cache
+from importlib import metadata
+from pathlib import Path
+from typing import Any
+
 import spacy
 from spacy.language import Language
 from traiter.pipes import extensions
+from traiter.rules import terms as t_terms
 from traiter.rules.date_ import Date
 from traiter.rules.elevation import Elevation
 from traiter.rules.lat_long import LatLong
 from traiter.rules.number import Number
 from traiter.rules.uuid import Uuid
 
-from ranges.pylib import tokenizer
-from ranges.rules import delete
+from ranges.pylib import term_index, tokenizer
+from ranges.rules import base_length, delete, number_cache, terms
+from ranges.rules.base import Base
 from ranges.rules.body_mass import BodyMass
 from ranges.rules.calcar_length import CalcarLength
 from ranges.rules.ear_length import EarLength
@@ -33,84 +46,367 @@ from ranges.rules.total_length import TotalLength
 from ranges.rules.tragus_length import TragusLength
 from ranges.rules.vagina_state import VaginaState
 
-
-def build() -> Language:
-    nlp = init_pipe()
+TERM_DIR = Path(terms.__file__).parent
+RULE_DIR = Path(delete.__file__).parent
+TRAITER_DIR = Path(extensions.__file__).parents[1]
+
+PIPELINE_ENV = "RANGES_PIPELINE"
+PIPELINE_STAMP = "ranges_stamp.json"
+
+BASE_ENV = "RANGES_BASE"
+BASES = ["md", "tagger", "blank"]
+
+NUMBER_CACHE_ENV = "RANGES_NUMBER_CACHE"
+SHARED_LENGTHS_ENV = "RANGES_SHARED_LENGTHS"
+
+
+# Rules in pipeline order. The flag is for rules that get a fresh Number.pipe
+RULES: dict[str, tuple[type[Base], bool]] = {
+    "length_shorthand": (LengthShorthand, True),
+    "body_mass": (BodyMass, True),
+    "placental_scar_count": (PlacentalScarCount, True),
+    "embryo": (Embryo, True),
+    "ear_length": (EarLength, True),
+    "forearm_length": (ForearmLength, True),
+    "thumb_length": (ThumbLength, True),
+    "calcar_length": (CalcarLength, True),
+    "tragus_length": (TragusLength, True),
+    "hind_foot_length": (HindFootLength, True),
+    "female_state_shorthand": (FemaleStateShorthand, True),
+    "mammary": (Mammary, True),
+    "nipple": (Nipple, True),
+    "lactation_state": (LactationState, False),
+    "pregnancy_state": (PregnancyState, False),
+    "testicle": (Testicle, True),
+    "ovary": (Ovary, True),
+    "gonad": (Gonad, True),
+    "vagina_state": (VaginaState, False),
+    "tail_length": (TailLength, False),
+    "total_length": (TotalLength, True),
+    "life_stage": (LifeStage, False),
+    "sex": (Sex, False),
+}
+
+# Rules that use the traits of other rules
+REQUIRES = {
+    "gonad": {"testicle", "ovary"},
+}
+
+# Rules without a fresh Number.pipe that use the numbers left by the last rule that
+# has one
+USES_NUMBERS = {"tail_length", "life_stage"}
+
+# Length rules, next to each other in RULES, that can share one length term pipe
+SHARED_LENGTHS = {
+    "ear_length",
+    "forearm_length",
+    "thumb_length",
+    "calcar_length",
+    "tragus_length",
+    "hind_foot_length",
+}
+
+
+def build(
+    traits: Iterable[str] | None = None,
+    base: str | None = None,
+    *,
+    cache_numbers: bool | None = None,
+    shared_lengths: bool | None = None,
+) -> Language:
+    """
+    Build a pipeline for the traits, an empty selection builds every trait.
+
+    With the number cache only the first Number.pipe finds numbers, the later ones
+    are replaced by a pipe that puts back the cached numbers.
+
+    With shared lengths the selected rules in SHARED_LENGTHS find their terms with
+    one term pipe. They still run in order, each with its own numbers and pipes.
+    """
+    selected = select_rules(traits)
+    cache_numbers = use_number_cache(cache_numbers=cache_numbers)
+    cached = False
+    term_pipes = {}
+
+    shared = []
+    if use_shared_lengths(shared_lengths=shared_lengths):
+        shared = [r for n, (r, _) in RULES.items() if n in selected & SHARED_LENGTHS]
+
+    nlp = init_pipe(base)
 
     Uuid.pipe(nlp)
     Date.pipe(nlp)
     Elevation.pipe(nlp)
     LatLong.pipe(nlp)
 
-    Number.pipe(nlp)
-    LengthShorthand.pipe(nlp)
-
-    Number.pipe(nlp)
-    BodyMass.pipe(nlp)
-
-    Number.pipe(nlp)
-    PlacentalScarCount.pipe(nlp)
-
-    Number.pipe(nlp)
-    Embryo.pipe(nlp)
-
-    Number.pipe(nlp)
-    EarLength.pipe(nlp)
-
-    Number.pipe(nlp)
-    ForearmLength.pipe(nlp)
-
-    Number.pipe(nlp)
-    ThumbLength.pipe(nlp)
-
-    Number.pipe(nlp)
-    CalcarLength.pipe(nlp)
-
-    Number.pipe(nlp)
-    TragusLength.pipe(nlp)
-
-    Number.pipe(nlp)
-    HindFootLength.pipe(nlp)
-
-    Number.pipe(nlp)
-    FemaleStateShorthand.pipe(nlp)
-
-    Number.pipe(nlp)
-    Mammary.pipe(nlp)
-
-    Number.pipe(nlp)
-    Nipple.pipe(nlp)
-
-    LactationState.pipe(nlp)
-    PregnancyState.pipe(nlp)
-
-    Number.pipe(nlp)
-    Testicle.pipe(nlp)
-
-    Number.pipe(nlp)
-    Ovary.pipe(nlp)
-
-    Number.pipe(nlp)
-    Gonad.pipe(nlp)
-
-    VaginaState.pipe(nlp)
-
-    TailLength.pipe(nlp)
-    Number.pipe(nlp)
-
-    TotalLength.pipe(nlp)
-
-    LifeStage.pipe(nlp)
-    Sex.pipe(nlp)
+    numbered = None  # The last rule with a fresh Number.pipe, selected or not
+    for name, (rule, number) in RULES.items():
+        # Rules that use the numbers of an unselected rule need their own
+        borrowed = name in USES_NUMBERS and numbered not in selected
+        if number:
+            numbered = name
+        if name not in selected:
+            continue
+        if number or borrowed:
+            if cached:
+                number_cache.pipe_restore(nlp)
+            else:
+                Number.pipe(nlp)
+                if cache_numbers:
+                    number_cache.pipe_cache(nlp)
+                    cached = True
+
+        if rule in shared:
+            if rule is shared[0]:
+                with record_term_pipes(nlp, shared, term_pipes):
+                    base_length.shared_term_pipe(nlp, shared)
+            rule.shared_pipe(nlp, shared)
+        else:
+            with record_term_pipes(nlp, [rule], term_pipes):
+                rule.pipe(nlp)
+
+    nlp.meta[term_index.META_KEY] = term_pipes
 
     delete.pipe(nlp)
 
     return nlp
 
 
-def init_pipe() -> Language:
+@contextmanager
+def record_term_pipes(
+    nlp: Language, rules: list[type[Base]], term_pipes: dict[str, list[str]]
+) -> Iterator[None]:
+    """Record the term CSVs of the term pipes the rules add, for the term index."""
+    before = set(nlp.pipe_names)
+    yield
+    paths = [str(p) for rule in rules for p in term_index.rule_csvs(rule)]
+    for name in nlp.pipe_names:
+        if name not in before and name.endswith("_terms"):
+            term_pipes[name] = list(dict.fromkeys(paths))
+
+
+def select_rules(traits: Iterable[str] | None = None) -> set[str]:
+    """Add the rules that the selected traits depend on."""
+    selected = set(traits or RULES)
+
+    if unknown := selected - RULES.keys():
+        msg = f"Unknown traits: {', '.join(sorted(unknown))}"
+        raise ValueError(msg)
+
+    stack = list(selected)
+    while stack:
+        for required in REQUIRES.get(stack.pop(), set()):
+            if required not in selected:
+                selected.add(required)
+                stack.append(required)
+
+    return selected
+
+
+def fingerprint(nlp: Language) -> str:
+    """
+    Identify a pipeline so that stale parses can be detected.
+
+    It hashes the pipe names and order, the pipe configs (which hold the compiled
+    patterns), the contents of the term CSVs, and the package versions.
+    """
+    hasher = hashlib.sha256()
+
+    data = {
+        "pipes": nlp.pipe_names,
+        "components": {n: nlp.config["components"].get(n) for n in nlp.pipe_names},
+        "model": [nlp.meta.get("name"), nlp.meta.get("version")],
+        "version": package_version(),
+        "spacy": spacy.__version__,
+        "traiter": package_version("traiter"),
+    }
+    hasher.update(json.dumps(data, sort_keys=True, default=str).encode())
+
+    for path in term_csvs():
+        hasher.update(path.name.encode())
+        hasher.update(path.read_bytes())
+
+    return hasher.hexdigest()
+
+
+def term_csvs() -> list[Path]:
+    """Get every term CSV the rules may load."""
+    paths = sorted(TERM_DIR.glob("*.csv"))
+    paths += sorted(Path(t_terms.__file__).parent.glob("*.csv"))
+    return paths
+
+
+def package_version(package: str = "PowerRANGES") -> str:
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def source_fingerprint(
+    traits: Iterable[str] | None = None, base: str | None = None
+) -> str:
+    """
+    Identify the sources a pipeline is built from without building it.
+
+    It hashes the selected rules, the base model, the package versions, the term
+    CSVs, the code that builds the pipeline, and which traiter is installed.
+    """
+    hasher = hashlib.sha256()
+
+    data = {
+        "rules": sorted(select_rules(traits)),
+        "base": base_name(base),
+        "number_cache": use_number_cache(),
+        "shared_lengths": use_shared_lengths(),
+        "model": package_version("en_core_web_md"),
+        "spacy": spacy.__version__,
+        "traiter": traiter_signature(),
+    }
+    hasher.update(json.dumps(data, sort_keys=True).encode())
+
+    paths = term_csvs()
+    paths += [Path(__file__), Path(tokenizer.__file__)]
+    paths += sorted(RULE_DIR.glob("*.py"))
+    for path in paths:
+        hasher.update(path.name.encode())
+        hasher.update(path.read_bytes())
+
+    return hasher.hexdigest()
+
+
+@cache
+def traiter_signature() -> str:
+    """
+    Identify the installed traiter without reading all of its code.
+
+    A release is known by its version and a git install by its commit. An editable
+    install can change without either changing so the sizes and times of its files
+    are used.
+    """
+    try:
+        dist = metadata.distribution("traiter")
+    except metadata.PackageNotFoundError:
+        dist = None
+
+    direct_url = json.loads((dist and dist.read_text("direct_url.json")) or "{}")
+    if dist and not direct_url.get("dir_info", {}).get("editable"):
+        return json.dumps([dist.version, direct_url], sort_keys=True)
+
+    files = []
+    for path in sorted(TRAITER_DIR.rglob("*.py")):
+        stat = path.stat()
+        files.append(
+            [str(path.relative_to(TRAITER_DIR)), stat.st_size, stat.st_mtime_ns]
+        )
+    return hashlib.sha256(json.dumps(files).encode()).hexdigest()
+
+
+def save(
+    nlp: Language,
+    pipeline_dir: Path,
+    traits: Iterable[str] | None = None,
+    base: str | None = None,
+) -> None:
+    """Save a built pipeline with a stamp of what it was built from."""
+    nlp.to_disk(pipeline_dir)
+    stamp = {
+        "source": source_fingerprint(traits, base),
+        "base": base_name(base),
+        "fingerprint": fingerprint(nlp),
+        "rules": sorted(select_rules(traits)),
+    }
+    with (pipeline_dir / PIPELINE_STAMP).open("w") as out:
+        json.dump(stamp, out, indent=4)
+
+
+def is_saved(
+    pipeline_dir: Path, traits: Iterable[str] | None = None, base: str | None = None
+) -> bool:
+    """Check if the saved pipeline was built from the current sources."""
+    return bool(read_saved_stamp(pipeline_dir, traits, base))
+
+
+def read_saved_stamp(
+    pipeline_dir: Path | None = None,
+    traits: Iterable[str] | None = None,
+    base: str | None = None,
+) -> dict[str, Any]:
+    """Read the stamp of a saved pipeline if it was built from the current sources."""
+    if not pipeline_dir and os.environ.get(PIPELINE_ENV):
+        pipeline_dir = Path(os.environ[PIPELINE_ENV])
+    path = pipeline_dir / PIPELINE_STAMP if pipeline_dir else None
+    if not path or not path.exists():
+        return {}
+    with path.open() as jin:
+        stamp = json.load(jin)
+    return stamp if stamp.get("source") == source_fingerprint(traits, base) else {}
+
+
+def load(
+    traits: Iterable[str] | None = None,
+    pipeline_dir: Path | None = None,
+    base: str | None = None,
+) -> Language:
+    """
+    Load a saved pipeline or build it when there is none or it is stale.
+
+    The pipeline directory comes from the argument or the RANGES_PIPELINE
+    environment variable.
+    """
+    if not pipeline_dir and os.environ.get(PIPELINE_ENV):
+        pipeline_dir = Path(os.environ[PIPELINE_ENV])
+
+    if pipeline_dir and is_saved(pipeline_dir, traits, base):
+        extensions.add_extensions()
+        return spacy.load(pipeline_dir)
+
+    if pipeline_dir:
+        msg = f"The pipeline in {pipeline_dir} is missing or stale, building it"
+        logging.warning(msg)
+
+    return build(traits, base)
+
+
+def base_name(base: str | None = None) -> str:
+    """Get the base model from the argument or the RANGES_BASE variable."""
+    base = base or os.environ.get(BASE_ENV) or "md"
+    if base not in BASES:
+        msg = f"Unknown base model: {base}"
+        raise ValueError(msg)
+    return base
+
+
+def use_number_cache(*, cache_numbers: bool | None = None) -> bool:
+    """Get the number cache flag from the argument or the environment."""
+    if cache_numbers is not None:
+        return cache_numbers
+    return os.environ.get(NUMBER_CACHE_ENV, "") not in ("", "0")
+
+
+def use_shared_lengths(*, shared_lengths: bool | None = None) -> bool:
+    """Get the shared length terms flag from the argument or the environment."""
+    if shared_lengths is not None:
+        return shared_lengths
+    return os.environ.get(SHARED_LENGTHS_ENV, "") not in ("", "0")
+
+
+def init_pipe(base: str | None = None) -> Language:
+    """
+    Start a pipeline from a base model.
+
+    "md" is en_core_web_md without NER. "tagger" also leaves out the parser and
+    lemmatizer but keeps the part-of-speech tags used by some patterns. "blank"
+    only has the tokenizer, it is the smallest and fastest.
+    """
     extensions.add_extensions()
-    nlp = spacy.load("en_core_web_md", exclude=["ner"])
+    match base_name(base):
+        case "blank":
+            nlp = spacy.blank("en")
+        case "tagger":
+            nlp = spacy.load("en_core_web_md", exclude=["ner", "parser", "lemmatizer"])
+        case _:
+            nlp = spacy.load("en_core_web_md", exclude=["ner"])
     tokenizer.setup(nlp)
     return nlp
 
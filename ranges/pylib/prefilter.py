@@ -0,0 +1,160 @@
+"""
+A fast gate that skips the spaCy pipeline for texts that cannot hold any traits.
+
+A text can only get a trait if it has a number, a term from one of the rules' term
+CSVs, a word that the rules' patterns match literally (like "hatching"), or a female
+state shorthand (like "OSL"). The gate is one regular expression that looks for any
+of them. It is conservative: multi-word terms only need their longest word to be
+present. Terms that only block other matches are left out.
+Verify the gate on a corpus with `benchmark.py --benchmark prefilter`.
+"""
+
+import re
+from pathlib import Path
+from typing import Any
+
+from traiter.pylib.pattern_compiler import Compiler
+
+from ranges.pylib import term_index
+from ranges.rules import terms
+from ranges.rules.body_mass import BodyMass
+from ranges.rules.calcar_length import CalcarLength
+from ranges.rules.ear_length import EarLength
+from ranges.rules.embryo import Embryo
+from ranges.rules.forearm_length import ForearmLength
+from ranges.rules.gonad import Gonad
+from ranges.rules.hind_foot_length import HindFootLength
+from ranges.rules.lactation_state import LactationState
+from ranges.rules.length_shorthand import LengthShorthand
+from ranges.rules.life_stage import LifeStage
+from ranges.rules.mammary import Mammary
+from ranges.rules.nipple import Nipple
+from ranges.rules.ovary import Ovary
+from ranges.rules.placenta_scar_count import PlacentalScarCount
+from ranges.rules.pregnancy_state import PregnancyState
+from ranges.rules.sex import Sex
+from ranges.rules.tail_length import TailLength
+from ranges.rules.testicle import Testicle
+from ranges.rules.thumb_length import ThumbLength
+from ranges.rules.total_length import TotalLength
+from ranges.rules.tragus_length import TragusLength
+from ranges.rules.vagina_state import VaginaState
+
+RULES = [
+    BodyMass,
+    CalcarLength,
+    EarLength,
+    Embryo,
+    ForearmLength,
+    Gonad,
+    HindFootLength,
+    LactationState,
+    LengthShorthand,
+    LifeStage,
+    Mammary,
+    Nipple,
+    Ovary,
+    PlacentalScarCount,
+    PregnancyState,
+    Sex,
+    TailLength,
+    Testicle,
+    ThumbLength,
+    TotalLength,
+    TragusLength,
+    VaginaState,
+]
+
+# These labels only stop other matches, they never start a trait
+BLOCKERS = {"bad", "bad_prefix", "bad_suffix", "not_sex"}
+
+DIGIT = r"\d"
+
+# FemaleStateShorthand matches tokens with a regex, not with terms
+SHORTHAND = r"(?<![^\W\d_])[oc][smel][ln](ac)?(?![^\W\d_])"
+
+LETTERS = re.compile(r"[^\W\d_]+")
+
+# Decoder token attributes that match literal text
+LITERALS = ["LOWER", "TEXT", "NORM", "ORTH"]
+
+
+def build() -> re.Pattern:
+    keys = term_keys(rule_csvs()) | decoder_words(RULES)
+    alternatives = [DIGIT, SHORTHAND]
+    alternatives += [key_regex(k) for k in sorted(keys, key=lambda k: (-len(k), k))]
+    return re.compile("|".join(alternatives), flags=re.IGNORECASE)
+
+
+def rule_csvs() -> list[Path]:
+    """Get the term CSVs the rules load in the order they are first used."""
+    paths = {}
+    for rule in RULES:
+        for path in term_index.rule_csvs(rule):
+            paths[path] = True
+    return list(paths)
+
+
+def term_keys(paths: list[Path]) -> set[str]:
+    """Get a piece of every term that must be in the text for the term to match."""
+    keys = set()
+    for path in paths:
+        for term in terms.read_terms(path):
+            if term["label"] in BLOCKERS:
+                continue
+            pattern = term["pattern"].lower()
+            if any(c.isdigit() for c in pattern):
+                continue  # The digit check already lets it through
+            words = LETTERS.findall(pattern)
+            keys.add(max(words, key=len) if words else pattern.strip())
+    keys.discard("")
+    return keys
+
+
+def decoder_words(rules: list[type]) -> set[str]:
+    """
+    Get the words that the rules' patterns match literally instead of as terms.
+
+    Regular expression tokens are left out. The patterns that use them also need a
+    number or a term, except for the female state shorthand which has its own check.
+    """
+    words = set()
+    for rule in rules:
+        for compiler in rule_compilers(rule):
+            for token in compiler.decoder.values():
+                for attr in LITERALS:
+                    words |= {w.lower() for w in literals(token.get(attr))}
+    return words
+
+
+def rule_compilers(rule: type) -> list[Compiler]:
+    """Get the compilers from every *_patterns method of a rule and its bases."""
+    names = {
+        n for k in rule.__mro__ if k.__module__.startswith("ranges.") for n in vars(k)
+    }
+    compilers = []
+    for name in sorted(n for n in names if n.endswith("_patterns")):
+        found = getattr(rule, name)()
+        compilers += found if isinstance(found, list) else [found]
+    return compilers
+
+
+def literals(value: Any) -> list[str]:
+    """Get the words from a token attribute like "after" or {"IN": ["hatching"]}."""
+    if isinstance(value, dict):
+        value = value.get("IN", [])
+    elif isinstance(value, str):
+        value = [value]
+    else:
+        return []
+    return [v for v in value if LETTERS.search(v)]
+
+
+def key_regex(key: str) -> str:
+    """Letters in a key must not be part of a longer word, the tokenizer won't."""
+    regex = re.escape(key)
+    if LETTERS.match(key[0]):
+        regex = r"(?<![^\W\d_])" + regex
+    if LETTERS.match(key[-1]):
+        regex += r"(?![^\W\d_])"
+    return regex
@@ -0,0 +1,193 @@
+"""
+Time every component of a spaCy pipeline.
+
+Each component is wrapped so that its calls, wall time, and the number of entities
+going in and out are recorded. Every process dumps its own stats and the dumps are
+merged into one ranked report.
+
+Percentiles come from a reservoir sample of the times of single docs, so they are
+approximate. Components that take batches are only timed per batch, so every
+SAMPLE_EVERY-th doc is run through them on its own to sample its time, and their
+percentiles are for unbatched calls.
+"""
+
+import csv
+import json
+import os
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+from spacy import util
+from spacy.language import Language
+from spacy.tokens import Doc
+
+from ranges.pylib.sampler import Reservoir
+
+SAMPLES = 1000
+SAMPLE_EVERY = 100
+
+PERCENTILES = {"p50": 0.50, "p90": 0.90, "p99": 0.99}
+
+
+@dataclass
+class Stats:
+    calls: int = 0
+    seconds: float = 0.0
+    ents_in: int = 0
+    ents_out: int = 0
+    samples: Reservoir = field(default_factory=lambda: Reservoir(SAMPLES))
+
+    def record(self, seconds: float, docs: int, ents_in: int, ents_out: int) -> None:
+        self.calls += docs
+        self.seconds += seconds
+        self.ents_in += ents_in
+        self.ents_out += ents_out
+
+    def sample(self, seconds: float) -> None:
+        """Keep the time of a single doc for the percentiles."""
+        self.samples.add(seconds)
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "seconds": self.seconds,
+            "ents_in": self.ents_in,
+            "ents_out": self.ents_out,
+            "samples": self.samples.items,
+        }
+
+
+class Profiled:
+    """Wrap a pipeline component and time it."""
+
+    def __init__(self, component: Any, stats: Stats) -> None:
+        self.component = component
+        self.stats = stats
+        self.seen = 0  # Docs given to a batched component
+
+    def __call__(self, doc: Doc, **kwargs: Any) -> Doc:
+        ents_in = len(doc.ents)
+        start = perf_counter()
+        doc = self.component(doc, **kwargs)
+        seconds = perf_counter() - start
+        self.stats.record(seconds, 1, ents_in, len(doc.ents))
+        self.stats.sample(seconds)
+        return doc
+
+    def pipe(
+        self, docs: Iterable[Doc], batch_size: int = 1000, **kwargs: Any
+    ) -> Iterator[Doc]:
+        # Pull each batch from the upstream components before starting the clock
+        for batch in util.minibatch(docs, batch_size):
+            if hasattr(self.component, "pipe"):
+                yield from self.pipe_batch(batch, batch_size, **kwargs)
+            else:
+                yield from (self(d) for d in batch)
+
+    def pipe_batch(self, batch: list[Doc], batch_size: int, **kwargs: Any) -> list[Doc]:
+        """Time the batch as a whole, except for the docs sampled on their own."""
+        singles = {i for i in range(len(batch)) if (self.seen + i) % SAMPLE_EVERY == 0}
+        self.seen += len(batch)
+
+        out = {i: self(d) for i, d in enumerate(batch) if i in singles}
+
+        rest = [d for i, d in enumerate(batch) if i not in singles]
+        ents_in = sum(len(d.ents) for d in rest)
+        start = perf_counter()
+        parsed = list(self.component.pipe(rest, batch_size=batch_size, **kwargs))
+        seconds = perf_counter() - start
+        ents_out = sum(len(d.ents) for d in parsed)
+        self.stats.record(seconds, len(parsed), ents_in, ents_out)
+
+        rest_index = (i for i in range(len(batch)) if i not in singles)
+        out |= dict(zip(rest_index, parsed, strict=True))
+        return [out[i] for i in range(len(batch))]
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.component, name)
+
+
+class Profiler:
+    def __init__(self, nlp: Language) -> None:
+        self.stats: dict[str, Stats] = {}
+        # nlp.replace_pipe() makes a new component from the factory, so it cannot
+        # wrap the built one. Swapping the entry in the list keeps the pipe names,
+        # configs, and order that spaCy reports.
+        for i, (name, component) in enumerate(nlp._components):
+            self.stats[name] = Stats()
+            nlp._components[i] = (name, Profiled(component, self.stats[name]))
+
+    def dump(self, profile_dir: Path) -> None:
+        """Write this process's stats, later dumps replace earlier ones."""
+        path = profile_dir / f"{os.getpid()}.json"
+        with path.open("w") as out:
+            json.dump({k: v.to_json() for k, v in self.stats.items()}, out)
+
+
+def merge_dumps(profile_dir: Path) -> dict[str, dict[str, Any]]:
+    """Add up the stats from every process."""
+    merged = {}
+    for path in sorted(profile_dir.glob("*.json")):
+        with path.open() as jin:
+            dump = json.load(jin)
+        for name, stats in dump.items():
+            total = merged.setdefault(
+                name,
+                {
+                    "calls": 0,
+                    "seconds": 0.0,
+                    "ents_in": 0,
+                    "ents_out": 0,
+                    "samples": [],
+                },
+            )
+            for key, value in stats.items():
+                total[key] += value
+    return merged
+
+
+def report(merged: dict[str, dict[str, Any]]) -> list[dict[str, Any]]:
+    """Rank the components by their total time."""
+    all_seconds = sum(s["seconds"] for s in merged.values()) or 1.0
+    rows = []
+    for name, stats in merged.items():
+        samples = sorted(stats["samples"])
+        row = {
+            "component": name,
+            "calls": stats["calls"],
+            "total_seconds": round(stats["seconds"], 6),
+            "percent": round(100.0 * stats["seconds"] / all_seconds, 2),
+            "mean_ms": round(1000.0 * stats["seconds"] / (stats["calls"] or 1), 6),
+        }
+        for key, quantile in PERCENTILES.items():
+            row[f"{key}_ms"] = round(1000.0 * percentile(samples, quantile), 6)
+        row["ents_in"] = stats["ents_in"]
+        row["ents_out"] = stats["ents_out"]
+        rows.append(row)
+
+    rows = sorted(rows, key=lambda r: r["total_seconds"], reverse=True)
+    return [{"rank": i, **r} for i, r in enumerate(rows, 1)]
+
+
+def percentile(samples: list[float], quantile: float) -> float:
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(quantile * len(samples)))]
+
+
+def write_report(profile_dir: Path, report_stem: Path) -> None:
+    """Write the ranked report as both CSV and JSON files."""
+    rows = report(merge_dumps(profile_dir))
+    if not rows:
+        return
+
+    with report_stem.with_suffix(".json").open("w") as out:
+        json.dump(rows, out, indent=4)
+
+    with report_stem.with_suffix(".csv").open("w", newline="") as out:
+        writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
@@ -0,0 +1,150 @@
+"""
+Read raw rows from occurrence files.
+
+Supported formats are CSV files, GBIF tab-separated occurrence.txt files, and
+Darwin Core Archive zip files, which are read without extracting them. Rows are
+lists of strings so only the projected columns need to be looked at.
+"""
+
+import csv
+import io
+import xml.etree.ElementTree as ET
+import zipfile
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, TextIO
+
+if TYPE_CHECKING:
+    from ranges.pylib.shard import Chunk
+
+Rows = tuple[list[str], Iterator[list[str]]]
+
+DWC_META = "meta.xml"
+DWC_CORE = "occurrence.txt"
+
+
+def file_format(path: Path) -> str:
+    """Guess the file format from the file's contents when it is not given."""
+    if zipfile.is_zipfile(path):
+        return "dwca"
+    with path.open(newline="") as fin:
+        header = fin.readline()
+    return "tsv" if "\t" in header else "csv"
+
+
+@contextmanager
+def open_rows(
+    path: Path, chunk: "Chunk | None" = None, fmt: str = ""
+) -> Iterator[Rows]:
+    """Open a file and return its header and an iterator over its rows."""
+    csv.field_size_limit(10_000_000)
+    match fmt or (chunk and chunk.fmt) or file_format(path):
+        case "dwca":
+            with open_archive(path) as rows:
+                yield rows
+        case "tsv":
+            with path.open(newline="") as fin:
+                yield text_rows(fin, chunk, delimiter="\t", quoting=csv.QUOTE_NONE)
+        case _:
+            with path.open(newline="") as fin:
+                yield text_rows(fin, chunk)
+
+
+def text_rows(fin: TextIO, chunk: "Chunk | None" = None, **kwargs: object) -> Rows:
+    header = next(csv.reader(fin, **kwargs))
+    lines = chunk_lines(fin, chunk) if chunk else fin
+    return header, csv.reader(lines, **kwargs)
+
+
+def chunk_lines(fin: TextIO, chunk: "Chunk") -> Iterator[str]:
+    """Read only the lines in the chunk."""
+    fin.buffer.seek(chunk.start)
+    remaining = chunk.end - chunk.start
+    while remaining > 0 and (line := fin.buffer.readline(remaining)):
+        remaining -= len(line)
+        yield line.decode(fin.encoding)
+
+
+@contextmanager
+def open_archive(path: Path) -> Iterator[Rows]:
+    """Read the core file of a Darwin Core Archive straight from the zip file."""
+    with zipfile.ZipFile(path) as archive:
+        core = archive_core(archive)
+        with (
+            archive.open(core["location"]) as raw,
+            io.TextIOWrapper(raw, encoding=core["encoding"], newline="") as fin,
+        ):
+            kwargs = {"delimiter": core["delimiter"]}
+            if core["quote"]:
+                kwargs["quotechar"] = core["quote"]
+            else:
+                kwargs["quoting"] = csv.QUOTE_NONE
+
+            reader = csv.reader(fin, **kwargs)
+
+            header = core["header"]
+            for _ in range(core["skip"]):
+                first = next(reader, [])
+                header = header or first
+
+            yield header, reader
+
+
+def archive_core(archive: zipfile.ZipFile) -> dict:
+    """Get the core file's layout from the archive's meta.xml."""
+    core = {
+        "location": DWC_CORE,
+        "encoding": "utf-8",
+        "delimiter": "\t",
+        "quote": "",
+        "skip": 1,
+        "header": [],
+    }
+
+    if DWC_META not in archive.namelist():
+        return core
+
+    with archive.open(DWC_META) as meta:
+        root = ET.parse(meta).getroot()  # noqa: S314
+
+    node = next(e for e in root.iter() if local_name(e.tag) == "core")
+
+    location = next(e for e in node.iter() if local_name(e.tag) == "location")
+    core["location"] = location.text.strip()
+    core["encoding"] = node.get("encoding", "utf-8")
+    core["delimiter"] = unescape(node.get("fieldsTerminatedBy", "\\t"))
+    core["quote"] = unescape(node.get("fieldsEnclosedBy", ""))
+    core["skip"] = int(node.get("ignoreHeaderLines", "0"))
+
+    # Use the term names in the meta.xml as the header
+    columns = {}
+    for field in node.iter():
+        if local_name(field.tag) in ("id", "coreid"):
+            columns.setdefault(int(field.get("index")), "id")
+        elif local_name(field.tag) == "field" and field.get("index") is not None:
+            columns[int(field.get("index"))] = field.get("term").rsplit("/", 1)[-1]
+    if columns:
+        header = [""] * (max(columns) + 1)
+        for i, name in columns.items():
+            header[i] = name
+        core["header"] = header
+
+    return core
+
+
+def local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def unescape(value: str) -> str:
+    return value.encode().decode("unicode_escape")
+
+
+def column_index(header: list[str], columns: list[str]) -> list[tuple[str, int]]:
+    """Find where the columns are in the header so rows can be projected."""
+    missing = [c for c in columns if c not in header]
+    if missing:
+        msg = f"Missing columns: {', '.join(missing)}"
+        raise ValueError(msg)
+    return [(c, header.index(c)) for c in columns]
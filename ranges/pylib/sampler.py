@@ -0,0 +1,139 @@
+"""
+Sample parsed occurrences without loading all of them.
+
+The reservoir sampler takes one pass over a stream of records and is seeded so
+that the results are deterministic. The stratified sampler takes two passes,
+one to count the strata and one to fill a reservoir for each stratum, so that
+rare institutions, species, or traits still show up in the review samples.
+"""
+
+import random
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from typing import Any
+
+SEED = 93113
+
+STRATA = ["institution", "summary", "trait"]
+
+
+class Reservoir:
+    """Keep a uniform random sample of a stream (Algorithm R)."""
+
+    def __init__(self, size: int, seed: int = SEED) -> None:
+        self.size = size
+        self.rng = random.Random(seed)  # noqa: S311
+        self.seen = 0
+        self.items = []
+
+    def add(self, item: Any) -> None:
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+        elif (i := self.rng.randrange(self.seen)) < self.size:
+            self.items[i] = item
+
+
+def has_data(occur: dict[str, Any], sample_method: str) -> bool:
+    """Only sample occurrences with data."""
+    if sample_method == "fields":
+        return any(v for v in occur["parse_fields"].values())
+    # elif sample_method == "traits":
+    return any(t["_field"] not in occur["overwrite_fields"] for t in occur["traits"])
+
+
+def reservoir_sample(
+    occurrences: Iterable[dict[str, Any]],
+    sample_size: int,
+    sample_method: str,
+    seed: int = SEED,
+) -> list[dict[str, Any]]:
+    reservoir = Reservoir(sample_size, seed)
+    for occur in occurrences:
+        if has_data(occur, sample_method):
+            reservoir.add(occur)
+    return reservoir.items
+
+
+def stratified_sample(
+    occurrences: Callable[[], Iterable[dict[str, Any]]],
+    sample_size: int,
+    sample_method: str,
+    strata: str,
+    summary_field: str = "",
+    seed: int = SEED,
+) -> list[dict[str, Any]]:
+    """
+    Sample each stratum separately so that small strata are covered.
+
+    The occurrences argument returns a new stream for every pass. Every stratum
+    gets an equal share of the sample unless it is too small to fill it, then the
+    leftovers go to the larger strata. An occurrence with several traits is put
+    into the stratum of its rarest trait. Any shortfall is topped up from a
+    reservoir of all the occurrences.
+    """
+    trait_counts = defaultdict(int)
+    if strata == "trait":
+        for occur in occurrences():
+            if has_data(occur, sample_method):
+                for name in sampled_traits(occur):
+                    trait_counts[name] += 1
+
+    def stratum(occur: dict[str, Any]) -> str:
+        match strata:
+            case "institution":
+                return occur["source"]
+            case "summary":
+                return occur["info_fields"].get(summary_field, "").strip()
+            case _:
+                names = sampled_traits(occur)
+                return min(names, key=lambda n: (trait_counts[n], n)) if names else ""
+
+    counts = defaultdict(int)
+    if strata == "trait":
+        counts |= trait_counts
+    else:
+        for occur in occurrences():
+            if has_data(occur, sample_method):
+                counts[stratum(occur)] += 1
+
+    quotas = allocate(sample_size, counts)
+    reservoirs = {k: Reservoir(q, seed) for k, q in quotas.items() if q}
+    everything = Reservoir(sample_size, seed)
+
+    for occur in occurrences():
+        if has_data(occur, sample_method):
+            if reservoir := reservoirs.get(stratum(occur)):
+                reservoir.add(occur)
+            everything.add(occur)
+
+    sampled = [o for k in sorted(reservoirs) for o in reservoirs[k].items]
+
+    chosen = {id(o) for o in sampled}
+    for occur in everything.items:
+        if len(sampled) >= sample_size:
+            break
+        if id(occur) not in chosen:
+            sampled.append(occur)
+
+    return sampled
+
+
+def sampled_traits(occur: dict[str, Any]) -> set[str]:
+    return {
+        t["_trait"]
+        for t in occur["traits"]
+        if t["_field"] not in occur["overwrite_fields"]
+    }
+
+
+def allocate(sample_size: int, counts: dict[str, int]) -> dict[str, int]:
+    """Split the sample evenly over the strata, small strata get what they have."""
+    quotas = {}
+    remaining = sample_size
+    ordered = sorted(counts, key=lambda k: (counts[k], k))
+    for i, key in enumerate(ordered):
+        share = remaining // (len(ordered) - i)
+        quotas[key] = min(counts[key], share)
+        remaining -= quotas[key]
+    return quotas
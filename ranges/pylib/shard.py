@@ -0,0 +1,119 @@
+"""
+Split big occurrence files into row-range chunks that can be parsed in parallel.
+
+Chunks are found by indexing the byte offsets of record boundaries. Newlines
+inside of quoted fields are not record boundaries so multi-line CSV fields are
+kept whole. Like in the csv module, a quote only starts a quoted field at the
+start of a field, so a stray quote in an unquoted field, like 5" long, is just a
+character. Archives cannot be seeked into so they are always one chunk.
+"""
+
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+from ranges.pylib import reader
+
+BLOCK_SIZE = 1024 * 1024
+
+QUOTE_OR_NEWLINE = re.compile(rb'["\n]')
+FIELD_STARTS = b",\n"
+
+
+@dataclass(frozen=True)
+class Chunk:
+    path: Path
+    index: int  # Chunk order within the file
+    start: int  # Byte offset of the first record
+    end: int  # Byte offset just past the last record
+    first_row: int  # Row number of the first record, not counting the header
+    rows: int
+    fmt: str = ""  # The file format, it is guessed when it is empty
+
+    @property
+    def name(self) -> str:
+        return f"{self.path.stem}.{self.index:06d}"
+
+
+def chunk_file(path: Path, rows_per_chunk: int, fmt: str = "csv") -> list[Chunk]:
+    """
+    Split a file into chunks of rows. The first record is the header.
+
+    Only CSV files have quoted fields, a quote in a TSV file is just a character.
+    """
+    quoted = fmt == "csv"
+    chunks = []
+    start = None  # None until the header is passed
+    end = 0
+    rows = 0
+    first_row = 0
+    in_quotes = False
+    closed = -1  # Where the last quoted field was closed
+    before_block = FIELD_STARTS[-1]  # A file starts with a field
+    offset = 0
+
+    with path.open("rb") as fin:
+        while block := fin.read(BLOCK_SIZE):
+            for match in QUOTE_OR_NEWLINE.finditer(block):
+                if match.group() == b'"':
+                    at = offset + match.start()
+                    if in_quotes:
+                        in_quotes = False
+                        closed = at
+                    elif quoted:
+                        i = match.start()
+                        before = block[i - 1] if i else before_block
+                        # An escaped quote is a close and an open right after it
+                        in_quotes = before in FIELD_STARTS or at == closed + 1
+                    continue
+
+                if in_quotes:
+                    continue
+
+                end = offset + match.end()
+
+                if start is None:
+                    start = end
+                    continue
+
+                rows += 1
+                if rows == rows_per_chunk:
+                    chunks.append(
+                        Chunk(path, len(chunks), start, end, first_row, rows, fmt)
+                    )
+                    first_row += rows
+                    start = end
+                    rows = 0
+
+            before_block = block[-1]
+            offset += len(block)
+
+    if start is None:
+        start = offset
+
+    # The last record may not end with a newline
+    if start <= end < offset:
+        rows += 1
+        end = offset
+
+    # Every file gets at least one chunk, even if it is empty
+    if rows or not chunks:
+        chunks.append(
+            Chunk(path, len(chunks), start, max(end, start), first_row, rows, fmt)
+        )
+
+    return chunks
+
+
+def chunk_files(
+    paths: list[Path], rows_per_chunk: int, formats: dict[Path, str] | None = None
+) -> list[Chunk]:
+    formats = formats or {}
+    chunks = []
+    for path in paths:
+        fmt = formats.get(path) or reader.file_format(path)
+        if fmt == "dwca":
+            chunks.append(Chunk(path, 0, 0, 0, 0, 0, fmt))
+        else:
+            chunks += chunk_file(path, rows_per_chunk, fmt)
+    return chunks
@@ -0,0 +1,117 @@
+"""
+Skip pattern components that cannot match a doc.
+
+Most texts only hit one or two trait families, yet every family's pattern pipes
+run on every doc. A pattern can only match when the doc has entities for every
+ENT_TYPE token that the pattern requires. So each pattern component is wrapped
+with the entity labels it needs, and it is skipped when the doc has none of them.
+
+Term pipes, cleanup pipes, and components with any pattern that does not need an
+entity always run, so the parses are the same as without skipping.
+"""
+
+import re
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from spacy.language import Language
+from spacy.tokens import Doc
+
+# Entity labels found in most docs, a pipe gated on them would almost never skip
+COMMON = {"number"}
+
+# Counts like {2}, {2,}, {2,3}, or {,3}
+COUNT_OP = re.compile(r"^\{(\d*)(,?)(\d*)\}$")
+
+
+class SkipUnless:
+    """Only run a component when the doc has one of the needed entity labels."""
+
+    def __init__(self, component: Any, labels: set[str]) -> None:
+        self.component = component
+        self.labels = labels
+        self.runs = 0
+        self.skips = 0
+
+    def __call__(self, doc: Doc, **kwargs: Any) -> Doc:
+        if self.labels.isdisjoint(e.label_ for e in doc.ents):
+            self.skips += 1
+            return doc
+        self.runs += 1
+        return self.component(doc, **kwargs)
+
+    def pipe(self, docs: Iterable[Doc], **kwargs: Any) -> Iterator[Doc]:
+        kwargs.pop("batch_size", None)
+        for doc in docs:
+            yield self(doc, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.component, name)
+
+
+def skip_unmatchable(nlp: Language) -> dict[str, SkipUnless]:
+    """Wrap every component that can be skipped. Return the wrappers by name."""
+    wrapped = {}
+    for i, (name, component) in enumerate(nlp._components):
+        if hasattr(component, "pipe"):
+            continue
+        config = nlp.config["components"].get(name, {})
+        if labels := needed_labels(config.get("patterns")):
+            wrapped[name] = SkipUnless(component, labels)
+            nlp._components[i] = (name, wrapped[name])
+    return wrapped
+
+
+def needed_labels(patterns: Any) -> set[str]:
+    """
+    Get the entity labels that a doc needs for any of the patterns to match.
+
+    An empty set means the component must always run.
+    """
+    if isinstance(patterns, dict):
+        patterns = [p for label in patterns.values() for p in label]
+
+    if not patterns:
+        return set()
+
+    labels = set()
+    for pattern in patterns:
+        needed = pattern_labels(pattern)
+        if not needed:
+            return set()
+        labels |= needed
+    return labels
+
+
+def pattern_labels(pattern: Any) -> set[str]:
+    """
+    Get the entity labels of one required entity token in the pattern.
+
+    Any required entity token will do because all of them must match. Numbers are
+    in almost every doc, so a token for key terms, like in the length patterns, is
+    used when there is one.
+    """
+    if not isinstance(pattern, list):
+        return set()
+
+    required = []
+    for token in pattern:
+        if not isinstance(token, dict) or not is_required(token.get("OP")):
+            continue
+        match token.get("ENT_TYPE"):
+            case str(label) if label:
+                required.append({label})
+            case {"IN": list(labels)} if labels and all(labels):
+                required.append(set(labels))
+
+    if not required:
+        return set()
+    return next((r for r in required if not r & COMMON), required[0])
+
+
+def is_required(op: str | None) -> bool:
+    if op in (None, "+"):
+        return True
+    if match := COUNT_OP.match(op):
+        return int(match.group(1) or 0) > 0
+    return False
@@ -0,0 +1,99 @@
+"""
+One phrase matcher over the term CSVs of every rule.
+
+Each rule has its own term pipe, so a doc is scanned by about twenty phrase
+matchers even though most texts only hold the terms of one or two rules. The index
+matches the union of the term CSVs once per doc and records which term pipes have
+terms in it. The term pipes without any are skipped, they would not change the doc.
+
+The index matches lower case text, which finds every term the term pipes can find,
+so the parses are the same. Verify it on a corpus with
+`benchmark.py --benchmark terms`. Each term CSV is read once per process.
+"""
+
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any
+
+from spacy.language import Language
+from spacy.matcher import PhraseMatcher
+from spacy.tokens import Doc
+
+from ranges.rules import terms
+
+# The pipeline meta holds the term CSVs of each term pipe
+META_KEY = "ranges_term_pipes"
+
+# The doc user data holds the names of the term pipes with terms in the doc
+DOC_KEY = "ranges_term_pipes"
+
+
+def rule_csvs(rule: type) -> list[Path]:
+    """Get the term CSVs of a rule, some rules only have one."""
+    return list(getattr(rule, "csvs", None) or [rule.csv])
+
+
+class TermIndex:
+    """Find the term pipes that have terms in a doc."""
+
+    def __init__(self, nlp: Language, term_pipes: dict[str, list[str]]) -> None:
+        self.matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+
+        patterns = {}
+        for paths in term_pipes.values():
+            for path in paths:
+                for term in terms.read_terms(Path(path)):
+                    patterns[term["pattern"].lower()] = None
+        docs = dict(zip(patterns, nlp.tokenizer.pipe(patterns), strict=True))
+
+        for name, paths in term_pipes.items():
+            rows = [t for p in paths for t in terms.read_terms(Path(p))]
+            pipe_patterns = {t["pattern"].lower() for t in rows}
+            self.matcher.add(name, [docs[t] for t in sorted(pipe_patterns)])
+
+    def term_pipes(self, doc: Doc) -> set[str]:
+        """Match the doc once, then reuse the result for every term pipe."""
+        if DOC_KEY not in doc.user_data:
+            vocab = doc.vocab.strings
+            found = {vocab[i] for i, _, _ in self.matcher(doc)}
+            doc.user_data[DOC_KEY] = found
+        return doc.user_data[DOC_KEY]
+
+
+class SkipUnindexed:
+    """Only run a term pipe when the index found its terms in the doc."""
+
+    def __init__(self, component: Any, name: str, index: TermIndex) -> None:
+        self.component = component
+        self.name = name
+        self.index = index
+        self.runs = 0
+        self.skips = 0
+
+    def __call__(self, doc: Doc, **kwargs: Any) -> Doc:
+        if self.name not in self.index.term_pipes(doc):
+            self.skips += 1
+            return doc
+        self.runs += 1
+        return self.component(doc, **kwargs)
+
+    def pipe(self, docs: Iterable[Doc], **kwargs: Any) -> Iterator[Doc]:
+        kwargs.pop("batch_size", None)
+        for doc in docs:
+            yield self(doc, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.component, name)
+
+
+def index_terms(nlp: Language) -> dict[str, SkipUnindexed]:
+    """Wrap the term pipes listed in the pipeline meta. Return the wrappers by name."""
+    term_pipes = nlp.meta.get(META_KEY, {})
+    index = TermIndex(nlp, term_pipes)
+
+    wrapped = {}
+    for i, (name, component) in enumerate(nlp._components):
+        if name in term_pipes:
+            wrapped[name] = SkipUnindexed(component, name, index)
+            nlp._components[i] = (name, wrapped[name])
+    return wrapped
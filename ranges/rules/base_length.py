@@ -1,17 +1,23 @@
+import copy
 from dataclasses import dataclass
 from enum import Enum, auto
 from pathlib import Path
 from typing import Any, ClassVar
 
 from spacy.language import Language
-from spacy.tokens import Span
+from spacy.tokens import Doc, Span
+from spacy.util import registry
 from traiter.pipes import add
 from traiter.pylib import const as t_const
 from traiter.pylib.darwin_core import DarwinCore
 from traiter.pylib.pattern_compiler import Compiler
 
+from ranges.rules import terms
 from ranges.rules.base import Base
 
+# The doc user data holds the terms found by the shared length term pipe
+TERM_CACHE_KEY = "ranges_length_terms"
+
 
 class DictFunc(Enum):
     LENGTH = auto()
@@ -68,6 +74,14 @@ class BaseLength(Base):
 
     dwc_prefix: ClassVar[dict[str, str]] = {}
     replace: ClassVar[dict[str, str]] = {}
+
+    # Which of the shared length pipes a rule uses
+    bad_lengths: ClassVar[bool] = False
+    compound: ClassVar[bool] = False
+    allow_no_key: ClassVar[bool] = False  # For compound, range, and tic lengths
+
+    # Every length rule by name, the matches are dispatched to them
+    rules: ClassVar[dict[str, type["BaseLength"]]] = {}
     # ---------------------
 
     length: float | list[float] | None = None
@@ -99,9 +113,46 @@ class BaseLength(Base):
 
         return dwc.add_dyn(**value)
 
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        BaseLength.rules[cls.name] = cls
+
     @classmethod
     def pipe(cls, nlp: Language) -> None:
-        raise NotImplementedError
+        cls.term_pipe(nlp)
+        cls.length_pipes(nlp)
+
+    @classmethod
+    def shared_pipe(cls, nlp: Language, rules: list[type["BaseLength"]]) -> None:
+        """Build the rule on its terms from the shared_term_pipe of the rules."""
+        csvs = [p for rule in rules for p in rule.csvs]
+        nlp.add_pipe(
+            "length_term_select",
+            name=f"{cls.name}_length_term_select",
+            config={"terms": cls.term_keys(), "labels": term_labels(csvs)},
+        )
+        cls.length_pipes(nlp)
+
+    @classmethod
+    def term_keys(cls) -> list[list[str]]:
+        """Get the patterns and labels of this rule's terms."""
+        keys = {
+            (term_key(t["pattern"]), t["label"])
+            for path in cls.csvs
+            for t in terms.read_terms(path)
+        }
+        return [list(k) for k in sorted(keys)]
+
+    @classmethod
+    def length_pipes(cls, nlp: Language) -> None:
+        if cls.bad_lengths:
+            cls.bad_length_pipe(nlp)
+        if cls.compound:
+            cls.compound_length_pipe(nlp, allow_no_key=cls.allow_no_key)
+        cls.range_length_pipe(nlp, allow_no_key=cls.allow_no_key)
+        cls.tic_pipe(nlp, allow_no_key=cls.allow_no_key)
+        cls.length_pipe(nlp)
+        cls.cleanup_pipe(nlp)
 
     @classmethod
     def term_pipe(cls, nlp: Language) -> None:
@@ -193,7 +244,7 @@ class BaseLength(Base):
         return [
             Compiler(
                 label=label,
-                on_match=f"{cls.name}_length_match",
+                on_match="length_match",
                 decoder=DECODER,
                 patterns=patterns,
             ),
@@ -218,7 +269,7 @@ class BaseLength(Base):
         return [
             Compiler(
                 label=f"{cls.name}_length",
-                on_match=f"{cls.name}_length_compound_match",
+                on_match="length_compound_match",
                 decoder=DECODER,
                 patterns=patterns,
             ),
@@ -242,7 +293,7 @@ class BaseLength(Base):
         return [
             Compiler(
                 label=f"{cls.name}_length",
-                on_match=f"{cls.name}_length_range_match",
+                on_match="length_range_match",
                 decoder=DECODER,
                 patterns=patterns,
             ),
@@ -266,7 +317,7 @@ class BaseLength(Base):
         return [
             Compiler(
                 label=f"{cls.name}_length",
-                on_match=f"{cls.name}_length_tic_match",
+                on_match="length_tic_match",
                 decoder=DECODER | {'"': {"TEXT": {"IN": t_const.QUOTE}}},
                 patterns=patterns,
             ),
@@ -277,7 +328,7 @@ class BaseLength(Base):
         return [
             Compiler(
                 label="bad_length",
-                on_match=f"{cls.name}_length_bad_match",
+                on_match="length_bad_match",
                 is_temp=True,
                 decoder=DECODER,
                 patterns=[
@@ -423,3 +474,148 @@ class BaseLength(Base):
     @classmethod
     def bad_match(cls, ent: Span) -> "BaseLength":
         return cls.from_ent(ent)
+
+    @classmethod
+    def to_obj(cls, ent: Span, dict_func: DictFunc) -> "BaseLength":
+        base = cls.class_dict(ent, dict_func)
+        return cls(**base)
+
+    @classmethod
+    def match(cls, ent: Span, dict_func: DictFunc) -> "BaseLength":
+        """Build the trait, rules with extra fields add them here."""
+        return cls.to_obj(ent, dict_func)
+
+    @classmethod
+    def dispatch(cls, ent: Span, dict_func: DictFunc) -> "BaseLength":
+        """Send a match to the rule that labeled it, like "ear_length" to EarLength."""
+        rule = cls.rules[ent.label_.removesuffix("_length")]
+        return rule.match(ent, dict_func)
+
+
+def shared_term_pipe(nlp: Language, rules: list[type[BaseLength]]) -> None:
+    """
+    Match the terms of several length rules with one term pipe.
+
+    The rules still run one after the other, each with its own numbers and pipes.
+    Before a rule runs, its shared_pipe puts back its own terms from this pass and
+    drops the terms of the other rules, like the rule's own term pipe would.
+    """
+    csvs = list(dict.fromkeys(p for rule in rules for p in rule.csvs))
+    add.term_pipe(nlp, name="length_terms", path=csvs)
+    nlp.add_pipe("length_term_cache", config={"labels": term_labels(csvs)})
+
+
+def term_labels(csvs: list[Path]) -> list[str]:
+    return sorted({t["label"] for path in csvs for t in terms.read_terms(path)})
+
+
+def term_key(text: str) -> str:
+    """Compare terms without case or spaces, term tokens may have been merged."""
+    return "".join(text.lower().split())
+
+
+@Language.factory("length_term_cache")
+class LengthTermCache:
+    """Remember the terms found by the shared length term pipe."""
+
+    def __init__(
+        self,
+        nlp: Language,
+        name: str,
+        labels: list[str],
+    ) -> None:
+        super().__init__()
+        self.nlp = nlp
+        self.name = name
+        self.labels = labels
+
+    def __call__(self, doc: Doc) -> Doc:
+        doc.user_data[TERM_CACHE_KEY] = [
+            (
+                ent.start_char,
+                ent.end_char,
+                ent.label_,
+                ent._.trait,
+                [(t._.trait, t._.flag, t._.term) for t in ent],
+            )
+            for ent in doc.ents
+            if ent.label_ in self.labels
+        ]
+        return doc
+
+
+@Language.factory("length_term_select")
+class LengthTermSelect:
+    """
+    Give a rule the terms its own term pipe would find.
+
+    The terms of the other rules are dropped. The rule's cached terms are put back
+    where they do not overlap another entity, the same as a term pipe does.
+    """
+
+    def __init__(
+        self,
+        nlp: Language,
+        name: str,
+        terms: list[list[str]],
+        labels: list[str],
+    ) -> None:
+        super().__init__()
+        self.nlp = nlp
+        self.name = name
+        self.terms = {tuple(t) for t in terms}
+        self.labels = set(labels)
+
+    def __call__(self, doc: Doc) -> Doc:
+        entities = [e for e in doc.ents if self.keep(e.text, e.label_)]
+        taken = {t.i for e in entities for t in e}
+
+        for start, end, label, trait, tokens in doc.user_data.get(TERM_CACHE_KEY, []):
+            ent = doc.char_span(start, end, label=label)
+            if ent is None or len(ent) != len(tokens):
+                continue
+            if not self.keep(ent.text, label):
+                continue
+            if any(t.i in taken for t in ent):
+                continue
+
+            ent._.trait = copy.copy(trait)
+            for token, (token_trait, flag, term) in zip(ent, tokens, strict=True):
+                token._.trait = token_trait
+                token._.flag = flag
+                token._.term = term
+
+            taken |= {t.i for t in ent}
+            entities.append(ent)
+
+        doc.ents = sorted(entities, key=lambda e: e.start)
+        return doc
+
+    def keep(self, text: str, label: str) -> bool:
+        """Keep entities that are not terms, and this rule's terms."""
+        return label not in self.labels or (term_key(text), label) in self.terms
+
+
+@registry.misc("length_match")
+def length_match(ent: Span) -> BaseLength:
+    return BaseLength.dispatch(ent, DictFunc.LENGTH)
+
+
+@registry.misc("length_compound_match")
+def length_compound_match(ent: Span) -> BaseLength:
+    return BaseLength.dispatch(ent, DictFunc.COMPOUND)
+
+
+@registry.misc("length_range_match")
+def length_range_match(ent: Span) -> BaseLength:
+    return BaseLength.dispatch(ent, DictFunc.RANGE)
+
+
+@registry.misc("length_tic_match")
+def length_tic_match(ent: Span) -> BaseLength:
+    return BaseLength.dispatch(ent, DictFunc.TIC)
+
+
+@registry.misc("length_bad_match")
+def length_bad_match(ent: Span) -> BaseLength:
+    return BaseLength.bad_match(ent)
@@ -20,7 +20,7 @@ from traiter.pylib.darwin_core import DarwinCore
 from traiter.pylib.pattern_compiler import Compiler
 from traiter.rules import terms as t_terms
 
-from ranges.rules.base_length import SEP, BaseLength, DictFunc
+from ranges.rules.base_length import SEP, BaseLength
 
 DECODER = {
     "(": {"TEXT": {"IN": t_const.OPEN}, "OP": "?"},
@@ -586,11 +586,6 @@ class Embryo(BaseLength):
     def bad_embryo_match(cls, ent: Span) -> "Embryo":
         return cls.from_ent(ent)
 
-    @classmethod
-    def to_obj(cls, ent: Span, dict_func: DictFunc) -> "Embryo":
-        base = cls.class_dict(ent, dict_func)
-        return cls(**base)
-
 
 @registry.misc("embryo_count_match")
 def embryo_count_match(ent: Span) -> Embryo:
@@ -602,11 +597,6 @@ def embryo_present_match(ent: Span) -> Embryo:
     return Embryo.embryo_present_match(ent)
 
 
-@registry.misc("embryo_length_match")
-def embryo_length_match(ent: Span) -> Embryo:
-    return Embryo.to_obj(ent, DictFunc.LENGTH)
-
-
 @registry.misc("embryo_mix_0_match")
 def embryo_mix_0_match(ent: Span) -> Embryo:
     return Embryo.embryo_mix_match(ent, length_idx=0)
@@ -637,11 +627,6 @@ def embryo_mix_3_match(ent: Span) -> Embryo:
     return Embryo.embryo_mix_match(ent, length_idx=3)
 
 
-@registry.misc("embryo_length_bad_match")
-def embryo_length_bad_match(ent: Span) -> BaseLength:
-    return Embryo.bad_match(ent)
-
-
 @registry.misc("embryo_width_match")
 def embryo_width_match(ent: Span) -> Embryo:
     return Embryo.embryo_width_match(ent)
@@ -3,9 +3,7 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, ClassVar
 
-from spacy.language import Language
 from spacy.tokens import Span
-from spacy.util import registry
 from traiter.pylib import term_util
 from traiter.pylib.darwin_core import DarwinCore
 from traiter.rules import terms as t_terms
@@ -73,14 +71,6 @@ class HindFootLength(BaseLength):
 
         return dwc
 
-    @classmethod
-    def pipe(cls, nlp: Language) -> None:
-        cls.term_pipe(nlp)
-        cls.range_length_pipe(nlp)
-        cls.tic_pipe(nlp)
-        cls.length_pipe(nlp)
-        cls.cleanup_pipe(nlp)
-
     @classmethod
     def get_includes(cls, ent: Span, trait: "HindFootLength") -> None:
         keys = [e for e in ent.ents if e.label_ in cls.keys]
@@ -89,39 +79,7 @@ class HindFootLength(BaseLength):
                 trait.includes = value
 
     @classmethod
-    def hind_foot_length_match(cls, ent: Span) -> "HindFootLength":
-        trait = cls.to_obj(ent, DictFunc.LENGTH)
-        cls.get_includes(ent, trait)
-        return trait
-
-    @classmethod
-    def hind_foot_length_range_match(cls, ent: Span) -> "HindFootLength":
-        trait = cls.to_obj(ent, DictFunc.RANGE)
-        cls.get_includes(ent, trait)
-        return trait
-
-    @classmethod
-    def hind_foot_length_tic_match(cls, ent: Span) -> "HindFootLength":
-        trait = cls.to_obj(ent, DictFunc.TIC)
+    def match(cls, ent: Span, dict_func: DictFunc) -> "HindFootLength":
+        trait = cls.to_obj(ent, dict_func)
         cls.get_includes(ent, trait)
         return trait
-
-    @classmethod
-    def to_obj(cls, ent: Span, dict_func: DictFunc) -> "HindFootLength":
-        base = cls.class_dict(ent, dict_func)
-        return cls(**base)
-
-
-@registry.misc("hind_foot_length_match")
-def hind_foot_length_match(ent: Span) -> HindFootLength:
-    return HindFootLength.hind_foot_length_match(ent)
-
-
-@registry.misc("hind_foot_length_range_match")
-def hind_foot_length_range_match(ent: Span) -> HindFootLength:
-    return HindFootLength.hind_foot_length_range_match(ent)
-
-
-@registry.misc("hind_foot_length_tic_match")
-def hind_foot_length_tic_match(ent: Span) -> HindFootLength:
-    return HindFootLength.hind_foot_length_tic_match(ent)
@@ -18,8 +18,11 @@ Ambiguous measurements are enclosed in brackets.
   E.g.: 11-[22]-33-[44]:99g
 """
 
+import re
 from collections import defaultdict
 from dataclasses import dataclass
+from datetime import date
+from functools import cache
 from pathlib import Path
 from typing import Any, ClassVar
 
@@ -389,18 +392,80 @@ class LengthShorthand(Base):
 
     @classmethod
     def shorthand_match(cls, ent: Span) -> "LengthShorthand":
+        # Remove unneeded characters and entities
+        cells = [e for e in ent.ents if e.label_ in ("number", "cell", "missing")]
+        kwargs = cls.cell_values([c.text for c in cells])
+        return cls.from_ent(ent, **kwargs)
+
+    @classmethod
+    @cache
+    def fast_regex(cls) -> re.Pattern:
+        """
+        Match the canonical shorthand forms: four cells and an optional body mass.
+
+        Cells are numbers shaped like inner_re, bracketed estimates, or missing
+        values. It is stricter than the spaCy patterns, texts it does not match are
+        parsed as usual.
+        """
+        number = r"\d{1,4}(\.\d{1,3})?"
+        cell = rf"({number}|\[{number}\]|\?\??|[xX]{{1,2}})"
+        mass = rf"({number}|\[{number}\])"
+        sep = "|".join(re.escape(s) for s in cls.sep)
+        last = "|".join(re.escape(s) for s in cls.last)
+        return re.compile(
+            rf"(?P<cells>{cell}(?:{sep}){cell}(?:{sep}){cell}(?:{sep}){cell})"
+            rf"((\s*(?:{last})\s*|\s+)(?P<mass>{mass})(\s?g)?)?"
+        )
+
+    @classmethod
+    def fast_parse(cls, text: str) -> list["LengthShorthand"] | None:
+        """
+        Parse a text that is only a canonical shorthand without spaCy.
+
+        Return None when the text needs the full pipeline. That includes texts that
+        start with a date, like 1999-12-31-44, because the Date rule runs before
+        this one and takes the date away from the shorthand.
+        """
+        stripped = text.strip()
+        if not (match := cls.fast_regex().fullmatch(stripped)):
+            return None
+
+        cells = re.split("|".join(re.escape(s) for s in cls.sep), match["cells"])
+        if cls.date_like(cells):
+            return None
+        if match["mass"]:
+            cells.append(match["mass"])
+
+        start = text.find(stripped)
+        end = start + len(stripped)
+        kwargs = cls.cell_values(cells)
+        trait = cls(start=start, end=end, _trait="shorthand", _text=stripped, **kwargs)
+        return [trait]
+
+    @staticmethod
+    def date_like(cells: list[str]) -> bool:
+        """Check if the first three cells are a date with a four digit year."""
+        for year, month, day in [(0, 1, 2), (2, 0, 1), (2, 1, 0)]:
+            if len(cells[year]) != 4:
+                continue
+            try:
+                date(int(cells[year]), int(cells[month]), int(cells[day]))
+            except ValueError:
+                continue
+            return True
+        return False
+
+    @classmethod
+    def cell_values(cls, cells: list[str]) -> dict[str, Any]:
         kwargs = {}
 
         # How may length fields are expected
         full = 4
 
-        # Remove unneeded characters and entities
-        cells = [e for e in ent.ents if e.label_ in ("number", "cell", "missing")]
-
         bats = []
 
         for i, cell in enumerate(cells):
-            cell = cell.text.lower()
+            cell = cell.lower()
 
             # Forearm length can be labeled
             if cell.find("fa") > -1:
@@ -450,7 +515,7 @@ class LengthShorthand(Base):
                 kwargs["tragus_length"] = bats[0].length
                 kwargs["tragus_length_estimated"] = bats[0].estimated
 
-        return cls.from_ent(ent, **kwargs)
+        return kwargs
 
     @classmethod
     def shorthand_skip_match(cls, ent: Span) -> "LengthShorthand":
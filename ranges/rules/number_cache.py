@@ -0,0 +1,86 @@
+import copy
+
+from spacy.language import Language
+from spacy.tokens import Doc
+from traiter.pipes import add
+
+CACHE_KEY = "ranges_numbers"
+LABELS = ["number"]
+
+
+def pipe_cache(nlp: Language) -> None:
+    config = {"labels": LABELS}
+    add.custom_pipe(nlp, "number_cache", config=config)
+
+
+def pipe_restore(nlp: Language) -> None:
+    name = f"number_restore_{len(nlp.pipe_names)}"
+    nlp.add_pipe("number_restore", name=name)
+
+
+@Language.factory("number_cache")
+class NumberCache:
+    """Remember the numbers found by the first number pipes."""
+
+    def __init__(
+        self,
+        nlp: Language,
+        name: str,
+        labels: list[str],
+    ) -> None:
+        super().__init__()
+        self.nlp = nlp
+        self.name = name
+        self.labels = labels
+
+    def __call__(self, doc: Doc) -> Doc:
+        doc.user_data[CACHE_KEY] = [
+            (
+                ent.start_char,
+                ent.end_char,
+                ent.label_,
+                ent._.trait,
+                [(t._.trait, t._.flag, t._.term) for t in ent],
+            )
+            for ent in doc.ents
+            if ent.label_ in self.labels
+        ]
+        return doc
+
+
+@Language.factory("number_restore")
+class NumberRestore:
+    """
+    Put back the cached numbers instead of finding them again.
+
+    Numbers that overlap another entity or no longer line up with the tokens are
+    left out, the same as the number pipes do when they run again.
+    """
+
+    def __init__(self, nlp: Language, name: str) -> None:
+        super().__init__()
+        self.nlp = nlp
+        self.name = name
+
+    def __call__(self, doc: Doc) -> Doc:
+        entities = list(doc.ents)
+        taken = {t.i for e in entities for t in e}
+
+        for start, end, label, trait, tokens in doc.user_data.get(CACHE_KEY, []):
+            ent = doc.char_span(start, end, label=label)
+            if ent is None or len(ent) != len(tokens):
+                continue
+            if any(t.i in taken for t in ent):
+                continue
+
+            ent._.trait = copy.copy(trait)
+            for token, (token_trait, flag, term) in zip(ent, tokens, strict=True):
+                token._.trait = token_trait
+                token._.flag = flag
+                token._.term = term
+
+            taken |= {t.i for t in ent}
+            entities.append(ent)
+
+        doc.ents = sorted(entities, key=lambda e: e.start)
+        return doc
@@ -3,13 +3,10 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, ClassVar
 
-from spacy.language import Language
-from spacy.tokens import Span
-from spacy.util import registry
 from traiter.pylib import term_util
 from traiter.rules import terms as t_terms
 
-from ranges.rules.base_length import BaseLength, DictFunc
+from ranges.rules.base_length import BaseLength
 
 # from traiter.pipes import add
 
@@ -30,6 +27,7 @@ class TailLength(BaseLength):
         k: float(v) * 10.0 for k, v in factor_cm.items()
     }
     replace: ClassVar[dict[str, str]] = term_util.look_up_table(csvs, "replace")
+    bad_lengths: ClassVar[bool] = True
     # ---------------------
 
     def as_dict(self) -> dict[str, dict[str, Any]]:
@@ -51,38 +49,3 @@ class TailLength(BaseLength):
 
     def for_csv(self) -> dict[str, Any]:
         return {"tail_length": self.length}
-
-    @classmethod
-    def pipe(cls, nlp: Language) -> None:
-        cls.term_pipe(nlp)
-        cls.bad_length_pipe(nlp)
-        cls.range_length_pipe(nlp)
-        cls.tic_pipe(nlp)
-        cls.length_pipe(nlp)
-        # add.debug_tokens(nlp)  # ###########################################
-        cls.cleanup_pipe(nlp)
-
-    @classmethod
-    def to_obj(cls, ent: Span, dict_func: DictFunc) -> "TailLength":
-        base = cls.class_dict(ent, dict_func)
-        return cls(**base)
-
-
-@registry.misc("tail_length_match")
-def tail_length_match(ent: Span) -> TailLength:
-    return TailLength.to_obj(ent, DictFunc.LENGTH)
-
-
-@registry.misc("tail_length_range_match")
-def tail_length_range_match(ent: Span) -> TailLength:
-    return TailLength.to_obj(ent, DictFunc.RANGE)
-
-
-@registry.misc("tail_length_tic_match")
-def tail_length_tic_match(ent: Span) -> TailLength:
-    return TailLength.to_obj(ent, DictFunc.TIC)
-
-
-@registry.misc("tail_length_bad_match")
-def tail_length_bad_match(ent: Span) -> BaseLength:
-    return TailLength.bad_match(ent)
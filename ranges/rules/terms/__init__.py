@@ -0,0 +1,10 @@
+import csv
+from functools import cache
+from pathlib import Path
+
+
+@cache
+def read_terms(path: Path) -> tuple[dict[str, str], ...]:
+    """Read a term CSV once per process."""
+    with path.open() as term_file:
+        return tuple(csv.DictReader(term_file))
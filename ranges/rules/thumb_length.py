@@ -2,9 +2,7 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, ClassVar
 
-from spacy.language import Language
 from spacy.tokens import Span
-from spacy.util import registry
 from traiter.pipes.reject_match import RejectMatch
 from traiter.pylib import term_util
 from traiter.pylib.darwin_core import DarwinCore
@@ -35,6 +33,7 @@ class ThumbLength(BaseLength):
         csvs, "measured_with"
     )
     replace: ClassVar[dict[str, str]] = term_util.look_up_table(csvs, "replace")
+    bad_lengths: ClassVar[bool] = True
     # ---------------------
 
     measured_from: str | None = None
@@ -72,16 +71,6 @@ class ThumbLength(BaseLength):
             value["thumb_length_measured_from"] = self.measured_from
         return value
 
-    @classmethod
-    def pipe(cls, nlp: Language) -> None:
-        cls.term_pipe(nlp)
-        cls.bad_length_pipe(nlp)
-        cls.range_length_pipe(nlp)
-        cls.tic_pipe(nlp)
-        # add.debug_tokens(nlp)  # ###########################################
-        cls.length_pipe(nlp)
-        cls.cleanup_pipe(nlp)
-
     @classmethod
     def check_ambiguous_key(cls, trait: "ThumbLength") -> None:
         if trait.ambiguous and trait.units_inferred:
@@ -95,47 +84,9 @@ class ThumbLength(BaseLength):
                 trait.measured_from = value
 
     @classmethod
-    def thumb_length_match(cls, ent: Span) -> "ThumbLength":
-        trait = cls.to_obj(ent, DictFunc.LENGTH)
-        # cls.check_ambiguous_key(trait)
-        cls.get_measured_from(ent, trait)
-        return trait
-
-    @classmethod
-    def thumb_length_range_match(cls, ent: Span) -> "ThumbLength":
-        trait = cls.to_obj(ent, DictFunc.RANGE)
-        cls.check_ambiguous_key(trait)
-        cls.get_measured_from(ent, trait)
-        return trait
-
-    @classmethod
-    def thumb_length_tic_match(cls, ent: Span) -> "ThumbLength":
-        trait = cls.to_obj(ent, DictFunc.TIC)
-        cls.check_ambiguous_key(trait)
+    def match(cls, ent: Span, dict_func: DictFunc) -> "ThumbLength":
+        trait = cls.to_obj(ent, dict_func)
+        if dict_func in (DictFunc.RANGE, DictFunc.TIC):
+            cls.check_ambiguous_key(trait)
         cls.get_measured_from(ent, trait)
         return trait
-
-    @classmethod
-    def to_obj(cls, ent: Span, dict_func: DictFunc) -> "ThumbLength":
-        base = cls.class_dict(ent, dict_func)
-        return cls(**base)
-
-
-@registry.misc("thumb_length_match")
-def thumb_length_match(ent: Span) -> ThumbLength:
-    return ThumbLength.thumb_length_match(ent)
-
-
-@registry.misc("thumb_length_range_match")
-def thumb_length_range_match(ent: Span) -> ThumbLength:
-    return ThumbLength.thumb_length_range_match(ent)
-
-
-@registry.misc("thumb_length_tic_match")
-def thumb_length_tic_match(ent: Span) -> ThumbLength:
-    return ThumbLength.thumb_length_tic_match(ent)
-
-
-@registry.misc("thumb_length_bad_match")
-def thumb_length_bad_match(ent: Span) -> BaseLength:
-    return ThumbLength.bad_match(ent)
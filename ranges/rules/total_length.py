@@ -2,13 +2,10 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, ClassVar
 
-from spacy.language import Language
-from spacy.tokens import Span
-from spacy.util import registry
 from traiter.pylib import term_util
 from traiter.rules import terms as t_terms
 
-from ranges.rules.base_length import BaseLength, DictFunc
+from ranges.rules.base_length import BaseLength
 
 # from traiter.pipes import add
 
@@ -28,6 +25,9 @@ class TotalLength(BaseLength):
         k: float(v) * 10.0 for k, v in factor_cm.items()
     }
     replace: ClassVar[dict[str, str]] = term_util.look_up_table(csvs, "replace")
+    bad_lengths: ClassVar[bool] = True
+    compound: ClassVar[bool] = True
+    allow_no_key: ClassVar[bool] = True
     # ---------------------
 
     def as_dict(self) -> dict[str, dict[str, Any]]:
@@ -47,44 +47,3 @@ class TotalLength(BaseLength):
 
     def for_csv(self) -> dict[str, Any]:
         return {"total_length": self.length}
-
-    @classmethod
-    def pipe(cls, nlp: Language) -> None:
-        # add.debug_tokens(nlp)  # ###########################################
-        cls.term_pipe(nlp)
-        cls.bad_length_pipe(nlp)
-        cls.compound_length_pipe(nlp, allow_no_key=True)
-        cls.range_length_pipe(nlp, allow_no_key=True)
-        cls.tic_pipe(nlp, allow_no_key=True)
-        cls.length_pipe(nlp)
-        cls.cleanup_pipe(nlp)
-
-    @classmethod
-    def to_obj(cls, ent: Span, dict_func: DictFunc) -> "TotalLength":
-        base = cls.class_dict(ent, dict_func)
-        return cls(**base)
-
-
-@registry.misc("total_length_match")
-def total_length_match(ent: Span) -> TotalLength:
-    return TotalLength.to_obj(ent, DictFunc.LENGTH)
-
-
-@registry.misc("total_length_compound_match")
-def total_length_compound_match(ent: Span) -> TotalLength:
-    return TotalLength.to_obj(ent, DictFunc.COMPOUND)
-
-
-@registry.misc("total_length_tic_match")
-def total_length_tic_match(ent: Span) -> TotalLength:
-    return TotalLength.to_obj(ent, DictFunc.TIC)
-
-
-@registry.misc("total_length_range_match")
-def total_length_range_match(ent: Span) -> TotalLength:
-    return TotalLength.to_obj(ent, DictFunc.RANGE)
-
-
-@registry.misc("total_length_bad_match")
-def total_length_bad_match(ent: Span) -> BaseLength:
-    return TotalLength.bad_match(ent)
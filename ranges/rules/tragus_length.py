@@ -2,13 +2,10 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, ClassVar
 
-from spacy.language import Language
-from spacy.tokens import Span
-from spacy.util import registry
 from traiter.pylib import term_util
 from traiter.rules import terms as t_terms
 
-from ranges.rules.base_length import BaseLength, DictFunc
+from ranges.rules.base_length import BaseLength
 
 
 @dataclass(eq=False)
@@ -46,31 +43,3 @@ class TragusLength(BaseLength):
 
     def for_csv(self) -> dict[str, Any]:
         return {"tragus_length": self.length}
-
-    @classmethod
-    def pipe(cls, nlp: Language) -> None:
-        cls.term_pipe(nlp)
-        cls.range_length_pipe(nlp)
-        cls.tic_pipe(nlp)
-        cls.length_pipe(nlp)
-        cls.cleanup_pipe(nlp)
-
-    @classmethod
-    def to_obj(cls, ent: Span, dict_func: DictFunc) -> "TragusLength":
-        base = cls.class_dict(ent, dict_func)
-        return cls(**base)
-
-
-@registry.misc("tragus_length_match")
-def tragus_length_match(ent: Span) -> TragusLength:
-    return TragusLength.to_obj(ent, DictFunc.LENGTH)
-
-
-@registry.misc("tragus_length_range_match")
-def tragus_length_range_match(ent: Span) -> TragusLength:
-    return TragusLength.to_obj(ent, DictFunc.RANGE)
-
-
-@registry.misc("tragus_length_tic_match")
-def tragus_length_tic_match(ent: Span) -> TragusLength:
-    return TragusLength.to_obj(ent, DictFunc.TIC)
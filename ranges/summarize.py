@@ -1,12 +1,12 @@
 #!/usr/bin/env python3
 import argparse
-import json
 import logging
 import textwrap
 from pathlib import Path
 
 from pylib import log
 
+from ranges.pylib import jsonl
 from ranges.writers import summary_writer
 
 
@@ -16,32 +16,24 @@ def main() -> None:
 
     args.output_dir.mkdir(parents=True, exist_ok=True)
 
-    logging.info("Reading JSONL data.")
-    by_institution = {}
-    all_occurrences = []
+    # Only one institution is in memory at a time, "all" is a running total
+    summary_all = summary_writer.empty_counts()
 
-    for path in sorted(args.json_dir.glob("*.jsonl")):
-        msg = "Reading JSONL for " + path.stem
+    for path in jsonl.jsonl_files(args.json_dir):
+        msg = "Writing CSV for " + path.stem
         logging.info(msg)
-        with path.open() as jin:
-            data = [json.loads(ln) for ln in jin]
-        by_institution[path.stem] = data
-        all_occurrences += data
-
-    logging.info("Writing institution CSV files.")
-    for name, occurrence in by_institution.items():
-        msg = "Writing CSV for " + name
-        logging.info(msg)
-        summary_writer.write_summary(
-            args.output_dir / f"{name}.csv",
-            occurrence,
+        counts = summary_writer.count_traits(jsonl.read_jsonl(path), args.summarize_by)
+        summary_writer.write_counts(
+            args.output_dir / f"{path.stem}.csv",
+            counts,
             args.summarize_by,
         )
+        summary_writer.merge_counts(summary_all, counts)
 
     logging.info("Summarize all data.")
-    summary_writer.write_summary(
+    summary_writer.write_counts(
         args.output_dir / "summarize_all.csv",
-        all_occurrences,
+        summary_all,
         args.summarize_by,
     )
 
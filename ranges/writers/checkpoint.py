@@ -0,0 +1,118 @@
+"""
+Record the chunks of a parse that are safely on disk so that a killed run resumes.
+
+A chunk is committed once its output is fsynced. Committing appends a line to the
+manifest with the chunk's source file, its byte range in the source, its record
+count, and where its output ends, and then the manifest is fsynced too. A resumed
+run only trusts committed chunks of unchanged source files that were parsed by
+the same pipeline, every other chunk is parsed again.
+"""
+
+import json
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Any
+
+from ranges.pylib.shard import Chunk
+from ranges.writers import json_writer
+
+CHECKPOINT_DIR = "checkpoints"
+
+
+def manifest_path(json_dir: Path, mode: str) -> Path:
+    return json_dir / CHECKPOINT_DIR / f"{mode}.jsonl"
+
+
+def read_entries(path: Path) -> list[dict[str, Any]]:
+    """Read the manifest up to a line that a crash cut short."""
+    entries = []
+    if path.exists():
+        with path.open() as jin:
+            for ln in jin:
+                try:
+                    entries.append(json.loads(ln))
+                except json.JSONDecodeError:
+                    break
+    return entries
+
+
+class Manifest:
+    """An append-only list of the chunks that are committed."""
+
+    def __init__(self, path: Path, fingerprint: str, *, resume: bool = False) -> None:
+        self.path = path
+        self.fingerprint = fingerprint
+        self.entries: dict[str, dict[str, Any]] = {}
+
+        if resume:
+            for entry in read_entries(path):
+                if entry["fingerprint"] == fingerprint:
+                    self.entries[entry["chunk"]] = entry
+
+        # Start over with only the entries that can be used
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.out = path.open("w")
+        for entry in self.entries.values():
+            self.out.write(json.dumps(entry) + "\n")
+        self.sync()
+
+    def entry(self, chunk: Chunk) -> dict[str, Any] | None:
+        """Get a chunk's entry if the chunk is committed and its source unchanged."""
+        entry = self.entries.get(chunk.name)
+        if not entry:
+            return None
+        expect = self.as_entry(chunk)
+        if any(entry.get(k) != v for k, v in expect.items()):
+            return None
+        return entry
+
+    def commit(self, chunk: Chunk, **extra: Any) -> None:
+        entry = self.as_entry(chunk) | extra
+        self.entries[chunk.name] = entry
+        self.out.write(json.dumps(entry) + "\n")
+        self.sync()
+
+    def as_entry(self, chunk: Chunk) -> dict[str, Any]:
+        entry = {
+            "chunk": chunk.name,
+            "fingerprint": self.fingerprint,
+            "start": chunk.start,
+            "end": chunk.end,
+            "records": chunk.rows,
+        }
+        return entry | json_writer.source_signature(chunk.path)
+
+    def sync(self) -> None:
+        self.out.flush()
+        os.fsync(self.out.fileno())
+
+    def close(self) -> None:
+        self.out.close()
+
+
+def resume_parts(
+    manifest: Manifest, chunks: list[Chunk], part_dir: Path, json_dir: Path
+) -> set[str]:
+    """
+    Get the chunks whose part files are committed.
+
+    A file whose parts were all done before a restart is merged now, because no
+    chunk of it is left to trigger the merge.
+    """
+    done = {
+        c.name
+        for c in chunks
+        if manifest.entry(c) and json_writer.part_path(part_dir, c).exists()
+    }
+
+    by_file = defaultdict(list)
+    for chunk in chunks:
+        by_file[chunk.path].append(chunk)
+    for file_chunks in by_file.values():
+        if all(c.name in done for c in file_chunks):
+            json_writer.merge_chunks(
+                file_chunks, part_dir, json_dir, manifest.fingerprint
+            )
+
+    return done
@@ -1,4 +1,5 @@
 from collections import defaultdict
+from collections.abc import Iterable
 from dataclasses import dataclass
 from itertools import combinations
 from pathlib import Path
@@ -6,6 +7,8 @@ from typing import Any
 
 import pandas as pd
 
+from ranges.pylib.jsonl import read_jsonl
+
 # from pprint import pp
 
 COMPARE = {
@@ -33,14 +36,70 @@ class Contestant:
 
 def write_csv(
     csv_file: Path,
-    occurrences: list[dict[str, Any]],
+    occurrences: Iterable[dict[str, Any]],
+    id_field: str,
+    info_fields: list[str] | None = None,
+    parse_fields: list[str] | None = None,
+) -> None:
+    info_fields = info_fields or []
+    parse_fields = parse_fields or []
+
+    data, trait_cols = csv_rows(occurrences, id_field, info_fields, parse_fields)
+    columns = csv_columns(trait_cols, id_field, info_fields, parse_fields)
+
+    df = pd.DataFrame(data)
+    df = df.loc[:, columns]
+
+    df = df.set_index(id_field)
+    df.to_csv(csv_file)
+
+
+def write_csv_files(
+    csv_file: Path,
+    json_files: list[Path],
     id_field: str,
     info_fields: list[str] | None = None,
     parse_fields: list[str] | None = None,
 ) -> None:
+    """
+    Write every JSONL file to one CSV file without holding them all in memory.
+
+    The first pass gathers the trait columns and the second pass appends the rows
+    one JSONL file at a time.
+    """
     info_fields = info_fields or []
     parse_fields = parse_fields or []
 
+    trait_cols = set()
+    for path in json_files:
+        _, cols = csv_rows(read_jsonl(path), id_field, info_fields, parse_fields)
+        trait_cols |= cols
+
+    columns = csv_columns(trait_cols, id_field, info_fields, parse_fields)
+
+    header = True
+    for path in json_files:
+        data, _ = csv_rows(read_jsonl(path), id_field, info_fields, parse_fields)
+        if not data:
+            continue
+
+        df = pd.DataFrame(data)
+        df = df.reindex(columns=columns)
+
+        df = df.set_index(id_field)
+        df.to_csv(csv_file, mode="w" if header else "a", header=header)
+        header = False
+
+    if header:
+        pd.DataFrame(columns=columns).set_index(id_field).to_csv(csv_file)
+
+
+def csv_rows(
+    occurrences: Iterable[dict[str, Any]],
+    id_field: str,
+    info_fields: list[str],
+    parse_fields: list[str],
+) -> tuple[list[dict[str, Any]], set[tuple[str, str]]]:
     data = []
     trait_cols = set()
 
@@ -75,9 +134,18 @@ def write_csv(
 
         data += lst
 
+    return data, trait_cols
+
+
+def csv_columns(
+    trait_cols: set[tuple[str, str]],
+    id_field: str,
+    info_fields: list[str],
+    parse_fields: list[str],
+) -> list[str]:
     # Sort columns
     trait_cols = sorted(trait_cols)
-    columns = [
+    return [
         id_field,
         ORDER,
         "source",
@@ -85,11 +153,6 @@ def write_csv(
         *parse_fields,
         *[t[1] for t in sorted(trait_cols)],
     ]
-    df = pd.DataFrame(data)
-    df = df.loc[:, columns]
-
-    df = df.set_index(id_field)
-    df.to_csv(csv_file)
 
 
 def filter_traits(name: str, traits: list[dict], max_traits: int) -> list[dict]:
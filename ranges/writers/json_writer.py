@@ -1,8 +1,136 @@
+import hashlib
+import itertools
 import json
+import os
+import re
 import traceback
+from collections import defaultdict, deque
+from collections.abc import Iterable, Iterator
+from functools import cache
 from pathlib import Path
+from typing import Any
 
-from ranges.pylib import occurrence, pipeline
+from spacy.language import Language
+
+from ranges.pylib import (
+    delta,
+    memory,
+    occurrence,
+    parse_errors,
+    pipeline,
+    prefilter,
+    profiler,
+    skipping,
+    term_index,
+)
+from ranges.pylib.parse_cache import ParseCache
+from ranges.pylib.shard import Chunk
+from ranges.rules.length_shorthand import LengthShorthand
+
+COPY_SIZE = 1024 * 1024
+
+
+@cache
+def shared_pipeline(traits: tuple[str, ...] = ()) -> Language:
+    """Build the pipeline once per process and reuse it for every file."""
+    return pipeline.load(traits)
+
+
+@cache
+def shared_fingerprint(traits: tuple[str, ...] = (), max_chars: int = 0) -> str:
+    """
+    Identify the parses without building the pipeline.
+
+    The parent process only needs the fingerprint for the stamps and the caches,
+    building the pipeline there would add a cold start to every run.
+    """
+    return parse_fingerprint(pipeline.source_fingerprint(traits), max_chars)
+
+
+def parse_fingerprint(fingerprint: str, max_chars: int = 0) -> str:
+    """Add the long text limit to a pipeline fingerprint, it changes the parses."""
+    if max_chars <= 0:
+        return fingerprint
+    return hashlib.sha256(f"{fingerprint}\0{max_chars}".encode()).hexdigest()
+
+
+@cache
+def shared_cache(
+    max_size: int,
+    db_path: Path | None = None,
+    traits: tuple[str, ...] = (),
+    max_chars: int = 0,
+) -> ParseCache | None:
+    """Keep one parse cache per process so repeated texts are shared across files."""
+    if max_size <= 0 and not db_path:
+        return None
+    fingerprint = shared_fingerprint(traits, max_chars)
+    return ParseCache(fingerprint, max_size=max_size, db_path=db_path)
+
+
+@cache
+def shared_gate() -> re.Pattern:
+    return prefilter.build()
+
+
+@cache
+def shared_term_index(
+    traits: tuple[str, ...] = (),
+) -> dict[str, term_index.SkipUnindexed]:
+    """Skip this process's term pipes without terms in the doc from now on."""
+    return term_index.index_terms(shared_pipeline(traits))
+
+
+@cache
+def shared_skipping(traits: tuple[str, ...] = ()) -> dict[str, skipping.SkipUnless]:
+    """Skip this process's pattern pipes that cannot match from now on."""
+    return skipping.skip_unmatchable(shared_pipeline(traits))
+
+
+@cache
+def shared_profiler(traits: tuple[str, ...] = ()) -> profiler.Profiler:
+    """Time the components of this process's pipeline from now on."""
+    return profiler.Profiler(shared_pipeline(traits))
+
+
+@cache
+def shared_previous(index_file: Path) -> delta.PreviousParse | None:
+    """Open the index of an earlier parse once per process, if the parent made one."""
+    if not index_file.exists():
+        return None
+    return delta.PreviousParse(index_file)
+
+
+def init_worker(traits: tuple[str, ...] = ()) -> None:
+    """Pool initializer: pay the pipeline build cost once when the worker starts."""
+    shared_pipeline(traits)
+
+
+def share_pipeline(
+    traits: tuple[str, ...] = (),
+    *,
+    use_prefilter: bool = False,
+    skip_components: bool = False,
+    index_terms: bool = False,
+    max_chars: int = 0,
+) -> str:
+    """
+    Build everything the workers read before forking them, then freeze it.
+
+    The parse caches are left to the workers, they fill up per process and the
+    SQLite connection must not cross a fork. Return the pipeline fingerprint.
+    """
+    memory.start_shared()
+    shared_pipeline(traits)
+    fingerprint = shared_fingerprint(traits, max_chars)
+    if index_terms:
+        shared_term_index(traits)
+    if skip_components:
+        shared_skipping(traits)
+    if use_prefilter:
+        shared_gate()
+    memory.freeze_shared()
+    return fingerprint
 
 
 def process_occurrences(
@@ -13,6 +141,19 @@ def process_occurrences(
     parse_fields: list[str] | None = None,
     overwrite_fields: list[str] | None = None,
     *,
+    fmt: str = "",
+    block_size: int = 10_000,
+    batch_size: int = 1000,
+    cache_size: int = 0,
+    cache_db: Path | None = None,
+    profile_dir: Path | None = None,
+    use_prefilter: bool = False,
+    skip_components: bool = False,
+    index_terms: bool = False,
+    fast_shorthand: bool = False,
+    max_chars: int = 0,
+    previous_index: Path | None = None,
+    traits: tuple[str, ...] = (),
     debug: bool = False,
 ) -> str:
     info_fields = info_fields or []
@@ -20,23 +161,36 @@ def process_occurrences(
     overwrite_fields = overwrite_fields or []
 
     try:
-        occurrences = occurrence.read_occurrences(
+        blocks = occurrence.read_blocks(
             csv_file,
+            block_size=block_size,
             id_field=id_field,
             info_fields=info_fields,
             parse_fields=parse_fields,
             overwrite_fields=overwrite_fields,
+            fmt=fmt,
         )
 
-        nlp = pipeline.build()
-        occurrence.parse_occurrences(occurrences, nlp)
-
         json_file = json_dir / f"{csv_file.stem}.jsonl"
-        with json_file.open("w") as out:
-            for occur in occurrences:
-                as_dict = occur.as_dict()
-                json.dump(as_dict, out)
-                out.write("\n")
+
+        count = parse_and_write(
+            blocks,
+            json_file,
+            batch_size=batch_size,
+            cache_size=cache_size,
+            cache_db=cache_db,
+            profile_dir=profile_dir,
+            use_prefilter=use_prefilter,
+            skip_components=skip_components,
+            index_terms=index_terms,
+            fast_shorthand=fast_shorthand,
+            max_chars=max_chars,
+            previous_index=previous_index,
+            traits=traits,
+        )
+
+        fingerprint = shared_fingerprint(traits, max_chars)
+        write_stamp(json_file, csv_file, fingerprint, count)
 
     except:  # noqa: E722
         if debug:
@@ -44,3 +198,350 @@ def process_occurrences(
         return csv_file.stem
 
     return ""
+
+
+def process_chunk(
+    chunk: Chunk,
+    part_dir: Path,
+    id_field: str,
+    info_fields: list[str] | None = None,
+    parse_fields: list[str] | None = None,
+    overwrite_fields: list[str] | None = None,
+    *,
+    block_size: int = 10_000,
+    batch_size: int = 1000,
+    cache_size: int = 0,
+    cache_db: Path | None = None,
+    profile_dir: Path | None = None,
+    use_prefilter: bool = False,
+    skip_components: bool = False,
+    index_terms: bool = False,
+    fast_shorthand: bool = False,
+    max_chars: int = 0,
+    previous_index: Path | None = None,
+    traits: tuple[str, ...] = (),
+    debug: bool = False,
+) -> str:
+    """Parse one chunk of a file into its own part file."""
+    info_fields = info_fields or []
+    parse_fields = parse_fields or []
+    overwrite_fields = overwrite_fields or []
+
+    try:
+        blocks = occurrence.read_blocks(
+            chunk.path,
+            block_size=block_size,
+            id_field=id_field,
+            info_fields=info_fields,
+            parse_fields=parse_fields,
+            overwrite_fields=overwrite_fields,
+            chunk=chunk,
+        )
+
+        parse_and_write(
+            blocks,
+            part_path(part_dir, chunk),
+            batch_size=batch_size,
+            cache_size=cache_size,
+            cache_db=cache_db,
+            profile_dir=profile_dir,
+            use_prefilter=use_prefilter,
+            skip_components=skip_components,
+            index_terms=index_terms,
+            fast_shorthand=fast_shorthand,
+            max_chars=max_chars,
+            previous_index=previous_index,
+            traits=traits,
+        )
+
+    except:  # noqa: E722
+        if debug:
+            print(traceback.format_exc())
+        return chunk.name
+
+    return ""
+
+
+def parse_and_write(
+    blocks: Iterable[list[occurrence.Occurrence]], json_file: Path, **options: Any
+) -> int:
+    """
+    Parse and write one block at a time. Return the number of occurrences.
+
+    The JSONL file only shows up once it is complete, until then the old one is
+    kept. The options are the same as for parse_blocks().
+    """
+    count = 0
+    temp_file = partial_path(json_file)
+    with (
+        temp_file.open("w") as out,
+        parse_errors.ErrorLog(parse_errors.error_path(json_file)) as error_log,
+    ):
+        for lines, size, errors in parse_blocks(blocks, json_file.stem, **options):
+            out.write(lines)
+            error_log.write(errors)
+            count += size
+    fsync(temp_file)
+    stamp_path(json_file).unlink(missing_ok=True)
+    temp_file.replace(json_file)
+    return count
+
+
+def parse_blocks(
+    blocks: Iterable[list[occurrence.Occurrence]],
+    name: str,
+    *,
+    batch_size: int = 1000,
+    cache_size: int = 0,
+    cache_db: Path | None = None,
+    profile_dir: Path | None = None,
+    use_prefilter: bool = False,
+    skip_components: bool = False,
+    index_terms: bool = False,
+    fast_shorthand: bool = False,
+    max_chars: int = 0,
+    previous_index: Path | None = None,
+    traits: tuple[str, ...] = (),
+) -> Iterator[tuple[str, int, str]]:
+    """
+    Parse one block at a time.
+
+    Yield the block's JSON lines, its occurrence count, and the JSON lines of its
+    errors. Records that are unchanged since the earlier parse indexed in the
+    previous_index directory get their traits from it.
+    """
+    nlp = shared_pipeline(traits)
+    if index_terms:
+        shared_term_index(traits)
+    if skip_components:
+        shared_skipping(traits)  # Before the profiler so it times the skipped pipes
+    cache = shared_cache(cache_size, cache_db, traits, max_chars)
+    profile = shared_profiler(traits) if profile_dir else None
+    gate = shared_gate() if use_prefilter else None
+    fast_path = None
+    if fast_shorthand and "length_shorthand" in pipeline.select_rules(traits):
+        fast_path = LengthShorthand.fast_parse
+
+    previous = None
+    for block in blocks:
+        if previous_index:
+            index_file = delta.index_path(previous_index, Path(block[0].source))
+            previous = shared_previous(index_file)
+        reused = reused_traits(block, previous) if previous else {}
+        errors = []
+        occurrence.parse_occurrences(
+            [o for i, o in enumerate(block) if i not in reused],
+            nlp,
+            batch_size=batch_size,
+            cache=cache,
+            gate=gate,
+            fast_path=fast_path,
+            max_chars=max_chars,
+            errors=errors,
+        )
+        lines = "".join(
+            reused_line(o, reused[i]) if i in reused else as_line(o, errors)
+            for i, o in enumerate(block)
+        )
+        yield lines, len(block), "".join(errors)
+
+    if cache:
+        cache.log_stats(name)
+        cache.reset_stats()
+
+    if profile:
+        profile.dump(profile_dir)
+
+    if previous:
+        previous.dump()
+
+
+def reused_traits(
+    block: list[occurrence.Occurrence], previous: delta.PreviousParse
+) -> dict[int, list[dict[str, Any]]]:
+    """Get the earlier traits of the unchanged records by their place in the block."""
+    reused = {}
+    for i, occur in enumerate(block):
+        if (old := previous.traits(occur)) is not None:
+            reused[i] = old
+    return reused
+
+
+def reused_line(occur: occurrence.Occurrence, traits: list[dict[str, Any]]) -> str:
+    return json.dumps(occur.as_dict() | {"traits": traits}) + "\n"
+
+
+def as_line(occur: occurrence.Occurrence, errors: list[str]) -> str:
+    """Write an occurrence without its traits if they cannot be written."""
+    try:
+        return json.dumps(occur.as_dict()) + "\n"
+    except Exception:  # noqa: BLE001
+        error = traceback.format_exc()
+        errors.append(parse_errors.record_error(occur, None, "", error))
+        occur.traits = {}
+        return json.dumps(occur.as_dict()) + "\n"
+
+
+def retry_failed(
+    csv_file: Path,
+    json_dir: Path,
+    id_field: str,
+    info_fields: list[str] | None = None,
+    parse_fields: list[str] | None = None,
+    overwrite_fields: list[str] | None = None,
+    *,
+    fmt: str = "",
+    block_size: int = 10_000,
+    **options: Any,
+) -> tuple[int, int]:
+    """
+    Parse the records in a file's error log again and put them into its JSONL file.
+
+    The options are the same as for parse_blocks(). Return how many records were
+    parsed again and how many errors they still have.
+    """
+    json_file = json_dir / f"{csv_file.stem}.jsonl"
+    error_file = parse_errors.error_path(json_file)
+    ids = {e["id"] for e in parse_errors.read_errors(error_file)}
+    if not ids or not json_file.exists():
+        return 0, 0
+
+    occurrences = occurrence.read_occurrences(
+        csv_file,
+        id_field=id_field,
+        info_fields=info_fields or [],
+        parse_fields=parse_fields or [],
+        overwrite_fields=overwrite_fields or [],
+        fmt=fmt,
+    )
+    failed = (o for o in occurrences if o.id_field[1] in ids)
+    blocks = iter(lambda: list(itertools.islice(failed, block_size)), [])
+
+    retried = defaultdict(deque)
+    with parse_errors.ErrorLog(error_file) as error_log:
+        for lines, _, errors in parse_blocks(blocks, csv_file.stem, **options):
+            for line in lines.splitlines(keepends=True):
+                retried[json.loads(line)[id_field]].append(line)
+            error_log.write(errors)
+
+    # Swap the new lines in for the old ones, records keep their place in the file
+    count = sum(len(v) for v in retried.values())
+    temp_file = partial_path(json_file)
+    with json_file.open() as jin, temp_file.open("w") as out:
+        for line in jin:
+            id_ = json.loads(line)[id_field]
+            out.write(retried[id_].popleft() if retried.get(id_) else line)
+    temp_file.replace(json_file)
+
+    return count, error_log.count
+
+
+def part_path(part_dir: Path, chunk: Chunk) -> Path:
+    return part_dir / f"{chunk.name}.jsonl"
+
+
+def merge_chunks(
+    chunks: list[Chunk], part_dir: Path, json_dir: Path, fingerprint: str
+) -> None:
+    """Put the chunk outputs back into one JSONL file in their original order."""
+    csv_file = chunks[0].path
+    json_file = json_dir / f"{csv_file.stem}.jsonl"
+
+    count = 0
+    temp_file = partial_path(json_file)
+    with (
+        temp_file.open("wb") as out,
+        parse_errors.ErrorLog(parse_errors.error_path(json_file)) as error_log,
+    ):
+        for chunk in chunks:
+            part = part_path(part_dir, chunk)
+            with part.open("rb") as fin:
+                while data := fin.read(COPY_SIZE):
+                    out.write(data)
+                    count += data.count(b"\n")
+
+            part_errors = parse_errors.error_path(part)
+            if part_errors.exists():
+                error_log.write(part_errors.read_text())
+
+    fsync(temp_file)
+    stamp_path(json_file).unlink(missing_ok=True)
+    temp_file.replace(json_file)
+    write_stamp(json_file, csv_file, fingerprint, count)
+
+    # The parts are checkpoints until the merged file is in place
+    remove_parts(chunks, part_dir)
+
+
+def discard_chunks(chunks: list[Chunk], part_dir: Path, json_dir: Path) -> None:
+    """
+    Give up on a file when one of its chunks did not parse.
+
+    Its old JSONL file is kept but it loses its stamp, so that it is parsed again
+    instead of passing as current. The parts of its other chunks are removed.
+    """
+    json_file = json_dir / f"{chunks[0].path.stem}.jsonl"
+    stamp_path(json_file).unlink(missing_ok=True)
+    remove_parts(chunks, part_dir)
+
+
+def remove_parts(chunks: list[Chunk], part_dir: Path) -> None:
+    for chunk in chunks:
+        part = part_path(part_dir, chunk)
+        part.unlink(missing_ok=True)
+        partial_path(part).unlink(missing_ok=True)
+        parse_errors.error_path(part).unlink(missing_ok=True)
+
+
+def partial_path(json_file: Path) -> Path:
+    """Write here first so that a JSONL file is only there when it is complete."""
+    return json_file.with_suffix(".jsonl.partial")
+
+
+def fsync(path: Path) -> None:
+    """Make sure that a file is on disk, even one written by another process."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def stamp_path(json_file: Path) -> Path:
+    return json_file.with_suffix(".stamp.json")
+
+
+def source_signature(csv_file: Path) -> dict[str, Any]:
+    stat = csv_file.stat()
+    return {
+        "source": str(csv_file),
+        "source_size": stat.st_size,
+        "source_mtime": stat.st_mtime,
+    }
+
+
+def write_stamp(json_file: Path, csv_file: Path, fingerprint: str, count: int) -> None:
+    """Record which pipeline and input produced a JSONL file."""
+    stamp = {"fingerprint": fingerprint, "records": count}
+    stamp |= source_signature(csv_file)
+    with stamp_path(json_file).open("w") as out:
+        json.dump(stamp, out, indent=4)
+
+
+def read_stamp(json_file: Path) -> dict[str, Any]:
+    path = stamp_path(json_file)
+    if not json_file.exists() or not path.exists():
+        return {}
+    with path.open() as jin:
+        return json.load(jin)
+
+
+def is_current(json_file: Path, fingerprint: str, csv_file: Path | None = None) -> bool:
+    """Check if the JSONL file was made by this pipeline from this input."""
+    stamp = read_stamp(json_file)
+    if stamp.get("fingerprint") != fingerprint:
+        return False
+    if csv_file:
+        signature = source_signature(csv_file)
+        return all(stamp.get(k) == v for k, v in signature.items())
+    return True
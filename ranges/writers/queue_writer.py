@@ -0,0 +1,417 @@
+"""
+Parse chunks in worker processes and write every file from one writer process.
+
+The parent puts the chunks on a bounded task queue. Each worker parses a chunk one
+block at a time and puts the block's JSON lines on a bounded result queue, so the
+workers wait when the writer falls behind instead of filling up memory. The
+writer puts each file's blocks back into source order and writes them with a
+large buffer. Only one process writes to the output directory, and parsing and
+writing overlap.
+
+The parent watches the other processes. When a worker dies without saying that it
+is done, the parent says it for the worker, and the writer fails every chunk that
+did not finish. When the writer dies, the parent fails all of the chunks and stops
+the workers.
+"""
+
+import logging
+import os
+import queue
+import time
+import traceback
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass
+from multiprocessing.context import BaseContext
+from pathlib import Path
+from typing import Any, TextIO
+
+from tqdm import tqdm
+
+from ranges.pylib import memory, occurrence, parse_errors
+from ranges.pylib.shard import Chunk
+from ranges.writers import checkpoint, json_writer
+
+QUEUE_PER_CPU = 2
+WRITE_BUFFER = 16 * 1024 * 1024
+POLL_SECONDS = 1  # How often the parent checks on the other processes
+STOP_SECONDS = 30  # How long to wait for a worker to exit before terminating it
+
+# The name of the writer's checkpoint manifest
+MODE = "writer"
+
+# Put on the result queue by a worker that has no more chunks
+DONE = None
+
+
+@dataclass
+class Result:
+    chunk: Chunk
+    lines: str = ""
+    count: int = 0
+    errors: str = ""  # JSON lines of the records that did not parse
+    last: bool = False  # The chunk's last result
+    error: str = ""  # The chunk did not parse
+
+
+class OrderedFile:
+    """Write the chunks of one input file in source order as they are parsed."""
+
+    def __init__(
+        self,
+        chunks: list[Chunk],
+        json_dir: Path,
+        fingerprint: str,
+        buffering: int,
+        manifest: checkpoint.Manifest | None = None,
+    ) -> None:
+        self.csv_file = chunks[0].path
+        self.json_file = json_dir / f"{self.csv_file.stem}.jsonl"
+        self.temp_file = json_writer.partial_path(self.json_file)
+        self.fingerprint = fingerprint
+        self.buffering = buffering
+        self.manifest = manifest
+        self.file_chunks = chunks
+        self.chunks = len(chunks)
+        self.pending: dict[int, list[tuple[str, str]]] = defaultdict(list)
+        self.finished: set[int] = set()
+        self.failed = False
+        self.out: TextIO | None = None
+
+        # Pick up after the last committed chunk, a new parse starts at the first
+        self.next = committed(chunks, self.temp_file, manifest)  # Being written
+        self.count = 0
+        keep_errors = 0
+        if self.next:
+            entries = [manifest.entry(c) for c in chunks[: self.next]]
+            self.count = sum(e["records"] for e in entries)
+            keep_errors = entries[-1]["errors"]
+            os.truncate(self.temp_file, entries[-1]["output"])
+            self.out = self.temp_file.open("a", buffering=self.buffering)
+        self.error_log = parse_errors.ErrorLog(
+            parse_errors.error_path(self.temp_file), keep=keep_errors
+        )
+        if self.next == self.chunks:
+            self.close()
+
+    @property
+    def done(self) -> bool:
+        return self.failed or self.next == self.chunks
+
+    def add(self, result: Result) -> None:
+        """Write the result now if it is next, otherwise hold it until it is."""
+        if self.done:
+            return
+
+        if result.error:
+            self.fail()
+            return
+
+        self.pending[result.chunk.index].append((result.lines, result.errors))
+        self.count += result.count
+        if result.last:
+            self.finished.add(result.chunk.index)
+
+        while self.next < self.chunks:
+            self.write(self.pending.pop(self.next, []))
+            if self.next not in self.finished:
+                break
+            self.commit(self.file_chunks[self.next])
+            self.next += 1
+
+        if self.next == self.chunks:
+            self.close()
+
+    def write(self, results: list[tuple[str, str]]) -> None:
+        if not self.out:
+            self.out = self.temp_file.open("w", buffering=self.buffering)
+        for lines, errors in results:
+            self.out.write(lines)
+            self.error_log.write(errors)
+
+    def commit(self, chunk: Chunk) -> None:
+        """Checkpoint the output up to the end of the chunk."""
+        if not self.manifest:
+            return
+        self.out.flush()
+        os.fsync(self.out.fileno())
+        output = os.fstat(self.out.fileno()).st_size
+        self.manifest.commit(chunk, output=output, errors=self.error_log.sync())
+
+    def close(self) -> None:
+        """Replace the old output only when the whole file is parsed."""
+        self.write([])
+        self.out.close()
+        self.error_log.close()
+        json_writer.stamp_path(self.json_file).unlink(missing_ok=True)
+        self.temp_file.replace(self.json_file)
+        errors = parse_errors.error_path(self.json_file)
+        errors.unlink(missing_ok=True)
+        if self.error_log.path.exists():
+            self.error_log.path.replace(errors)
+        json_writer.write_stamp(
+            self.json_file, self.csv_file, self.fingerprint, self.count
+        )
+
+    def unfinished(self) -> list[Chunk]:
+        """Get the chunks that were never completely parsed."""
+        if self.done:
+            return []
+        return [
+            c for c in self.file_chunks[self.next :] if c.index not in self.finished
+        ]
+
+    def fail(self) -> None:
+        """Keep the old output of a file that did not parse."""
+        self.failed = True
+        self.pending.clear()
+        if self.out:
+            self.out.close()
+        self.error_log.close()
+        self.temp_file.unlink(missing_ok=True)
+        self.error_log.path.unlink(missing_ok=True)
+
+
+def committed(
+    chunks: list[Chunk], temp_file: Path, manifest: checkpoint.Manifest | None = None
+) -> int:
+    """Count the chunks at the start of a file that are in its partial output."""
+    if not manifest or not temp_file.exists():
+        return 0
+    size = temp_file.stat().st_size
+    count = 0
+    for chunk in chunks:
+        entry = manifest.entry(chunk)
+        if not entry or "output" not in entry or entry["output"] > size:
+            break
+        count += 1
+    return count
+
+
+def parse_worker(
+    tasks: Any,
+    results: Any,
+    initializer: Callable[..., None],
+    initargs: tuple,
+    fields: dict[str, Any],
+    options: dict[str, Any],
+) -> None:
+    """Parse chunks from the task queue until it is empty."""
+    initializer(*initargs)
+    while (chunk := tasks.get()) is not DONE:
+        try:
+            blocks = occurrence.read_blocks(chunk.path, chunk=chunk, **fields)
+            for lines, count, errors in json_writer.parse_blocks(
+                blocks, chunk.name, **options
+            ):
+                results.put(Result(chunk, lines, count, errors))
+            results.put(Result(chunk, last=True))
+        except:  # noqa: E722
+            results.put(Result(chunk, last=True, error=traceback.format_exc()))
+    results.put(DONE)
+
+
+def write_results(
+    results: Any,
+    summary: Any,
+    chunks: list[Chunk],
+    json_dir: Path,
+    fingerprint: str,
+    workers: int,
+    buffering: int = WRITE_BUFFER,
+) -> None:
+    """
+    Write the results of every worker, then report the failed chunks.
+
+    The report is always sent, even when the writer breaks, so the parent never
+    waits on a writer that is gone.
+    """
+    fails = []
+    files = {}
+    manifest = None
+    try:
+        # The parent already dropped the entries that cannot be resumed
+        manifest = checkpoint.Manifest(
+            checkpoint.manifest_path(json_dir, MODE), fingerprint, resume=True
+        )
+        for path, file_chunks in by_file(chunks).items():
+            files[path] = OrderedFile(
+                file_chunks, json_dir, fingerprint, buffering, manifest
+            )
+        skipped = sum(f.next for f in files.values())
+
+        with tqdm(total=len(chunks), initial=skipped) as bar:
+            while workers:
+                result = results.get()
+                if result is DONE:
+                    workers -= 1
+                    continue
+                files[result.chunk.path].add(result)
+                if result.error:
+                    fails.append((result.chunk.name, result.error))
+                if result.last:
+                    bar.update(1)
+
+        # A worker died in the middle of these chunks, or never got to them
+        for ordered in files.values():
+            if unfinished := ordered.unfinished():
+                fails += [(c.name, "The chunk was never parsed.") for c in unfinished]
+                ordered.fail()
+
+    except:  # noqa: E722
+        error = traceback.format_exc()
+        written = {p for p, f in files.items() if f.done and not f.failed}
+        fails = [(c.name, error) for c in chunks if c.path not in written]
+
+    finally:
+        if manifest:
+            manifest.close()
+        summary.put(fails)
+
+
+def by_file(chunks: list[Chunk]) -> dict[Path, list[Chunk]]:
+    grouped = defaultdict(list)
+    for chunk in chunks:
+        grouped[chunk.path].append(chunk)
+    return grouped
+
+
+def resume_chunks(
+    chunks: list[Chunk], json_dir: Path, fingerprint: str, *, resume: bool = False
+) -> list[Chunk]:
+    """Get the chunks that are not committed yet, all of them for a new parse."""
+    path = checkpoint.manifest_path(json_dir, MODE)
+    manifest = checkpoint.Manifest(path, fingerprint, resume=resume)
+    manifest.close()
+
+    todo = []
+    for file_chunks in by_file(chunks).values():
+        temp_file = json_writer.partial_path(
+            json_dir / f"{file_chunks[0].path.stem}.jsonl"
+        )
+        todo += file_chunks[committed(file_chunks, temp_file, manifest) :]
+
+    if skipped := len(chunks) - len(todo):
+        msg = f"Resuming after {skipped} of {len(chunks)} chunks that are done."
+        logging.info(msg)
+
+    return todo
+
+
+def put_task(tasks: Any, task: Chunk | None, workers: list[Any], writer: Any) -> bool:
+    """Put a task on the queue. Give up when no process is left to handle it."""
+    while True:
+        try:
+            tasks.put(task, timeout=POLL_SECONDS)
+        except queue.Full:
+            if not writer.is_alive() or not any(w.is_alive() for w in workers):
+                return False
+        else:
+            return True
+
+
+def wait_for(
+    summary: Any,
+    results: Any,
+    workers: list[Any],
+    writer: Any,
+    chunks: list[Chunk],
+    monitor: memory.MemoryMonitor | None = None,
+) -> list[tuple[str, str]]:
+    """
+    Wait for the writer's report, sampling worker memory while it runs.
+
+    A worker that was killed, or whose initializer raised, never tells the writer
+    that it is done, so the parent does it instead.
+    """
+    lost = set()
+    while True:
+        if monitor:
+            monitor.sample(w.pid for w in workers)
+        try:
+            return summary.get(timeout=POLL_SECONDS)
+        except queue.Empty:
+            pass
+
+        if not writer.is_alive():
+            try:
+                return summary.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                error = f"The writer stopped with exit code {writer.exitcode}."
+                return [(c.name, error) for c in chunks]
+
+        for worker in workers:
+            if worker.exitcode and worker.pid not in lost:
+                try:
+                    results.put(DONE, timeout=POLL_SECONDS)
+                except queue.Full:
+                    break  # Try again after the writer catches up
+                lost.add(worker.pid)
+                msg = f"Worker {worker.pid} stopped with exit code {worker.exitcode}."
+                logging.error(msg)
+
+
+def stop(workers: list[Any]) -> None:
+    """Let the workers exit, terminating the ones stuck on a writer that is gone."""
+    deadline = time.monotonic() + STOP_SECONDS
+    for worker in workers:
+        worker.join(timeout=max(0, deadline - time.monotonic()))
+        if worker.is_alive():
+            worker.terminate()
+            worker.join()
+
+
+def parse_and_write(
+    context: BaseContext,
+    chunks: list[Chunk],
+    json_dir: Path,
+    fingerprint: str,
+    *,
+    cpus: int,
+    initializer: Callable[..., None],
+    initargs: tuple,
+    fields: dict[str, Any],
+    options: dict[str, Any],
+    monitor: memory.MemoryMonitor | None = None,
+    resume: bool = False,
+) -> list[str]:
+    """Parse the chunks with the workers and the writer. Return the failed chunks."""
+    todo = resume_chunks(chunks, json_dir, fingerprint, resume=resume)
+
+    tasks = context.Queue(maxsize=cpus * QUEUE_PER_CPU)
+    results = context.Queue(maxsize=cpus * QUEUE_PER_CPU)
+    summary = context.Queue()
+
+    writer = context.Process(
+        target=write_results,
+        args=(results, summary, chunks, json_dir, fingerprint, cpus),
+    )
+    writer.start()
+
+    workers = [
+        context.Process(
+            target=parse_worker,
+            args=(tasks, results, initializer, initargs, fields, options),
+        )
+        for _ in range(cpus)
+    ]
+    for worker in workers:
+        worker.start()
+
+    for task in [*todo, *([DONE] * len(workers))]:
+        if not put_task(tasks, task, workers, writer):
+            break
+        if monitor:
+            monitor.sample(w.pid for w in workers)
+
+    fails = wait_for(summary, results, workers, writer, todo, monitor)
+    stop(workers)
+    writer.join()
+    tasks.cancel_join_thread()  # Tasks that no worker took are dropped
+    results.cancel_join_thread()
+
+    for name, error in fails:
+        msg = f"Chunk {name} did not parse:\n{error}"
+        logging.error(msg)
+
+    return [name for name, _ in fails]
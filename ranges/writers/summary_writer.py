@@ -1,24 +1,45 @@
 from collections import defaultdict
+from collections.abc import Iterable
 from pathlib import Path
 from typing import Any
 
 import pandas as pd
 
+Counts = dict[str, dict[str, int]]
+
 
 def write_summary(
     summary_path: Path,
-    occurrences: list[dict[str, Any]],
+    occurrences: Iterable[dict[str, Any]],
     summarize_by: str,
 ) -> None:
-    summary = defaultdict(lambda: defaultdict(int))
+    write_counts(summary_path, count_traits(occurrences, summarize_by), summarize_by)
+
+
+def count_traits(occurrences: Iterable[dict[str, Any]], summarize_by: str) -> Counts:
+    summary = empty_counts()
     for occur in occurrences:
         key = occur["info_fields"][summarize_by]
         summary[key]["occurrences"] += 1
         for trait in occur["traits"]:
             summary[key][trait["_trait"]] += 1
+    return summary
 
-    flat = [{summarize_by: k} | v for k, v in summary.items()]
 
+def merge_counts(total: Counts, counts: Counts) -> Counts:
+    """Add partial counts to a running total so all data never needs to be loaded."""
+    for key, traits in counts.items():
+        for trait, count in traits.items():
+            total[key][trait] += count
+    return total
+
+
+def empty_counts() -> Counts:
+    return defaultdict(lambda: defaultdict(int))
+
+
+def write_counts(summary_path: Path, summary: Counts, summarize_by: str) -> None:
+    flat = [{summarize_by: k} | v for k, v in summary.items()]
     df = pd.DataFrame(flat).fillna(0)
     df = df.set_index(summarize_by)
     df = df.astype(int)
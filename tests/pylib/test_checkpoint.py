@@ -0,0 +1,146 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from ranges.pylib import parse_errors, shard
+from ranges.writers import checkpoint, json_writer
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.temp_dir.name)
+        self.csv_file = self.dir / "occurrences.csv"
+        self.csv_file.write_text("id,text\n1,a\n2,b\n3,c\n")
+        self.chunks = shard.chunk_file(self.csv_file, 1)
+        self.path = checkpoint.manifest_path(self.dir, "parts")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_checkpoint_01(self) -> None:
+        """It only resumes chunks committed by the same pipeline."""
+        manifest = checkpoint.Manifest(self.path, "old")
+        manifest.commit(self.chunks[0])
+        manifest.close()
+        manifest = checkpoint.Manifest(self.path, "new", resume=True)
+        manifest.commit(self.chunks[1])
+        manifest.close()
+        manifest = checkpoint.Manifest(self.path, "new", resume=True)
+        manifest.close()
+        self.assertIsNone(manifest.entry(self.chunks[0]))
+        self.assertIsNotNone(manifest.entry(self.chunks[1]))
+        self.assertEqual(len(checkpoint.read_entries(self.path)), 1)
+
+    def test_checkpoint_02(self) -> None:
+        """It does not resume chunks of a source file that changed."""
+        manifest = checkpoint.Manifest(self.path, "fp")
+        manifest.commit(self.chunks[0])
+        manifest.close()
+        with self.csv_file.open("a") as out:
+            out.write("4,d\n")
+        manifest = checkpoint.Manifest(self.path, "fp", resume=True)
+        manifest.close()
+        self.assertIsNone(manifest.entry(self.chunks[0]))
+
+    def test_checkpoint_03(self) -> None:
+        """It ignores a manifest line that a crash cut short."""
+        manifest = checkpoint.Manifest(self.path, "fp")
+        manifest.commit(self.chunks[0])
+        manifest.close()
+        with self.path.open("a") as out:
+            out.write('{"chunk": "occurrences.0000')
+        manifest = checkpoint.Manifest(self.path, "fp", resume=True)
+        manifest.close()
+        self.assertIsNotNone(manifest.entry(self.chunks[0]))
+        self.assertEqual(
+            [e["chunk"] for e in checkpoint.read_entries(self.path)],
+            [self.chunks[0].name],
+        )
+
+    def test_checkpoint_04(self) -> None:
+        """It starts over when not resuming."""
+        manifest = checkpoint.Manifest(self.path, "fp")
+        manifest.commit(self.chunks[0])
+        manifest.close()
+        manifest = checkpoint.Manifest(self.path, "fp")
+        manifest.close()
+        self.assertIsNone(manifest.entry(self.chunks[0]))
+        self.assertEqual(self.path.read_text(), "")
+
+    def test_checkpoint_05(self) -> None:
+        """It merges a file whose parts were all done before a restart."""
+        part_dir = self.dir / "parts"
+        part_dir.mkdir()
+        manifest = checkpoint.Manifest(self.path, "fp")
+        for chunk in self.chunks:
+            json_writer.part_path(part_dir, chunk).write_text(f"{chunk.index}\n")
+            manifest.commit(chunk)
+        error_file = parse_errors.error_path(json_writer.part_path(part_dir, chunk))
+        error_file.parent.mkdir()
+        error_file.write_text('{"id": "3"}\n')
+        manifest.close()
+
+        manifest = checkpoint.Manifest(self.path, "fp", resume=True)
+        done = checkpoint.resume_parts(manifest, self.chunks, part_dir, self.dir)
+        manifest.close()
+
+        json_file = self.dir / "occurrences.jsonl"
+        self.assertEqual(done, {c.name for c in self.chunks})
+        self.assertEqual(json_file.read_text(), "0\n1\n2\n")
+        self.assertTrue(json_writer.is_current(json_file, "fp", self.csv_file))
+        errors = parse_errors.read_errors(parse_errors.error_path(json_file))
+        self.assertEqual([e["id"] for e in errors], ["3"])
+        self.assertEqual(list(part_dir.glob("*.jsonl")), [])
+
+    def test_checkpoint_06(self) -> None:
+        """It parses chunks again whose parts are missing, and merges nothing."""
+        part_dir = self.dir / "parts"
+        part_dir.mkdir()
+        manifest = checkpoint.Manifest(self.path, "fp")
+        for chunk in self.chunks:
+            manifest.commit(chunk)
+        for chunk in self.chunks[:2]:
+            json_writer.part_path(part_dir, chunk).write_text(f"{chunk.index}\n")
+        manifest.close()
+
+        manifest = checkpoint.Manifest(self.path, "fp", resume=True)
+        done = checkpoint.resume_parts(manifest, self.chunks, part_dir, self.dir)
+        manifest.close()
+
+        self.assertEqual(done, {c.name for c in self.chunks[:2]})
+        self.assertFalse((self.dir / "occurrences.jsonl").exists())
+
+    def test_checkpoint_07(self) -> None:
+        """It records where the committed output ends."""
+        manifest = checkpoint.Manifest(self.path, "fp")
+        manifest.commit(self.chunks[0], output=10, errors=0)
+        manifest.close()
+        with self.path.open() as jin:
+            entry = json.loads(jin.readline())
+        self.assertEqual(entry["output"], 10)
+        self.assertEqual(entry["source_size"], self.csv_file.stat().st_size)
+
+    def test_checkpoint_08(self) -> None:
+        """It keeps the old output of a file with a failed chunk but not its stamp."""
+        part_dir = self.dir / "parts"
+        part_dir.mkdir()
+        json_file = self.dir / "occurrences.jsonl"
+        json_file.write_text("old\n")
+        json_writer.write_stamp(json_file, self.csv_file, "fp", 1)
+        manifest = checkpoint.Manifest(self.path, "fp")
+        for chunk in self.chunks[:2]:
+            json_writer.part_path(part_dir, chunk).write_text(f"{chunk.index}\n")
+            manifest.commit(chunk)
+        manifest.close()
+
+        json_writer.discard_chunks(self.chunks, part_dir, self.dir)
+
+        self.assertEqual(json_file.read_text(), "old\n")
+        self.assertFalse(json_writer.is_current(json_file, "fp"))
+        self.assertEqual(list(part_dir.iterdir()), [])
+        manifest = checkpoint.Manifest(self.path, "fp", resume=True)
+        done = checkpoint.resume_parts(manifest, self.chunks, part_dir, self.dir)
+        manifest.close()
+        self.assertEqual(done, set())
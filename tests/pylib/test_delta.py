@@ -0,0 +1,83 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from ranges.pylib import delta, parse_errors
+from ranges.pylib.occurrence import Occurrence
+
+
+def make_occurrence(id_: str, text: str) -> Occurrence:
+    return Occurrence(
+        source="occurrences.csv",
+        id_field=("occurrenceID", id_),
+        parse_fields={"dynamicProperties": text},
+        overwrite_fields={"sex": ""},
+    )
+
+
+class TestDelta(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.json_file = Path(self.temp_dir.name) / "occurrences.jsonl"
+        self.index_dir = Path(self.temp_dir.name) / "previous"
+        with self.json_file.open("w") as out:
+            for id_, text in [("id1", "one"), ("id2", "two"), ("id3", "three")]:
+                record = make_occurrence(id_, text).as_dict()
+                record["traits"] = [{"_trait": text}]
+                out.write(json.dumps(record) + "\n")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def previous(self) -> delta.PreviousParse:
+        delta.write_index(self.json_file, "occurrenceID", self.index_dir)
+        previous = delta.PreviousParse(delta.index_path(self.index_dir, self.json_file))
+        self.addCleanup(previous.close)
+        return previous
+
+    def test_delta_01(self) -> None:
+        """It gets the earlier traits of unchanged records only."""
+        previous = self.previous()
+        self.assertEqual(
+            previous.traits(make_occurrence("id2", "two")), [{"_trait": "two"}]
+        )
+        self.assertIsNone(previous.traits(make_occurrence("id2", "changed")))
+        self.assertIsNone(previous.traits(make_occurrence("id9", "two")))
+
+    def test_delta_02(self) -> None:
+        """It counts new, changed, deleted, and reused records."""
+        previous = self.previous()
+        for occur in [
+            make_occurrence("id1", "one"),
+            make_occurrence("id2", "changed"),
+            make_occurrence("id4", "four"),
+        ]:
+            previous.traits(occur)
+        previous.dump()
+        self.assertEqual(
+            delta.merge_counts(self.index_dir, self.json_file, 3),
+            {"new": 1, "changed": 1, "deleted": 1, "reused": 1},
+        )
+
+    def test_delta_03(self) -> None:
+        """It parses records in the earlier error log again."""
+        error_file = parse_errors.error_path(self.json_file)
+        with parse_errors.ErrorLog(error_file) as error_log:
+            error_log.write(json.dumps({"id": "id1"}) + "\n")
+        previous = self.previous()
+        self.assertIsNone(previous.traits(make_occurrence("id1", "one")))
+        self.assertEqual(previous.counts["changed"], 1)
+
+    def test_delta_04(self) -> None:
+        """It adds up the counts of every process."""
+        count = delta.write_index(self.json_file, "occurrenceID", self.index_dir)
+        self.assertEqual(count, 3)
+        count_dir = delta.index_path(self.index_dir, self.json_file).parent
+        for pid, counts in [(1, {"reused": 2}), (2, {"changed": 1, "new": 5})]:
+            path = count_dir / f"{pid}.json"
+            path.write_text(json.dumps(counts))
+        self.assertEqual(
+            delta.merge_counts(self.index_dir, self.json_file, 3),
+            {"new": 5, "changed": 1, "deleted": 0, "reused": 2},
+        )
@@ -0,0 +1,87 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from ranges.pylib import delta, pipeline
+from ranges.pylib.occurrence import Occurrence
+from ranges.writers import json_writer
+
+OLD_TRAITS = [{"_trait": "from_the_earlier_parse"}]
+
+
+def make_occurrence(id_: str, text: str) -> Occurrence:
+    return Occurrence(
+        source="occurrences.csv",
+        id_field=("occurrenceID", id_),
+        parse_fields={"dynamicProperties": text},
+    )
+
+
+class TestJsonWriter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.index_dir = Path(self.temp_dir.name) / "previous"
+        self.json_file = Path(self.temp_dir.name) / "occurrences.jsonl"
+        with self.json_file.open("w") as out:
+            for id_, text in [("id1", "female"), ("id2", "old text")]:
+                record = make_occurrence(id_, text).as_dict()
+                record["traits"] = OLD_TRAITS
+                out.write(json.dumps(record) + "\n")
+        delta.write_index(self.json_file, "occurrenceID", self.index_dir)
+        self.index_file = delta.index_path(self.index_dir, self.json_file)
+
+    def tearDown(self) -> None:
+        if previous := json_writer.shared_previous(self.index_file):
+            previous.close()
+        self.temp_dir.cleanup()
+
+    def test_json_writer_01(self) -> None:
+        """It gets the earlier traits of unchanged records by their place."""
+        block = [
+            make_occurrence("id9", "female"),
+            make_occurrence("id1", "female"),
+            make_occurrence("id2", "new text"),
+        ]
+        previous = json_writer.shared_previous(self.index_file)
+        self.assertEqual(json_writer.reused_traits(block, previous), {1: OLD_TRAITS})
+
+    def test_json_writer_02(self) -> None:
+        """It copies the traits of unchanged records and parses the others."""
+        blocks = [[make_occurrence("id1", "female"), make_occurrence("id2", "male")]]
+        [(lines, count, errors)] = json_writer.parse_blocks(
+            blocks, "occurrences", previous_index=self.index_dir, traits=("sex",)
+        )
+        reused, parsed = [json.loads(ln) for ln in lines.splitlines()]
+        self.assertEqual(count, 2)
+        self.assertEqual(errors, "")
+        self.assertEqual(reused["traits"], OLD_TRAITS)
+        self.assertEqual([t["sex"] for t in parsed["traits"]], ["male"])
+        counts = delta.merge_counts(self.index_dir, self.json_file, 2)
+        self.assertEqual(counts["reused"], 1)
+        self.assertEqual(counts["changed"], 1)
+
+    def test_json_writer_03(self) -> None:
+        """It parses everything when the earlier parse was not indexed."""
+        self.index_file.unlink()
+        blocks = [[make_occurrence("id1", "female")]]
+        [(lines, _, _)] = json_writer.parse_blocks(
+            blocks, "occurrences", previous_index=self.index_dir, traits=("sex",)
+        )
+        self.assertEqual([t["sex"] for t in json.loads(lines)["traits"]], ["female"])
+
+    def test_json_writer_04(self) -> None:
+        """It re-parses a file parsed with another long text limit."""
+        fingerprint = json_writer.shared_fingerprint(("sex",), 2000)
+        json_writer.write_stamp(self.json_file, self.json_file, fingerprint, 2)
+        self.assertTrue(json_writer.is_current(self.json_file, fingerprint))
+        for max_chars in (0, 4000):
+            other = json_writer.shared_fingerprint(("sex",), max_chars)
+            self.assertFalse(json_writer.is_current(self.json_file, other))
+
+    def test_json_writer_05(self) -> None:
+        """It gets the fingerprint without building the pipeline."""
+        json_writer.shared_pipeline.cache_clear()
+        fingerprint = json_writer.shared_fingerprint(("body_mass",))
+        self.assertEqual(fingerprint, pipeline.source_fingerprint(("body_mass",)))
+        self.assertEqual(json_writer.shared_pipeline.cache_info().currsize, 0)
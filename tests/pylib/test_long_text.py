@@ -0,0 +1,46 @@
+import itertools
+import unittest
+from dataclasses import dataclass
+
+from ranges.pylib import long_text
+
+
+@dataclass
+class Trait:
+    start: int
+    end: int
+
+
+class TestLongText(unittest.TestCase):
+    def test_long_text_01(self) -> None:
+        """It keeps short texts whole."""
+        self.assertEqual(long_text.split_text("short", max_chars=10), [(0, "short")])
+
+    def test_long_text_02(self) -> None:
+        """It cuts at a newline before a space."""
+        text = "aaa bbb\nccc ddd eee fff"
+        chunks = long_text.split_text(text, max_chars=12, overlap=0)
+        self.assertEqual(chunks[0], (0, "aaa bbb\n"))
+
+    def test_long_text_03(self) -> None:
+        """It covers the whole text with chunks no longer than the limit."""
+        text = "; ".join(f"sentence {i} has words" for i in range(200))
+        chunks = long_text.split_text(text, max_chars=100, overlap=20)
+        self.assertTrue(all(len(c) <= 100 for _, c in chunks))
+        self.assertEqual(chunks[0][0], 0)
+        self.assertEqual(chunks[-1][0] + len(chunks[-1][1]), len(text))
+        for (start, chunk), (next_start, _) in itertools.pairwise(chunks):
+            self.assertLessEqual(next_start, start + len(chunk))
+            self.assertEqual(text[start : start + len(chunk)], chunk)
+
+    def test_long_text_04(self) -> None:
+        """It moves trait offsets back onto the text."""
+        chunks = [(0, 10, [Trait(1, 3)]), (8, 10, [Trait(5, 7)])]
+        joined = long_text.join_traits(chunks)
+        self.assertEqual(joined, [Trait(1, 3), Trait(13, 15)])
+
+    def test_long_text_05(self) -> None:
+        """It drops traits found twice in an overlap."""
+        chunks = [(0, 20, [Trait(16, 19)]), (14, 20, [Trait(2, 5), Trait(8, 9)])]
+        joined = long_text.join_traits(chunks)
+        self.assertEqual(joined, [Trait(16, 19), Trait(22, 23)])
@@ -0,0 +1,45 @@
+import gc
+import os
+import unittest
+from pathlib import Path
+
+from ranges.pylib import memory
+
+HAS_SMAPS = Path("/proc/self/smaps_rollup").exists()
+
+
+class TestMemory(unittest.TestCase):
+    def tearDown(self) -> None:
+        gc.unfreeze()
+        gc.enable()
+
+    def test_memory_01(self) -> None:
+        """It freezes what was built and then collects garbage again."""
+        memory.start_shared()
+        self.assertFalse(gc.isenabled())
+        memory.freeze_shared()
+        self.assertGreater(gc.get_freeze_count(), 0)
+        self.assertTrue(gc.isenabled())
+
+    @unittest.skipUnless(HAS_SMAPS, "Needs /proc/<pid>/smaps_rollup")
+    def test_memory_02(self) -> None:
+        """It reads a process's memory use."""
+        sizes = memory.usage(os.getpid())
+        self.assertEqual(set(sizes), {"rss", "pss", "uss"})
+        self.assertGreater(sizes["rss"], 0)
+        self.assertLessEqual(sizes["uss"], sizes["rss"])
+
+    def test_memory_03(self) -> None:
+        """It has no memory use for a missing process."""
+        self.assertEqual(memory.usage("not_a_pid"), {})
+
+    @unittest.skipUnless(HAS_SMAPS, "Needs /proc/<pid>/smaps_rollup")
+    def test_memory_04(self) -> None:
+        """It keeps the largest memory use seen for each process."""
+        monitor = memory.MemoryMonitor()
+        monitor.sample([os.getpid()])
+        first = dict(monitor.peaks[os.getpid()])
+        data = bytearray(16 * 1024 * 1024)  # noqa: F841
+        monitor.sample([os.getpid()])
+        peak = monitor.peaks[os.getpid()]
+        self.assertTrue(all(peak[k] >= v for k, v in first.items()))
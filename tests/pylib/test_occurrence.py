@@ -0,0 +1,145 @@
+import csv
+import json
+import tempfile
+import tracemalloc
+import unittest
+from pathlib import Path
+
+import spacy
+from spacy.language import Language
+from spacy.tokens import Doc
+
+from ranges.pylib import occurrence, parse_errors, shard
+
+FIELDS = {
+    "id_field": "occurrenceID",
+    "info_fields": ["institutionCode"],
+    "parse_fields": ["dynamicProperties"],
+    "overwrite_fields": ["sex"],
+}
+
+
+def write_csv(path: Path, rows: int) -> None:
+    with path.open("w", newline="") as out:
+        writer = csv.writer(out)
+        writer.writerow(
+            ["occurrenceID", "institutionCode", "dynamicProperties", "sex", "other"]
+        )
+        for i in range(rows):
+            writer.writerow(
+                [f"id{i}", "MVZ", f"weight={i} g\nlength=99 mm", "female", "x" * 400]
+            )
+
+
+@Language.component("test_occurrence_boom")
+def boom(doc: Doc) -> Doc:
+    if "boom" in doc.text:
+        msg = "boom"
+        raise ValueError(msg)
+    return doc
+
+
+def boom_nlp() -> Language:
+    nlp = spacy.blank("en")
+    nlp.add_pipe("test_occurrence_boom")
+    return nlp
+
+
+def make_occurrences(texts: list[str]) -> list[occurrence.Occurrence]:
+    return [
+        occurrence.Occurrence(
+            source="occurrences.csv",
+            id_field=("occurrenceID", f"id{i}"),
+            parse_fields={"dynamicProperties": text},
+        )
+        for i, text in enumerate(texts)
+    ]
+
+
+class TestOccurrence(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "occurrences.csv"
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_read_blocks_01(self) -> None:
+        """It reads all of the rows in fixed-size blocks."""
+        write_csv(self.path, 25)
+        blocks = list(occurrence.read_blocks(self.path, block_size=10, **FIELDS))
+        self.assertEqual([len(b) for b in blocks], [10, 10, 5])
+        self.assertEqual(blocks[2][4].id_field, ("occurrenceID", "id24"))
+        self.assertEqual(
+            blocks[0][1].parse_fields, {"dynamicProperties": "weight=1 g\nlength=99 mm"}
+        )
+
+    def test_read_blocks_02(self) -> None:
+        """Peak memory is set by the block size and not the file size."""
+        write_csv(self.path, 50_000)
+        file_size = self.path.stat().st_size
+
+        tracemalloc.start()
+        count = 0
+        for block in occurrence.read_blocks(self.path, block_size=500, **FIELDS):
+            count += len(block)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.assertEqual(count, 50_000)
+        self.assertLess(peak, file_size // 10)
+
+    def test_read_blocks_03(self) -> None:
+        """It reads only the rows in a chunk."""
+        write_csv(self.path, 25)
+        chunks = shard.chunk_file(self.path, 10)
+        blocks = list(
+            occurrence.read_blocks(self.path, block_size=100, chunk=chunks[1], **FIELDS)
+        )
+        ids = [o.id_field[1] for o in blocks[0]]
+        self.assertEqual(ids, [f"id{i}" for i in range(10, 20)])
+
+    def test_read_blocks_04(self) -> None:
+        """It skips and logs rows that are too short, and blank lines."""
+        self.path.write_text(
+            "occurrenceID,institutionCode,dynamicProperties,sex\n"
+            "id1,MVZ,a,f\n"
+            "id2,MVZ\n"
+            "\n"
+            "id3,MVZ,c,m\n"
+        )
+        with self.assertLogs(level="WARNING") as logs:
+            blocks = list(occurrence.read_blocks(self.path, **FIELDS))
+        ids = [o.id_field[1] for o in blocks[0]]
+        self.assertEqual(ids, ["id1", "id3"])
+        self.assertIn("Skipped 1 rows in occurrences.csv", logs.output[0])
+
+    def test_parse_occurrences_01(self) -> None:
+        """It logs a text that breaks the parser and parses the rest."""
+        occurrences = make_occurrences(["one", "a boom", "two", "a boom"])
+        errors = []
+        occurrence.parse_occurrences(
+            occurrences, boom_nlp(), batch_size=2, errors=errors
+        )
+        errors = [json.loads(e) for e in errors]
+        self.assertEqual([e["id"] for e in errors], ["id1", "id3"])
+        self.assertEqual(errors[0]["field"], "dynamicProperties")
+        self.assertEqual(errors[0]["text_hash"], parse_errors.text_hash("a boom"))
+        self.assertIn("ValueError: boom", errors[0]["error"])
+        self.assertEqual([o.traits for o in occurrences][1], {"dynamicProperties": []})
+
+    def test_parse_occurrences_02(self) -> None:
+        """It raises parser errors when there is no errors list."""
+        occurrences = make_occurrences(["one", "a boom"])
+        with self.assertRaises(ValueError):  # noqa: PT027
+            occurrence.parse_occurrences(occurrences, boom_nlp())
+
+    def test_pipe_texts_01(self) -> None:
+        """It only fails the texts that break the parser."""
+        failed = {}
+        texts = ["one", "boom", "two", "three"]
+        docs = list(occurrence.pipe_texts(boom_nlp(), texts, 3, failed))
+        self.assertEqual(
+            [d.text if d else None for d in docs], ["one", None, *texts[2:]]
+        )
+        self.assertEqual(list(failed), ["boom"])
@@ -0,0 +1,49 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from ranges.pylib import parse_cache
+from ranges.pylib.parse_cache import CachedTrait, ParseCache
+
+TRAIT = CachedTrait("sex", 0, 4, {"sex": {"sex": "male"}})
+
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.temp_dir.name) / "parse_cache.sqlite"
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def fill(self, fingerprint: str) -> None:
+        cache = ParseCache(fingerprint, db_path=self.db_path)
+        cache.put("male", [TRAIT])
+        cache.flush()
+        cache.db.close()
+
+    def cached(self, fingerprint: str) -> list[CachedTrait] | None:
+        cache = ParseCache(fingerprint, max_size=0, db_path=self.db_path)
+        traits = cache.get("male")
+        cache.db.close()
+        return traits
+
+    def test_parse_cache_01(self) -> None:
+        """It keeps the parses of another pipeline on disk."""
+        self.fill("old")
+        self.fill("new")
+        self.assertEqual(self.cached("old"), [TRAIT])
+        self.assertEqual(self.cached("new"), [TRAIT])
+
+    def test_parse_cache_02(self) -> None:
+        """It only prunes the parses of other pipelines."""
+        self.fill("old")
+        self.fill("new")
+        self.assertEqual(parse_cache.prune(self.db_path, "new"), 1)
+        self.assertIsNone(self.cached("old"))
+        self.assertEqual(self.cached("new"), [TRAIT])
+
+    def test_parse_cache_03(self) -> None:
+        """It prunes nothing when there is no disk cache."""
+        self.assertEqual(parse_cache.prune(self.db_path, "new"), 0)
+        self.assertFalse(self.db_path.exists())
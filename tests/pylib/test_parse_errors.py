@@ -0,0 +1,32 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from ranges.pylib import parse_errors
+
+
+class TestParseErrors(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        json_file = Path(self.temp_dir.name) / "occurrences.jsonl"
+        self.path = parse_errors.error_path(json_file)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_parse_errors_01(self) -> None:
+        """It only writes an error log when there are errors."""
+        with parse_errors.ErrorLog(self.path) as error_log:
+            error_log.write("")
+        self.assertFalse(self.path.exists())
+        self.assertEqual(parse_errors.read_errors(self.path), [])
+
+    def test_parse_errors_02(self) -> None:
+        """It replaces the errors of an earlier parse."""
+        with parse_errors.ErrorLog(self.path) as error_log:
+            error_log.write('{"id": "old"}\n')
+        with parse_errors.ErrorLog(self.path) as error_log:
+            error_log.write('{"id": "new1"}\n{"id": "new2"}\n')
+        self.assertEqual(error_log.count, 2)
+        errors = parse_errors.read_errors(self.path)
+        self.assertEqual([e["id"] for e in errors], ["new1", "new2"])
@@ -0,0 +1,133 @@
+import gc
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from ranges.pylib import pipeline, term_index
+from ranges.writers import json_writer
+
+
+class TestPipeline(unittest.TestCase):
+    def test_pipeline_01(self) -> None:
+        """It selects every rule by default."""
+        self.assertEqual(pipeline.select_rules(), set(pipeline.RULES))
+
+    def test_pipeline_02(self) -> None:
+        """It adds the rules that a trait depends on."""
+        self.assertEqual(
+            pipeline.select_rules(["gonad"]), {"gonad", "testicle", "ovary"}
+        )
+
+    def test_pipeline_03(self) -> None:
+        """It complains about unknown traits."""
+        with self.assertRaises(ValueError):  # noqa: PT027
+            pipeline.select_rules(["wingspan"])
+
+    def test_pipeline_04(self) -> None:
+        """It builds the same pipeline for every trait as the default."""
+        self.assertEqual(
+            pipeline.build(list(pipeline.RULES)).pipe_names,
+            pipeline.build().pipe_names,
+        )
+
+    def test_pipeline_05(self) -> None:
+        """It only adds the selected rules."""
+        names = pipeline.build(["body_mass"]).pipe_names
+        self.assertIn("body_mass_patterns", names)
+        self.assertIn("delete", names)
+        self.assertNotIn("sex_patterns", names)
+
+    def test_pipeline_06(self) -> None:
+        """It loads a saved pipeline."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pipeline_dir = Path(temp_dir)
+            nlp = pipeline.build(["sex"])
+            pipeline.save(nlp, pipeline_dir, ["sex"])
+            loaded = pipeline.load(["sex"], pipeline_dir=pipeline_dir)
+            self.assertEqual(pipeline.fingerprint(loaded), pipeline.fingerprint(nlp))
+
+    def test_pipeline_07(self) -> None:
+        """It builds the pipeline when the saved one is stale."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pipeline_dir = Path(temp_dir)
+            pipeline.save(pipeline.build(["sex"]), pipeline_dir, ["sex"])
+            stamp = pipeline_dir / pipeline.PIPELINE_STAMP
+            stamp.write_text(json.dumps({"source": "stale"}))
+            self.assertFalse(pipeline.is_saved(pipeline_dir, ["sex"]))
+            with self.assertLogs(level="WARNING"):
+                nlp = pipeline.load(["sex"], pipeline_dir=pipeline_dir)
+            self.assertIn("sex_patterns", nlp.pipe_names)
+
+    def test_pipeline_08(self) -> None:
+        """It builds the trait pipes on a blank base model."""
+        names = pipeline.build(["sex"], base="blank").pipe_names
+        self.assertNotIn("tagger", names)
+        self.assertIn("sex_patterns", names)
+
+    def test_pipeline_09(self) -> None:
+        """It complains about unknown base models."""
+        with self.assertRaises(ValueError):  # noqa: PT027
+            pipeline.base_name("lg")
+
+    def test_pipeline_10(self) -> None:
+        """It replaces the later number pipes with the number cache."""
+        names = pipeline.build(cache_numbers=True).pipe_names
+        self.assertIn("number_cache", names)
+        self.assertTrue(any(n.startswith("number_restore_") for n in names))
+
+    def test_pipeline_11(self) -> None:
+        """It parses the same with the number cache."""
+        texts = [
+            "ad, tl 230 mm, hb 120 mm; wt 21.5 g; 3 emb, crl=12 mm",
+            "T 14x8mm; 2L 1 R scars, lact, ovaries 5 x 3 mm",
+        ]
+        old = pipeline.build()
+        new = pipeline.build(cache_numbers=True)
+        for text in texts:
+            expect = [e._.trait.as_dict() for e in old(text).ents]
+            actual = [e._.trait.as_dict() for e in new(text).ents]
+            self.assertEqual(actual, expect)
+
+    def test_pipeline_12(self) -> None:
+        """It adds numbers for a rule when the rule that finds them is not selected."""
+        nlp = pipeline.build(["vagina_state", "tail_length"], cache_numbers=True)
+        self.assertIn("number_cache", nlp.pipe_names)
+        traits = [e._.trait._trait for e in nlp("tail 40 mm").ents]
+        self.assertEqual(traits, ["tail_length"])
+
+    def test_pipeline_13(self) -> None:
+        """It collects garbage again after freezing the shared pipeline."""
+        try:
+            json_writer.share_pipeline(("sex",))
+            self.assertTrue(gc.isenabled())
+            self.assertGreater(gc.get_freeze_count(), 0)
+        finally:
+            gc.unfreeze()
+            gc.enable()
+
+    def test_pipeline_14(self) -> None:
+        """It parses the same with one term pipe for the neighboring length rules."""
+        traits = ["ear_length", "forearm_length", "hind_foot_length"]
+        old = pipeline.build(traits)
+        new = pipeline.build(traits, shared_lengths=True)
+        self.assertIn("ear_length_terms", old.pipe_names)
+        self.assertNotIn("ear_length_terms", new.pipe_names)
+        self.assertEqual(new.pipe_names.count("length_terms"), 1)
+        texts = [
+            "ear 12 mm; forearm 33 mm; hind foot with claw=30 mm;",
+            "tag 4 mm, fa 33, E 12",
+        ]
+        for text in texts:
+            expect = [e._.trait.as_dict() for e in old(text).ents]
+            actual = [e._.trait.as_dict() for e in new(text).ents]
+            self.assertEqual(actual, expect)
+
+    def test_pipeline_15(self) -> None:
+        """It records the term CSVs of each term pipe for the term index."""
+        nlp = pipeline.build(["body_mass"])
+        term_pipes = nlp.meta[term_index.META_KEY]
+        self.assertEqual(list(term_pipes), ["body_mass_terms"])
+        self.assertTrue(
+            term_pipes["body_mass_terms"][-1].endswith("body_mass_terms.csv")
+        )
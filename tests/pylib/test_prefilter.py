@@ -0,0 +1,47 @@
+import unittest
+
+from ranges.pylib import prefilter
+
+GATE = prefilter.build()
+
+
+class TestPrefilter(unittest.TestCase):
+    def test_prefilter_01(self) -> None:
+        """It skips texts without numbers or terms."""
+        self.assertIsNone(GATE.search("Caught by hand under a log"))
+
+    def test_prefilter_02(self) -> None:
+        """It passes texts with numbers."""
+        self.assertIsNotNone(GATE.search("Collected 2 km up river"))
+
+    def test_prefilter_03(self) -> None:
+        """It passes texts with trait terms."""
+        self.assertIsNotNone(GATE.search("Scrotal, adult"))
+
+    def test_prefilter_04(self) -> None:
+        """It passes female state shorthand."""
+        self.assertIsNotNone(GATE.search("OSL"))
+
+    def test_prefilter_05(self) -> None:
+        """It does not match terms inside longer words."""
+        self.assertIsNone(GATE.search("Scrotalish"))
+
+    def test_prefilter_06(self) -> None:
+        """It passes texts that have traits."""
+        texts = [
+            "pregnant",
+            "postparous",
+            "nulliparous",
+            "no embryos",
+            "Testes descended",
+            "vagina closed",
+            "juvenile",
+            "female",
+            "OEN",
+        ]
+        for text in texts:
+            self.assertIsNotNone(GATE.search(text), text)
+
+    def test_prefilter_07(self) -> None:
+        """It passes words that patterns match without a term."""
+        self.assertIsNotNone(GATE.search("at hatching"))
@@ -0,0 +1,76 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import spacy
+from spacy.language import Language
+from spacy.tokens import Span
+
+from ranges.pylib import profiler
+
+
+@Language.component("test_profiler_ents")
+def add_ents(doc):  # noqa: ANN001 ANN201
+    doc.ents = [Span(doc, 0, 1, label="first")]
+    return doc
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.profile_dir = Path(self.temp_dir.name)
+        self.nlp = spacy.blank("en")
+        self.nlp.add_pipe("sentencizer")
+        self.nlp.add_pipe("test_profiler_ents")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_profiler_01(self) -> None:
+        """It does not change the parse."""
+        expect = [d.ents for d in self.nlp.pipe(["one two", "three four"])]
+        profiler.Profiler(self.nlp)
+        actual = [d.ents for d in self.nlp.pipe(["one two", "three four"])]
+        self.assertEqual([str(e) for e in actual], [str(e) for e in expect])
+
+    def test_profiler_02(self) -> None:
+        """It counts calls and entities for both nlp() and nlp.pipe()."""
+        profile = profiler.Profiler(self.nlp)
+        self.nlp("one two")
+        list(self.nlp.pipe(["three four", "five six"], batch_size=1))
+        stats = profile.stats["test_profiler_ents"]
+        self.assertEqual(stats.calls, 3)
+        self.assertEqual(stats.ents_in, 0)
+        self.assertEqual(stats.ents_out, 3)
+
+    def test_profiler_03(self) -> None:
+        """It merges dumps from several processes into a ranked report."""
+        profile = profiler.Profiler(self.nlp)
+        list(self.nlp.pipe(["one two", "three four"]))
+        profile.dump(self.profile_dir)
+        # Pretend another process dumped the same stats
+        dump = next(self.profile_dir.glob("*.json"))
+        (self.profile_dir / "other.json").write_text(dump.read_text())
+
+        stem = self.profile_dir / "report"
+        profiler.write_report(self.profile_dir, stem)
+
+        with stem.with_suffix(".json").open() as jin:
+            rows = json.load(jin)
+        self.assertEqual([r["rank"] for r in rows], [1, 2])
+        self.assertEqual({r["calls"] for r in rows}, {4})
+        self.assertTrue(stem.with_suffix(".csv").exists())
+
+    def test_profiler_04(self) -> None:
+        """It samples the times of single docs, not the mean of a batch."""
+        profile = profiler.Profiler(self.nlp)
+        texts = ["one two"] * 150
+        docs = list(self.nlp.pipe(texts, batch_size=64))
+        self.assertEqual(len(docs), 150)
+        self.assertTrue(all(len(list(d.sents)) == 1 for d in docs))
+        unbatched = profile.stats["test_profiler_ents"]
+        self.assertEqual(len(unbatched.samples.items), 150)
+        batched = profile.stats["sentencizer"]
+        self.assertEqual(batched.calls, 150)
+        self.assertEqual(len(batched.samples.items), 2)  # Docs 0 and 100
@@ -0,0 +1,168 @@
+import multiprocessing
+import queue
+import tempfile
+import unittest
+from pathlib import Path
+
+from ranges.pylib import parse_errors, shard
+from ranges.writers import checkpoint, json_writer, queue_writer
+from ranges.writers.queue_writer import Result
+
+
+def broken_initializer() -> None:
+    msg = "No pipeline"
+    raise RuntimeError(msg)
+
+
+class TestQueueWriter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.temp_dir.name)
+        self.csv_file = self.dir / "occurrences.csv"
+        self.csv_file.write_text("id,text\n1,a\n2,b\n3,c\n")
+        self.json_file = self.dir / "occurrences.jsonl"
+        self.json_file.write_text("old\n")
+        self.chunks = shard.chunk_file(self.csv_file, 1)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def ordered_file(self) -> queue_writer.OrderedFile:
+        return queue_writer.OrderedFile(self.chunks, self.dir, "fp", buffering=-1)
+
+    def test_queue_writer_01(self) -> None:
+        """It writes chunks in source order whatever order they are parsed in."""
+        ordered = self.ordered_file()
+        c0, c1, c2 = self.chunks
+        ordered.add(Result(c2, "c\n", 1, last=True))
+        ordered.add(Result(c1, "b1\n", 1))
+        ordered.add(Result(c0, "a\n", 1, last=True))
+        self.assertFalse(ordered.done)
+        ordered.add(Result(c1, "b2\n", 1, last=True))
+        self.assertTrue(ordered.done)
+        self.assertEqual(self.json_file.read_text(), "a\nb1\nb2\nc\n")
+        self.assertEqual(json_writer.read_stamp(self.json_file)["records"], 4)
+
+    def test_queue_writer_02(self) -> None:
+        """It keeps the old output when a chunk of the file does not parse."""
+        ordered = self.ordered_file()
+        c0, c1, _ = self.chunks
+        ordered.add(Result(c0, "a\n", 1, errors='{"id": "1"}\n', last=True))
+        ordered.add(Result(c1, last=True, error="Traceback"))
+        self.assertTrue(ordered.failed)
+        self.assertEqual(self.json_file.read_text(), "old\n")
+        self.assertFalse(ordered.temp_file.exists())
+        self.assertFalse(ordered.error_log.path.exists())
+        self.assertFalse(json_writer.stamp_path(self.json_file).exists())
+
+    def test_queue_writer_03(self) -> None:
+        """It replaces the old output and errors only when the file is done."""
+        error_file = parse_errors.error_path(self.json_file)
+        error_file.parent.mkdir(parents=True)
+        error_file.write_text('{"id": "old"}\n')
+        ordered = self.ordered_file()
+        for chunk in self.chunks[:2]:
+            ordered.add(Result(chunk, f"{chunk.index}\n", 1, last=True))
+        self.assertEqual(self.json_file.read_text(), "old\n")
+        ordered.add(Result(self.chunks[2], "2\n", 1, errors='{"id": "3"}\n', last=True))
+        self.assertEqual(self.json_file.read_text(), "0\n1\n2\n")
+        errors = parse_errors.read_errors(error_file)
+        self.assertEqual([e["id"] for e in errors], ["3"])
+        self.assertFalse(ordered.temp_file.exists())
+
+    def test_queue_writer_04(self) -> None:
+        """It fails the chunks of a worker that stopped without finishing them."""
+        results, summary = queue.Queue(), queue.Queue()
+        c0, c1, _ = self.chunks
+        results.put(Result(c0, "a\n", 1, last=True))
+        results.put(Result(c1, "b\n", 1))
+        results.put(queue_writer.DONE)
+        queue_writer.write_results(
+            results, summary, self.chunks, self.dir, "fp", workers=1
+        )
+        fails = [name for name, _ in summary.get_nowait()]
+        self.assertEqual(fails, [c.name for c in self.chunks[1:]])
+        self.assertEqual(self.json_file.read_text(), "old\n")
+
+    def test_queue_writer_05(self) -> None:
+        """It reports every chunk that was not written when the writer breaks."""
+        results, summary = queue.Queue(), queue.Queue()
+        stranger = shard.Chunk(self.dir / "other.csv", 0, 0, 0, 0, 1)
+        results.put(Result(stranger, "x\n", 1, last=True))
+        queue_writer.write_results(
+            results, summary, self.chunks, self.dir, "fp", workers=1
+        )
+        fails = summary.get_nowait()
+        self.assertEqual([n for n, _ in fails], [c.name for c in self.chunks])
+        self.assertIn("KeyError", fails[0][1])
+
+    def test_queue_writer_06(self) -> None:
+        """It does not hang when the workers cannot start."""
+        fails = queue_writer.parse_and_write(
+            multiprocessing.get_context("fork"),
+            self.chunks,
+            self.dir,
+            "fp",
+            cpus=2,
+            initializer=broken_initializer,
+            initargs=(),
+            fields={},
+            options={},
+        )
+        self.assertEqual(fails, [c.name for c in self.chunks])
+        self.assertEqual(self.json_file.read_text(), "old\n")
+        manifest = checkpoint.manifest_path(self.dir, queue_writer.MODE)
+        self.assertEqual(manifest.read_text(), "")
+
+    def killed_parse(self) -> queue_writer.OrderedFile:
+        """Commit the first two chunks, then die in the middle of the third."""
+        path = checkpoint.manifest_path(self.dir, queue_writer.MODE)
+        manifest = checkpoint.Manifest(path, "fp")
+        ordered = queue_writer.OrderedFile(
+            self.chunks, self.dir, "fp", buffering=-1, manifest=manifest
+        )
+        c0, c1, c2 = self.chunks
+        ordered.add(Result(c0, "a\n", 1, errors='{"id": "1"}\n', last=True))
+        ordered.add(Result(c1, "b\n", 1, last=True))
+        ordered.add(Result(c2, "c-torn\n", 1, errors='{"id": "torn"}\n'))
+        ordered.out.close()  # Unlike a commit, closing does not fsync
+        ordered.error_log.close()
+        manifest.close()
+        return ordered
+
+    def test_queue_writer_07(self) -> None:
+        """It resumes after the chunks that were committed before a kill."""
+        ordered = self.killed_parse()
+        todo = queue_writer.resume_chunks(self.chunks, self.dir, "fp", resume=True)
+        self.assertEqual(todo, self.chunks[2:])
+        path = checkpoint.manifest_path(self.dir, queue_writer.MODE)
+        manifest = checkpoint.Manifest(path, "fp", resume=True)
+        manifest.close()
+        self.assertEqual(
+            queue_writer.committed(self.chunks, ordered.temp_file, manifest), 2
+        )
+
+    def test_queue_writer_08(self) -> None:
+        """It parses everything again when the pipeline changed."""
+        self.killed_parse()
+        todo = queue_writer.resume_chunks(self.chunks, self.dir, "new", resume=True)
+        self.assertEqual(todo, self.chunks)
+
+    def test_queue_writer_09(self) -> None:
+        """It cuts off the output and errors written after the last commit."""
+        self.killed_parse()
+        queue_writer.resume_chunks(self.chunks, self.dir, "fp", resume=True)
+        path = checkpoint.manifest_path(self.dir, queue_writer.MODE)
+        manifest = checkpoint.Manifest(path, "fp", resume=True)
+        ordered = queue_writer.OrderedFile(
+            self.chunks, self.dir, "fp", buffering=-1, manifest=manifest
+        )
+        self.assertEqual(ordered.next, 2)
+        self.assertEqual(ordered.temp_file.read_text(), "a\nb\n")
+        ordered.add(Result(self.chunks[2], "c\n", 1, last=True))
+        manifest.close()
+
+        self.assertEqual(self.json_file.read_text(), "a\nb\nc\n")
+        errors = parse_errors.read_errors(parse_errors.error_path(self.json_file))
+        self.assertEqual([e["id"] for e in errors], ["1"])
+        self.assertEqual(json_writer.read_stamp(self.json_file)["records"], 3)
@@ -0,0 +1,95 @@
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+from ranges.pylib import reader, shard
+
+META = """<?xml version="1.0" encoding="utf-8"?>
+<archive xmlns="http://rs.tdwg.org/dwc/text/">
+  <core encoding="UTF-8" fieldsTerminatedBy="\\t" linesTerminatedBy="\\n"
+        fieldsEnclosedBy="" ignoreHeaderLines="1"
+        rowType="http://rs.tdwg.org/dwc/terms/Occurrence">
+    <files><location>occurrence.txt</location></files>
+    <id index="0" />
+    <field index="1" term="http://rs.tdwg.org/dwc/terms/occurrenceID"/>
+    <field index="2" term="http://rs.tdwg.org/dwc/terms/dynamicProperties"/>
+  </core>
+</archive>
+"""
+
+
+def read(
+    path: Path, chunk: shard.Chunk | None = None, fmt: str = ""
+) -> tuple[list, list]:
+    with reader.open_rows(path, chunk, fmt) as (header, rows):
+        return header, list(rows)
+
+
+class TestReader(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.temp_dir.name)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_reader_01(self) -> None:
+        """It reads a CSV file."""
+        path = self.dir / "occurrences.csv"
+        path.write_text('id,text\n1,"a, ""b"""\n')
+        self.assertEqual(reader.file_format(path), "csv")
+        self.assertEqual(read(path), (["id", "text"], [["1", 'a, "b"']]))
+
+    def test_reader_02(self) -> None:
+        """It reads a GBIF TSV file where quotes are not special."""
+        path = self.dir / "occurrence.txt"
+        path.write_text('id\ttext\n1\t"weight 2 g\n2\tear 3"\n')
+        self.assertEqual(reader.file_format(path), "tsv")
+        self.assertEqual(
+            read(path), (["id", "text"], [["1", '"weight 2 g'], ["2", 'ear 3"']])
+        )
+
+    def test_reader_03(self) -> None:
+        """It chunks a TSV file without looking at quotes."""
+        path = self.dir / "occurrence.txt"
+        path.write_text('id\ttext\n1\t"a\n2\tb"\n3\tc\n')
+        chunks = shard.chunk_files([path], 2)
+        self.assertEqual([c.rows for c in chunks], [2, 1])
+        self.assertEqual(read(path, chunks[1]), (["id", "text"], [["3", "c"]]))
+
+    def test_reader_04(self) -> None:
+        """It reads a Darwin Core Archive using the meta.xml for the header."""
+        path = self.dir / "dwca.zip"
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("meta.xml", META)
+            archive.writestr(
+                "occurrence.txt", "gbifID\tid\tprops\n11\tocc1\tweight 2 g\n"
+            )
+        self.assertEqual(reader.file_format(path), "dwca")
+        self.assertEqual(
+            read(path),
+            (
+                ["id", "occurrenceID", "dynamicProperties"],
+                [["11", "occ1", "weight 2 g"]],
+            ),
+        )
+        self.assertEqual(len(shard.chunk_files([path], 2)), 1)
+
+    def test_reader_05(self) -> None:
+        """It projects columns by index."""
+        header = ["a", "b", "c"]
+        self.assertEqual(reader.column_index(header, ["c", "a"]), [("c", 2), ("a", 0)])
+        with self.assertRaises(ValueError):  # noqa: PT027
+            reader.column_index(header, ["d"])
+
+    def test_reader_06(self) -> None:
+        """It reads a file as the given format instead of guessing it."""
+        path = self.dir / "occurrences.csv"
+        path.write_text('id,text\tnote\n1,"a\tb"\n')
+        self.assertEqual(reader.file_format(path), "tsv")
+        expect = (["id", "text\tnote"], [["1", "a\tb"]])
+        self.assertEqual(read(path, fmt="csv"), expect)
+        [chunk] = shard.chunk_files([path], 10, {path: "csv"})
+        self.assertEqual(chunk.fmt, "csv")
+        self.assertEqual(read(path, chunk), expect)
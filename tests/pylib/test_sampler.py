@@ -0,0 +1,72 @@
+import unittest
+
+from ranges.pylib import sampler
+
+
+def occurrence(id_: int, source: str = "a.csv", traits: list[str] = ()) -> dict:
+    return {
+        "id": str(id_),
+        "source": source,
+        "info_fields": {"species": source},
+        "parse_fields": {"notes": "text" if traits else ""},
+        "overwrite_fields": {},
+        "traits": [{"_trait": t, "_field": "notes"} for t in traits],
+    }
+
+
+class TestSampler(unittest.TestCase):
+    def test_sampler_01(self) -> None:
+        """It returns everything when there are fewer records than the sample size."""
+        occurs = [occurrence(i, traits=["sex"]) for i in range(5)]
+        sampled = sampler.reservoir_sample(iter(occurs), 10, "traits")
+        self.assertEqual(sampled, occurs)
+
+    def test_sampler_02(self) -> None:
+        """It samples the same records for the same seed."""
+        occurs = [occurrence(i, traits=["sex"]) for i in range(1000)]
+        first = sampler.reservoir_sample(iter(occurs), 10, "traits", seed=1)
+        second = sampler.reservoir_sample(iter(occurs), 10, "traits", seed=1)
+        self.assertEqual(len(first), 10)
+        self.assertEqual(first, second)
+
+    def test_sampler_03(self) -> None:
+        """It skips records without data."""
+        occurs = [occurrence(i, traits=["sex"] if i % 2 else []) for i in range(100)]
+        sampled = sampler.reservoir_sample(iter(occurs), 100, "fields")
+        self.assertEqual(len(sampled), 50)
+
+    def test_sampler_04(self) -> None:
+        """It gives small strata their share of the sample."""
+        occurs = [occurrence(i, "big.csv", ["sex"]) for i in range(1000)]
+        occurs += [occurrence(i, "small.csv", ["sex"]) for i in range(3)]
+        sampled = sampler.stratified_sample(
+            lambda: iter(occurs), 10, "traits", "institution"
+        )
+        sources = [o["source"] for o in sampled]
+        self.assertEqual(sources.count("small.csv"), 3)
+        self.assertEqual(sources.count("big.csv"), 7)
+
+    def test_sampler_05(self) -> None:
+        """It stratifies records by their rarest trait."""
+        occurs = [occurrence(i, traits=["sex"]) for i in range(1000)]
+        occurs += [occurrence(i, traits=["sex", "testes_state"]) for i in range(2)]
+        sampled = sampler.stratified_sample(lambda: iter(occurs), 6, "traits", "trait")
+        rare = [o for o in sampled if len(o["traits"]) == 2]
+        self.assertEqual(len(sampled), 6)
+        self.assertEqual(len(rare), 2)
+
+    def test_sampler_06(self) -> None:
+        """It stratifies by the summary field."""
+        occurs = [occurrence(i, "mus", ["sex"]) for i in range(100)]
+        occurs += [occurrence(i, "rattus", ["sex"]) for i in range(100)]
+        sampled = sampler.stratified_sample(
+            lambda: iter(occurs), 10, "traits", "summary", "species"
+        )
+        species = [o["info_fields"]["species"] for o in sampled]
+        self.assertEqual(species.count("mus"), 5)
+        self.assertEqual(species.count("rattus"), 5)
+
+    def test_sampler_07(self) -> None:
+        """It splits the sample evenly over the strata."""
+        quotas = sampler.allocate(10, {"a": 1, "b": 100, "c": 100})
+        self.assertEqual(quotas, {"a": 1, "b": 4, "c": 5})
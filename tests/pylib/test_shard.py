@@ -0,0 +1,67 @@
+import csv
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+from ranges.pylib import shard
+
+
+def read_chunk(chunk: shard.Chunk) -> list[list[str]]:
+    with chunk.path.open("rb") as fin:
+        fin.seek(chunk.start)
+        data = fin.read(chunk.end - chunk.start).decode()
+    return list(csv.reader(io.StringIO(data, newline="")))
+
+
+class TestShard(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "occurrences.csv"
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_shard_01(self) -> None:
+        """It splits rows into chunks."""
+        self.path.write_text("id,text\n1,a\n2,b\n3,c\n4,d\n5,e\n")
+        chunks = shard.chunk_file(self.path, 2)
+        self.assertEqual([c.rows for c in chunks], [2, 2, 1])
+        self.assertEqual([c.first_row for c in chunks], [0, 2, 4])
+        self.assertEqual(
+            [read_chunk(c) for c in chunks],
+            [[["1", "a"], ["2", "b"]], [["3", "c"], ["4", "d"]], [["5", "e"]]],
+        )
+
+    def test_shard_02(self) -> None:
+        """It does not split records on newlines inside of quotes."""
+        self.path.write_text('id,text\n1,"a\nb"\n2,"c ""\nd"""\n3,e\n')
+        chunks = shard.chunk_file(self.path, 1)
+        self.assertEqual(
+            [read_chunk(c) for c in chunks],
+            [[["1", "a\nb"]], [["2", 'c "\nd"']], [["3", "e"]]],
+        )
+
+    def test_shard_03(self) -> None:
+        """It handles a last record without a newline."""
+        self.path.write_text("id,text\n1,a\n2,b")
+        chunks = shard.chunk_file(self.path, 10)
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(read_chunk(chunks[0]), [["1", "a"], ["2", "b"]])
+
+    def test_shard_04(self) -> None:
+        """It returns one empty chunk for a file with only a header."""
+        self.path.write_text("id,text\n")
+        chunks = shard.chunk_file(self.path, 10)
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0].rows, 0)
+        self.assertEqual(read_chunk(chunks[0]), [])
+
+    def test_shard_05(self) -> None:
+        """It treats a quote inside of an unquoted field as a character."""
+        self.path.write_text('id,text\n1,5" long\n2,b\n3,"c"" ""d"\n4,e\n')
+        chunks = shard.chunk_file(self.path, 1)
+        self.assertEqual(
+            [read_chunk(c) for c in chunks],
+            [[["1", '5" long']], [["2", "b"]], [["3", 'c" "d']], [["4", "e"]]],
+        )
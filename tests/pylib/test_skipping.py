@@ -0,0 +1,107 @@
+import unittest
+
+import spacy
+from spacy.language import Language
+from spacy.matcher import Matcher
+from spacy.tokens import Doc, Span
+
+from ranges.pylib import skipping
+
+
+@Language.factory("test_skipping_patterns", default_config={"patterns": {}})
+class Patterns:
+    def __init__(self, nlp: Language, name: str, patterns: dict) -> None:
+        self.name = name
+        self.calls = 0
+        self.matcher = Matcher(nlp.vocab)
+        for label, label_patterns in patterns.items():
+            self.matcher.add(label, label_patterns)
+
+    def __call__(self, doc: Doc) -> Doc:
+        self.calls += 1
+        spans = [Span(doc, s, e, label=i) for i, s, e in self.matcher(doc)]
+        doc.ents = spacy.util.filter_spans([*doc.ents, *spans])
+        return doc
+
+
+@Language.component("test_skipping_terms")
+def terms(doc: Doc) -> Doc:
+    doc.ents = [Span(doc, t.i, t.i + 1, label="key") for t in doc if t.lower_ == "ear"]
+    return doc
+
+
+class TestSkipping(unittest.TestCase):
+    def setUp(self) -> None:
+        self.nlp = spacy.blank("en")
+        self.nlp.add_pipe("test_skipping_terms")
+        self.nlp.add_pipe(
+            "test_skipping_patterns",
+            name="keyed",
+            config={
+                "patterns": {
+                    "ear_length": [[{"ENT_TYPE": "key"}, {"LIKE_NUM": True}]],
+                },
+            },
+        )
+        self.nlp.add_pipe(
+            "test_skipping_patterns",
+            name="unkeyed",
+            config={"patterns": {"count": [[{"LIKE_NUM": True}]]}},
+        )
+
+    def parse(self, texts: list[str]) -> list[list[tuple[str, str]]]:
+        return [[(e.text, e.label_) for e in d.ents] for d in self.nlp.pipe(texts)]
+
+    def test_skipping_01(self) -> None:
+        """It only wraps components with patterns that need entities."""
+        wrapped = skipping.skip_unmatchable(self.nlp)
+        self.assertEqual(list(wrapped), ["keyed"])
+        self.assertEqual(wrapped["keyed"].labels, {"key"})
+
+    def test_skipping_02(self) -> None:
+        """It parses the same with and without skipping."""
+        texts = ["ear 12", "weight 12", "no numbers"]
+        expect = self.parse(texts)
+        skipping.skip_unmatchable(self.nlp)
+        self.assertEqual(self.parse(texts), expect)
+
+    def test_skipping_03(self) -> None:
+        """It skips docs without the needed entities."""
+        wrapped = skipping.skip_unmatchable(self.nlp)
+        self.parse(["ear 12", "weight 12", "no numbers"])
+        self.assertEqual(wrapped["keyed"].runs, 1)
+        self.assertEqual(wrapped["keyed"].skips, 2)
+
+    def test_skipping_04(self) -> None:
+        """It never skips when a pattern does not need an entity."""
+        patterns = [
+            [{"ENT_TYPE": "key"}],
+            [{"ENT_TYPE": "key", "OP": "?"}, {"LIKE_NUM": True}],
+        ]
+        self.assertEqual(skipping.needed_labels(patterns), set())
+
+    def test_skipping_05(self) -> None:
+        """It reads the required counts of entity tokens."""
+        self.assertTrue(skipping.is_required(None))
+        self.assertTrue(skipping.is_required("+"))
+        self.assertTrue(skipping.is_required("{2,}"))
+        self.assertFalse(skipping.is_required("*"))
+        self.assertFalse(skipping.is_required("{,2}"))
+
+    def test_skipping_06(self) -> None:
+        """It uses a key term token over a number token."""
+        pattern = [
+            {"ENT_TYPE": "number", "OP": "+"},
+            {"ENT_TYPE": {"IN": ["len_key", "key_with_units"]}, "OP": "+"},
+        ]
+        self.assertEqual(
+            skipping.pattern_labels(pattern), {"len_key", "key_with_units"}
+        )
+
+    def test_skipping_07(self) -> None:
+        """It uses a number token when there is nothing rarer."""
+        pattern = [
+            {"ENT_TYPE": "number", "OP": "+"},
+            {"ENT_TYPE": "metric_length", "OP": "?"},
+        ]
+        self.assertEqual(skipping.pattern_labels(pattern), {"number"})
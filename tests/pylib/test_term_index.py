@@ -0,0 +1,73 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import spacy
+from spacy.language import Language
+from spacy.matcher import PhraseMatcher
+from spacy.tokens import Doc
+
+from ranges.pylib import term_index
+from ranges.rules import terms
+
+
+@Language.factory("test_term_index_terms", default_config={"path": ""})
+class Terms:
+    def __init__(self, nlp: Language, name: str, path: str) -> None:
+        self.name = name
+        self.matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+        for term in terms.read_terms(Path(path)):
+            self.matcher.add(term["label"], [nlp.make_doc(term["pattern"])])
+
+    def __call__(self, doc: Doc) -> Doc:
+        spans = self.matcher(doc, as_spans=True)
+        doc.ents = spacy.util.filter_spans([*doc.ents, *spans])
+        return doc
+
+
+class TestTermIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        temp_dir = Path(self.temp_dir.name)
+
+        self.nlp = spacy.blank("en")
+        term_pipes = {}
+        for name, rows in [
+            ("ear_terms", "len_key,ear\nlen_key,ear length\n"),
+            ("tail_terms", "len_key,tail\nmetric_length,mm\n"),
+        ]:
+            path = temp_dir / f"{name}.csv"
+            path.write_text("label,pattern\n" + rows)
+            self.nlp.add_pipe(
+                "test_term_index_terms", name=name, config={"path": str(path)}
+            )
+            term_pipes[name] = [str(path)]
+        self.nlp.meta[term_index.META_KEY] = term_pipes
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def parse(self, texts: list[str]) -> list[list[tuple[str, str]]]:
+        return [[(e.text, e.label_) for e in d.ents] for d in self.nlp.pipe(texts)]
+
+    def test_term_index_01(self) -> None:
+        """It parses the same with and without the term index."""
+        texts = ["Ear length 12 mm", "TAIL 40", "no terms"]
+        expect = self.parse(texts)
+        term_index.index_terms(self.nlp)
+        self.assertEqual(self.parse(texts), expect)
+
+    def test_term_index_02(self) -> None:
+        """It skips term pipes without terms in the doc."""
+        wrapped = term_index.index_terms(self.nlp)
+        self.parse(["ear 12", "tail 40 mm", "no terms"])
+        self.assertEqual(wrapped["ear_terms"].runs, 1)
+        self.assertEqual(wrapped["ear_terms"].skips, 2)
+        self.assertEqual(wrapped["tail_terms"].runs, 1)
+        self.assertEqual(wrapped["tail_terms"].skips, 2)
+
+    def test_term_index_03(self) -> None:
+        """It only wraps the term pipes in the pipeline meta."""
+        del self.nlp.meta[term_index.META_KEY]["tail_terms"]
+        wrapped = term_index.index_terms(self.nlp)
+        self.assertEqual(list(wrapped), ["ear_terms"])
@@ -321,3 +321,35 @@ class TestLengthShorthand(unittest.TestCase):
                 )
             ],
         )
+
+    def test_length_shorthand_20(self) -> None:
+        """It parses canonical shorthands the same with the fast path and spaCy."""
+        corpus = [
+            "762-292-121-76 2435.0g",
+            "77-30-7-12=5.4",
+            "11-x-x-44",
+            "11-?-33-44",
+            "11-[22]-33-[44]:99g",
+            "143-63-20-17:13",
+            "143/63/20/17",
+            "95-42-14-15 20 g",
+            "91-0-17-22-[62]",
+        ]
+        for text in corpus:
+            fast = LengthShorthand.fast_parse(text)
+            self.assertIsNotNone(fast, text)
+            expect = [(t.as_dict(), t.start, t.end) for t in parse(text)]
+            actual = [(t.as_dict(), t.start, t.end) for t in fast]
+            self.assertEqual(actual, expect, text)
+
+    def test_length_shorthand_21(self) -> None:
+        """It leaves texts that are not only a canonical shorthand to spaCy."""
+        for text in [
+            "Note in catalog: 83-0-17-23-fa64-35g",
+            "143-63-20-17-22=13",
+            "987-408-139--75",
+            "210-92-30",
+            "1999-12-31-44",
+            "12/31/1999/44",
+        ]:
+            self.assertIsNone(LengthShorthand.fast_parse(text), text)
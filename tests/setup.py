@@ -3,7 +3,7 @@ from traiter.pylib.util import compress
 
 from ranges.pylib import pipeline
 
-PIPELINE = pipeline.build()
+PIPELINE = pipeline.load()
 
 
 def parse(text: str) -> list: